@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+analytics.py
+
+结果统计（向量化）：从结果库（store.ResultsStore）按列读出，用 numpy/pandas 一次性聚合，代替在 Excel 里手工做透视表。
+- 卦象名字频次；本卦→变卦 64×64 转移矩阵；世身、月卦身分布；各爻位动爻次数；
+  按 干支-日 / 干支-时 / 旬空-日 / 写入日期 的条数；
+- 结果缓存在实例里，refresh() 只读 id 大于上次水位的新行，把增量叠加到已有结果上（所有统计都是可加的计数）；
+- numpy/pandas 只在本模块里导入，主程序启动时不加载。
+命令行：
+    python analytics.py gua_auto_results.xlsx                 # 打印摘要
+    python analytics.py gua_auto_results.xlsx --out 统计.xlsx  # 各项统计分 sheet 写出
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+import hexagrams
+from io_parse import LINE_NAMES
+from store import ResultsStore, results_db_path
+
+# 统计名 -> 结果库里的取值表达式（索引列直接取，其余从整行 JSON 里取）
+CATEGORIES = {
+    "卦象名字": "gua_name",
+    "干支-日": "gz_day",
+    "干支-时": "json_extract(data, '$.\"干支-时\"')",
+    "旬空-日": "json_extract(data, '$.\"旬空-日\"')",
+    "世身": "json_extract(data, '$.\"世身\"')",
+    "月卦身": "json_extract(data, '$.\"月卦身\"')",
+    "日期": "substr(write_time, 1, 10)",
+}
+READ_CHUNK = 50000
+
+
+class ResultsAnalytics:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.last_id = 0
+        self.rows = 0
+        self.coded_rows = 0                                   # 有卦码（卦体解析成功）的行数
+        self.counts = {name: pd.Series(dtype="int64", name="条数").rename_axis(name) for name in CATEGORIES}
+        self.transition = np.zeros((64, 64), dtype=np.int64)  # [本卦码, 变卦码]
+        self.moving_lines = np.zeros(6, dtype=np.int64)       # 初爻..上爻
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_excel(cls, excel_path: str):
+        return cls(results_db_path(excel_path))
+
+    # ===== 增量读取 =====
+    def _select_sql(self) -> str:
+        cats = ", ".join(f"{expr} AS c{i}" for i, expr in enumerate(CATEGORIES.values()))
+        return (f"SELECT id, ben_code, bian_code, moving_mask, {cats} FROM results"
+                f" WHERE id > ? ORDER BY id")
+
+    def refresh(self) -> int:
+        """读入上次之后新增的行并叠加进统计；返回新增行数。可在任意线程调用（每次自开连接）。"""
+        with self._lock:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            try:
+                added = 0
+                for df in pd.read_sql_query(self._select_sql(), conn, params=(self.last_id,),
+                                            chunksize=READ_CHUNK):
+                    self._absorb(df)
+                    added += len(df)
+            finally:
+                conn.close()
+            return added
+
+    def _absorb(self, df):
+        if df.empty:
+            return
+        self.last_id = int(df["id"].iloc[-1])
+        self.rows += len(df)
+        for i, name in enumerate(CATEGORIES):
+            col = df[f"c{i}"]
+            vc = col[col.notna() & (col != "")].value_counts().rename_axis(name).rename("条数")
+            self.counts[name] = self.counts[name].add(vc, fill_value=0).astype("int64")
+
+        coded = df[df["ben_code"].notna() & df["bian_code"].notna()]
+        if coded.empty:
+            return
+        self.coded_rows += len(coded)
+        ben = coded["ben_code"].to_numpy(dtype=np.int64)
+        bian = coded["bian_code"].to_numpy(dtype=np.int64)
+        self.transition += np.bincount(ben * 64 + bian, minlength=64 * 64).reshape(64, 64)
+        mask = coded["moving_mask"].fillna(0).to_numpy(dtype=np.int64)
+        self.moving_lines += ((mask[:, None] >> np.arange(6)) & 1).sum(axis=0)
+
+    # ===== 取结果 =====
+    def frequency(self, name: str = "卦象名字", top=None):
+        """某一类的计数，从多到少；top 为 None 时全部。"""
+        s = self.counts[name].sort_values(ascending=False, kind="stable")
+        return s if top is None else s.head(top)
+
+    def transition_frame(self):
+        """64×64 转移矩阵，行/列用卦名简称（按卦码顺序）。"""
+        names = [h.short for h in hexagrams.HEXAGRAMS]
+        return pd.DataFrame(self.transition, index=pd.Index(names, name="本卦"),
+                            columns=pd.Index(names, name="变卦"))
+
+    def top_transitions(self, top: int = 20):
+        """出现最多的 本卦→变卦 组合（DataFrame：本卦、变卦、条数）。"""
+        flat = self.transition.ravel()
+        k = min(top, int(np.count_nonzero(flat)))
+        if k == 0:
+            return pd.DataFrame(columns=["本卦", "变卦", "条数"])
+        idx = np.argpartition(flat, -k)[-k:]
+        idx = idx[np.argsort(-flat[idx], kind="stable")]
+        return pd.DataFrame({"本卦": [hexagrams.HEXAGRAMS[i >> 6].short for i in idx],
+                             "变卦": [hexagrams.HEXAGRAMS[i & 63].short for i in idx],
+                             "条数": flat[idx]})
+
+    def moving_line_counts(self):
+        return pd.Series(self.moving_lines, index=pd.Index(LINE_NAMES, name="爻位"), name="动爻次数")
+
+    def report(self, top: int = 20) -> dict:
+        """{sheet 名: DataFrame}，供打印或写 Excel。"""
+        out = {"卦象名字": self.frequency("卦象名字").rename_axis("卦象名字").reset_index(name="条数")}
+        out["本卦→变卦"] = self.top_transitions(top)
+        out["动爻爻位"] = self.moving_line_counts().reset_index()
+        for name in ("世身", "月卦身", "干支-日", "干支-时", "旬空-日", "日期"):
+            s = self.counts[name]
+            if name == "日期":
+                s = s.sort_index()
+            else:
+                s = s.sort_values(ascending=False, kind="stable")
+            out[name] = s.rename_axis(name).reset_index(name="条数")
+        out["转移矩阵"] = self.transition_frame()
+        return out
+
+    def to_excel(self, path: str, top: int = 20):
+        sheets = self.report(top)
+        with pd.ExcelWriter(path, engine="openpyxl") as xw:
+            for name, df in sheets.items():
+                df.to_excel(xw, sheet_name=name, index=(name == "转移矩阵"))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="结果统计：卦名频次、转移矩阵、世身/月卦身分布、动爻爻位、干支/旬空分布")
+    ap.add_argument("path", help="结果 Excel（自动找同名 .results.db，必要时先从 Excel 回填）或结果库 .db")
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--out", help="写出统计 Excel")
+    args = ap.parse_args(argv)
+
+    if args.path.endswith(".db"):
+        db = args.path
+    else:
+        db = results_db_path(args.path)
+        store = ResultsStore(db)
+        try:
+            if store.needs_sync(args.path):
+                print(f"从 Excel 回填结果库：新增 {store.sync_from_excel(args.path)} 行")
+        finally:
+            store.close()
+    if not os.path.exists(db):
+        print(f"结果库不存在：{db}")
+        return 1
+
+    a = ResultsAnalytics(db)
+    a.refresh()
+    print(f"共 {a.rows} 行（其中 {a.coded_rows} 行有卦码）")
+    with pd.option_context("display.max_rows", args.top, "display.width", 120):
+        print("\n【卦象名字】")
+        print(a.frequency("卦象名字", args.top).to_string())
+        print("\n【本卦→变卦】")
+        print(a.top_transitions(args.top).to_string(index=False))
+        print("\n【动爻爻位】")
+        print(a.moving_line_counts().to_string())
+        for name in ("世身", "月卦身", "干支-日", "干支-时", "旬空-日"):
+            print(f"\n【{name}】")
+            print(a.frequency(name, args.top).to_string())
+    if args.out:
+        a.to_excel(args.out, args.top)
+        print(f"\n已写出：{args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+bench_parse.py
+
+解析器微基准（开发环境在源码目录运行，不参与打包）：
+    python bench_parse.py                         # 跑全部用例，与基线比较；变慢超出容差返回码 1
+    python bench_parse.py --save                  # 跑完把结果写成新基线
+    python bench_parse.py --xlsx a.xlsx --synthetic 2000 --case _parse_nl
+    python bench_parse.py --xlsx "" --archive gua_auto_results.captures   # 用原始采集存档里的真实文本
+语料固定：从结果 Excel 读出“卦象文本/卦象文本简介”，可再追加原始采集存档（capture_archive）的全部条目、
+corpus.py 以固定种子生成的样本；
+语料指纹和运行环境写进基线，任一不同就不做比较（只提示），避免拿不同输入/机器的数字互相比。
+每个用例报告：每条耗时 ns（多轮取最小值，另列中位数）、每条临时内存峰值（tracemalloc）与残留内存块。
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import io_parse as P
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_XLSX = os.path.join(APP_DIR, "gua_auto_results.xlsx")
+DEFAULT_BASELINE = os.path.join(APP_DIR, "bench_parse_baseline.json")
+TOLERANCE = 0.25          # 比基线慢 25% 以上视为回归
+MIN_ROUND_SEC = 0.2       # 每轮至少跑这么久（语料小时整体重复多遍），压低计时抖动
+_WRITE_DT = datetime(2025, 1, 1, 12, 0, 0)
+
+
+# ===== 语料 =====
+def load_corpus(xlsx: str, synthetic: int = 0, seed: int = 0, archive: str = "") -> list:
+    """返回 [(full_text, intro_text)]；Excel 中没有卦象文本的行跳过。"""
+    items = []
+    if xlsx:
+        from openpyxl import load_workbook
+        wb = load_workbook(xlsx, read_only=True)
+        try:
+            ws = wb.active
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            idx = {str(h).strip(): i for i, h in enumerate(header) if h is not None}
+            i_full, i_intro = idx.get("卦象文本"), idx.get("卦象文本简介")
+            if i_full is None:
+                raise SystemExit(f"{xlsx} 中没有“卦象文本”列")
+            for r in rows:
+                full = r[i_full] if i_full < len(r) else None
+                if not full:
+                    continue
+                intro = r[i_intro] if i_intro is not None and i_intro < len(r) else None
+                items.append((str(full), str(intro or "")))
+        finally:
+            wb.close()
+    if archive:
+        from capture_archive import CaptureArchiveReader
+        reader = CaptureArchiveReader(archive)
+        try:
+            items.extend((cap.full_text, cap.intro_text) for cap in reader)
+        finally:
+            reader.close()
+    if synthetic:
+        import corpus
+        items.extend((s.full_text, s.intro_text) for s in corpus.iter_samples(seed, synthetic, edge_rate=0.2))
+    return items
+
+
+def corpus_fingerprint(items: list) -> str:
+    h = hashlib.md5()
+    for full, intro in items:
+        h.update(full.encode("utf-8"))
+        h.update(b"\0")
+        h.update(intro.encode("utf-8"))
+        h.update(b"\1")
+    return h.hexdigest()
+
+
+_NUM_TOKEN_RE = re.compile(r"年(.*?)月[大小]?(\S*)")
+
+
+def build_cases(items: list) -> dict:
+    """把语料拆成各用例的输入：{用例名: (函数, [参数元组])}。"""
+    blocks = []
+    for full, _intro in items:
+        try:
+            blocks.append(P._parse_first_block(full))
+        except P.ParseError:
+            continue
+    nums = []
+    for b in blocks:
+        m = _NUM_TOKEN_RE.search(b["nl"])
+        if m:
+            nums.extend(((m.group(1),), (m.group(2),)))
+    return {
+        "build_excel_row": (P.build_excel_row, [(f, i, _WRITE_DT) for f, i in items]),
+        "_parse_first_block": (P._parse_first_block, [(f,) for f, _i in items]),
+        "_parse_gl": (P._parse_gl, [(b["gl"],) for b in blocks]),
+        "_parse_nl": (P._parse_nl, [(b["nl"],) for b in blocks]),
+        "_parse_gz": (P._parse_gz, [(b["gz"],) for b in blocks]),
+        "_parse_xk": (P._parse_xk, [(b["xk"],) for b in blocks]),
+        "_parse_time_line": (P._parse_time_line, [(b["tline"],) for b in blocks]),
+        "_parse_intro": (P._parse_intro, [(i,) for _f, i in items]),
+        "_parse_body": (P._parse_body, [(f,) for f, _i in items]),
+        "_cn_num_to_int": (P._cn_num_to_int, nums),
+    }
+
+
+# ===== 测量 =====
+def _one_pass(fn, args_list: list) -> int:
+    t0 = time.perf_counter_ns()
+    for args in args_list:
+        try:
+            fn(*args)
+        except P.ParseError:
+            pass          # 解析失败的样本照常计时（抛错也是成本）
+    return time.perf_counter_ns() - t0
+
+
+def _time_case(fn, args_list: list, repeats: int) -> list:
+    """返回每轮的 ns/条；每轮把全部输入重复 passes 遍，使一轮不短于 MIN_ROUND_SEC。"""
+    passes = max(1, int(MIN_ROUND_SEC * 1e9 / max(1, _one_pass(fn, args_list))))
+    per_round = []
+    for _ in range(repeats):
+        total = sum(_one_pass(fn, args_list) for _p in range(passes))
+        per_round.append(total / (passes * len(args_list)))
+    return per_round
+
+
+def _alloc_case(fn, args_list: list, limit: int = 2000) -> tuple:
+    """(每条临时内存峰值 B, 每条残留内存块数)；只取前 limit 条，tracemalloc 下很慢。"""
+    sample = args_list[:limit]
+    tracemalloc.start()
+    try:
+        peaks = 0
+        blocks_before = sys.getallocatedblocks()
+        for args in sample:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            try:
+                result = fn(*args)
+            except P.ParseError:
+                result = None
+            peaks += tracemalloc.get_traced_memory()[1] - base
+            del result
+        retained = sys.getallocatedblocks() - blocks_before
+    finally:
+        tracemalloc.stop()
+    return peaks / len(sample), retained / len(sample)
+
+
+def run(items: list, repeats: int, only=None) -> dict:
+    results = {}
+    for name, (fn, args_list) in build_cases(items).items():
+        if only and name not in only or not args_list:
+            continue
+        _one_pass(fn, args_list)                      # 预热：正则编译缓存等
+        rounds = _time_case(fn, args_list, repeats)
+        peak_b, retained = _alloc_case(fn, args_list)
+        results[name] = {"records": len(args_list), "ns_min": min(rounds),
+                         "ns_median": statistics.median(rounds),
+                         "peak_bytes": peak_b, "retained_blocks": retained}
+    return results
+
+
+# ===== 基线 =====
+def _env() -> dict:
+    return {"python": platform.python_version(), "machine": platform.machine(),
+            "system": platform.system()}
+
+
+def load_baseline(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, fingerprint: str, count: int, results: dict):
+    data = {"created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "env": _env(),
+            "corpus": {"md5": fingerprint, "records": count}, "cases": results}
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def report(results: dict, baseline, tolerance: float) -> list:
+    """打印结果表，返回回归的用例名列表。"""
+    base_cases = (baseline or {}).get("cases", {})
+    print(f"{'用例':<20} {'条数':>7} {'ns/条':>10} {'中位':>10} {'峰值B/条':>10} {'残留块/条':>9} {'对比基线':>10}")
+    regressed = []
+    for name, r in results.items():
+        cmp_text = ""
+        b = base_cases.get(name)
+        if b:
+            ratio = r["ns_min"] / b["ns_min"] - 1 if b["ns_min"] else 0.0
+            cmp_text = f"{ratio:+.1%}"
+            if ratio > tolerance:
+                regressed.append(name)
+                cmp_text += " ✗"
+        print(f"{name:<20} {r['records']:>7} {r['ns_min']:>10.0f} {r['ns_median']:>10.0f} "
+              f"{r['peak_bytes']:>10.0f} {r['retained_blocks']:>9.2f} {cmp_text:>10}")
+    return regressed
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="解析器微基准")
+    ap.add_argument("--xlsx", default=DEFAULT_XLSX, help="语料来源的结果 Excel（空字符串表示不用）")
+    ap.add_argument("--archive", default="", help="追加原始采集存档（xxx.captures）里的全部条目")
+    ap.add_argument("--synthetic", type=int, default=0, help="追加 corpus.py 生成的样本条数")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeats", type=int, default=7)
+    ap.add_argument("--case", action="append", help="只跑指定用例（可多次）")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE)
+    ap.add_argument("--save", action="store_true", help="把本次结果写成基线")
+    args = ap.parse_args(argv)
+
+    items = load_corpus(args.xlsx if args.xlsx else None, args.synthetic, args.seed, args.archive)
+    if not items:
+        print("语料为空")
+        return 1
+    fp = corpus_fingerprint(items)
+    print(f"语料 {len(items)} 条（md5 {fp[:12]}），每用例 {args.repeats} 轮")
+    results = run(items, max(1, args.repeats), set(args.case or ()))
+
+    baseline = load_baseline(args.baseline)
+    if baseline and baseline.get("corpus", {}).get("md5") != fp:
+        print("注意：语料与基线不同，不做比较")
+        baseline = None
+    elif baseline and baseline.get("env") != _env():
+        print(f"注意：基线环境 {baseline.get('env')} 与当前 {_env()} 不同，不做比较（可用 --save 在本机生成）")
+        baseline = None
+    regressed = report(results, baseline, args.tolerance)
+
+    if args.save:
+        save_baseline(args.baseline, fp, len(items), results)
+        print(f"基线已写入 {args.baseline}")
+        return 0
+    if regressed and baseline:
+        # 机器抖动也会偶发超出容差：可疑用例重测一次，两次都慢才算回归
+        print(f"复测：{', '.join(regressed)}")
+        again = run(items, max(1, args.repeats), set(regressed))
+        regressed = report(again, baseline, args.tolerance)
+    if regressed:
+        print(f"回归（慢于基线 {args.tolerance:.0%} 以上）：{', '.join(regressed)}")
+        return 1
+    print("通过" if baseline else "无可比基线（用 --save 生成）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
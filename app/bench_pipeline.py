@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+bench_pipeline.py
+
+端到端写入基准（开发环境在源码目录运行，不参与打包；不需要真实窗口，Linux 无界面也能跑）：
+    python bench_pipeline.py                                  # 默认 1k/10k/50k/200k 行各测一次
+    python bench_pipeline.py --sizes 1000,10000 --records 10 --out-dir bench_out
+每个规模：
+1) 用 corpus.py 生成样本、build_excel_row 解析后，预先写出含 N 行的结果 Excel（缓存在 --work-dir，可复用）；
+2) 起一个干净子进程，复制该文件，用假控件代替窗口层，逐条调用 BaseWorker._record_once
+   （读文本 → build_excel_row → _lookup_params 查 gui_para → save_row_to_excel）；
+3) 记录每条耗时、各阶段耗时（metrics）与子进程峰值 RSS。
+结果打印成表，并写出 bench_pipeline.json 与 bench_pipeline.svg（每条耗时、峰值 RSS 随文件行数变化）。
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = (1000, 10000, 50000, 200000)
+DEFAULT_WORK_DIR = os.path.join(tempfile.gettempdir(), "gua_bench_pipeline")
+PARAMS_PER_NAME = 3
+
+
+# ===== 准备数据 =====
+def prefill_path(work_dir: str, rows: int, seed: int) -> str:
+    return os.path.join(work_dir, f"prefill_{rows}_s{seed}.xlsx")
+
+
+def build_prefill(path: str, rows: int, seed: int):
+    """写出带 rows 行历史记录的结果 Excel（write_only 流式写，不占大内存）。"""
+    from openpyxl import Workbook
+    import corpus
+    from io_parse import COL_ORDER, build_excel_row
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    headers = list(COL_ORDER)
+    ws.append(headers)
+    for i, s in enumerate(corpus.iter_samples(seed, rows, edge_rate=0.0), 1):
+        row = build_excel_row(s.full_text, s.intro_text, s.ts)
+        row["序号"] = i
+        ws.append([row.get(h, "") for h in headers])
+    tmp = path + ".tmp"
+    wb.save(tmp)
+    os.replace(tmp, path)
+
+
+def build_param_db(path: str):
+    """gui_para：64×64 个“本之变”名字各 PARAMS_PER_NAME 个参数，和 excel_to_sqlite_gui 生成的表结构一致。"""
+    import sqlite3
+    import hexagrams as hx
+
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("CREATE TABLE gui_para (name TEXT, param_order INTEGER, param_value TEXT)")
+        conn.executemany(
+            "INSERT INTO gui_para (name, param_order, param_value) VALUES (?, ?, ?)",
+            ((f"{a.short}之{b.short}", k, f"{a.short}{b.short}-{k}")
+             for a in hx.HEXAGRAMS for b in hx.HEXAGRAMS for k in range(1, PARAMS_PER_NAME + 1)))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ===== 子进程：假窗口层 + 真实写入路径 =====
+class _FakeControl:
+    """代替 pywinauto 控件：window_text() 返回当前“界面上”的文本。"""
+
+    def __init__(self):
+        self.text = ""
+
+    def window_text(self):
+        return self.text
+
+
+def run_child(excel: str, db: str, records: int, seed: int) -> dict:
+    import contextlib
+    import io
+    import corpus
+    import workers
+    from metrics import counters, metrics
+
+    class _BenchWorker(workers.BaseWorker):
+        # 去掉所有等待：只测解析 + 查参数 + 写 Excel 本身
+        _RECORD_COOLDOWN_SEC = 0
+        READ_DELAY_SEC = 0
+        SETTLE_GAP_SEC = 0
+
+    gui = workers.HeadlessGui(excel, db)
+    w = _BenchWorker(gui)
+    w.result_edit, w.intro_static = _FakeControl(), _FakeControl()
+    w._db_ok, w._db_path = bool(db), db
+    if db:
+        from param_index import ParamIndex
+        w._params = ParamIndex.load(db)              # 与 _prepare 中一致
+    from capture_archive import CaptureArchive, archive_prefix
+    w.archive = CaptureArchive(archive_prefix(excel))  # 与 CaptureGroup 一致：解析前存原始文本
+    metrics.enabled = True
+
+    rss_before = _peak_rss_mb()
+    start = datetime.now() + timedelta(days=3650)     # 与预填数据不重叠，不会被去重
+    latencies = []
+    sink = io.StringIO()
+    for s in corpus.iter_samples(seed + 1, records, start=start, edge_rate=0.0):
+        w.result_edit.text, w.intro_static.text = s.full_text, s.intro_text
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(sink):        # save_row_to_excel 每行都会 print
+            ok = w._record_once()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if not ok:
+            raise RuntimeError("_record_once 未写入（去重或读取失败），基准无效")
+        sink.seek(0)
+        sink.truncate()
+    if db and counters.get("param_cache_miss"):
+        raise RuntimeError("gui_para 未命中，基准无效")
+    return {"latency_ms": latencies, "rss_before_mb": rss_before, "peak_rss_mb": _peak_rss_mb(),
+            "stages": metrics.snapshot()}
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# ===== 父进程 =====
+def measure(prefill: str, db: str, records: int, seed: int, work_dir: str) -> dict:
+    work = os.path.join(work_dir, "work.xlsx")
+    shutil.copyfile(prefill, work)
+    for ext in (".captures.bin", ".captures.idx"):    # 每个规模都从空存档开始
+        if os.path.exists(os.path.join(work_dir, "work" + ext)):
+            os.remove(os.path.join(work_dir, "work" + ext))
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", work, "--db", db,
+                           "--records", str(records), "--seed", str(seed)],
+                          cwd=APP_DIR, capture_output=True, text=True, encoding="utf-8")
+    for line in proc.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    raise RuntimeError(f"子进程失败（返回码 {proc.returncode}）：\n{proc.stderr.strip()}")
+
+
+def summarize(size: int, res: dict) -> dict:
+    lat = res["latency_ms"]
+    stages = res["stages"]
+
+    def stage_mean(name):
+        return stages.get(name, {}).get("mean_ms")
+
+    return {"rows": size, "records": len(lat), "mean_ms": statistics.fmean(lat),
+            "p50_ms": statistics.median(lat), "max_ms": max(lat), "first_ms": lat[0],
+            "parse_ms": stage_mean("parse"), "param_ms": stage_mean("param_lookup"),
+            "load_ms": stage_mean("excel_load"), "save_ms": stage_mean("excel_save"),
+            "rss_before_mb": res["rss_before_mb"], "peak_rss_mb": res["peak_rss_mb"]}
+
+
+def _fmt(v, spec=".1f"):
+    return "-" if v is None else format(v, spec)
+
+
+def print_table(rows: list):
+    print(f"{'文件行数':>9} {'条':>4} {'平均ms':>9} {'中位ms':>9} {'最大ms':>9} "
+          f"{'解析':>7} {'查参数':>7} {'载入':>9} {'保存':>9} {'峰值RSS MB':>11}")
+    for r in rows:
+        print(f"{r['rows']:>9} {r['records']:>4} {_fmt(r['mean_ms']):>9} {_fmt(r['p50_ms']):>9} "
+              f"{_fmt(r['max_ms']):>9} {_fmt(r['parse_ms'], '.2f'):>7} {_fmt(r['param_ms'], '.2f'):>7} "
+              f"{_fmt(r['load_ms']):>9} {_fmt(r['save_ms']):>9} {_fmt(r['peak_rss_mb']):>11}")
+
+
+def write_svg(path: str, rows: list):
+    """两幅折线图（横轴文件行数，对数刻度）：每条平均耗时、子进程峰值 RSS。不依赖绘图库。"""
+    import math
+
+    w, h, pad = 420, 260, 50
+    xs = [math.log10(r["rows"]) for r in rows]
+    x_lo, x_hi = min(xs), max(xs)
+    if x_hi == x_lo:
+        x_hi += 1
+
+    def chart(ox, key, title, unit):
+        vals = [r[key] or 0 for r in rows]
+        top = max(vals) * 1.1 or 1
+
+        def px(x):
+            return ox + pad + (x - x_lo) / (x_hi - x_lo) * (w - 2 * pad)
+
+        def py(v):
+            return h - pad - v / top * (h - 2 * pad)
+
+        out = [f'<text x="{ox + w / 2}" y="20" text-anchor="middle" font-size="14">{title}</text>',
+               f'<line x1="{ox + pad}" y1="{h - pad}" x2="{ox + w - pad}" y2="{h - pad}" stroke="#000"/>',
+               f'<line x1="{ox + pad}" y1="{pad}" x2="{ox + pad}" y2="{h - pad}" stroke="#000"/>',
+               f'<text x="{ox + 8}" y="{pad - 10}" font-size="11">{unit}</text>']
+        for i in range(5):
+            v = top * i / 4
+            out.append(f'<text x="{ox + pad - 6}" y="{py(v) + 4}" text-anchor="end" font-size="10">{v:.0f}</text>')
+        pts = " ".join(f"{px(x):.1f},{py(v):.1f}" for x, v in zip(xs, vals))
+        out.append(f'<polyline points="{pts}" fill="none" stroke="#c0392b" stroke-width="2"/>')
+        for x, v, r in zip(xs, vals, rows):
+            out.append(f'<circle cx="{px(x):.1f}" cy="{py(v):.1f}" r="3" fill="#c0392b"/>')
+            out.append(f'<text x="{px(x):.1f}" y="{h - pad + 16}" text-anchor="middle" font-size="10">{r["rows"]}</text>')
+        out.append(f'<text x="{ox + w / 2}" y="{h - 10}" text-anchor="middle" font-size="11">文件行数</text>')
+        return out
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{2 * w}" height="{h}" font-family="sans-serif">',
+             '<rect width="100%" height="100%" fill="#fff"/>']
+    parts += chart(0, "mean_ms", "每条写入耗时（平均）", "ms")
+    parts += chart(w, "peak_rss_mb", "峰值 RSS", "MB")
+    parts.append("</svg>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="端到端写入基准：每条耗时/峰值内存 随结果文件行数的变化")
+    ap.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="预填行数，逗号分隔")
+    ap.add_argument("--records", type=int, default=5, help="每个规模写入的条数")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="预填文件缓存目录")
+    ap.add_argument("--out-dir", default=".", help="bench_pipeline.json/.svg 输出目录")
+    ap.add_argument("--no-db", action="store_true", help="不配置 gui_para 数据库（跳过查参数）")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    ap.add_argument("--db", default="", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        res = run_child(args.child, args.db, max(1, args.records), args.seed)
+        print("RESULT " + json.dumps(res), flush=True)
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    os.makedirs(args.work_dir, exist_ok=True)
+    db = ""
+    if not args.no_db:
+        db = os.path.join(args.work_dir, "gui_para.db")
+        build_param_db(db)
+
+    rows = []
+    for n in sizes:
+        path = prefill_path(args.work_dir, n, args.seed)
+        if not os.path.exists(path):
+            t0 = time.perf_counter()
+            print(f"生成预填文件 {n} 行…", flush=True)
+            build_prefill(path, n, args.seed)
+            print(f"  用时 {time.perf_counter() - t0:.1f}s，{os.path.getsize(path) / 1e6:.1f} MB", flush=True)
+        print(f"测量 {n} 行 × {args.records} 条…", flush=True)
+        rows.append(summarize(n, measure(path, db, args.records, args.seed, args.work_dir)))
+
+    print()
+    print_table(rows)
+    os.makedirs(args.out_dir, exist_ok=True)
+    json_path = os.path.join(args.out_dir, "bench_pipeline.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({"created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "records": args.records,
+                   "results": rows}, f, ensure_ascii=False, indent=2)
+    svg_path = os.path.join(args.out_dir, "bench_pipeline.svg")
+    write_svg(svg_path, rows)
+    print(f"\n结果：{json_path}\n图表：{svg_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
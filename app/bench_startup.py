@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+bench_startup.py
+
+启动耗时基准（开发环境在源码目录运行，不参与打包）：
+    python bench_startup.py                   # 测 N 次“启动进程 → 主窗口可见”，取中位数；超出预算返回码 1
+    python bench_startup.py --importtime      # 按 -X importtime 统计 import ui，列出累计耗时最多的模块
+选项：--runs 5  --budget-ms 1500  --top 25
+每次测量同时检查：主窗口出现时不应已加载 HEAVY_MODULES 中的模块（它们应在首次使用时才导入），
+发现即视为回归。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+STARTUP_BUDGET_MS = 1500
+HEAVY_MODULES = ("pywinauto", "comtypes", "win32gui", "win32api", "win32con",
+                 "openpyxl", "pandas", "numpy", "pyarrow")
+
+# 子进程：计时 import ui / 构造界面 / 等到主窗口真正可见，然后立即退出
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import ui
+t1 = time.perf_counter()
+ui.LiuyaoGUI.DEFAULT_LOG_PATH = sys.argv[1]
+gui = ui.LiuyaoGUI()
+t2 = time.perf_counter()
+gui.root.wait_visibility()
+gui.root.update_idletasks()
+t3 = time.perf_counter()
+heavy = sorted(m for m in sys.argv[2].split(",") if m in sys.modules)
+print("STARTUP " + json.dumps({"import_ms": (t1 - t0) * 1000, "build_ms": (t2 - t1) * 1000,
+                               "map_ms": (t3 - t2) * 1000, "heavy": heavy}), flush=True)
+gui.root.destroy()
+"""
+
+
+def measure_once(log_path: str) -> dict:
+    """返回一次启动的分段耗时；first_window_ms 为父进程看到的“启动进程→窗口可见”总耗时。"""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", _CHILD, log_path, ",".join(HEAVY_MODULES)],
+                            cwd=APP_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, encoding="utf-8")
+    result = None
+    for line in proc.stdout:
+        if line.startswith("STARTUP "):
+            result = json.loads(line[len("STARTUP "):])
+            result["first_window_ms"] = (time.perf_counter() - t0) * 1000
+            break
+    _out, err = proc.communicate(timeout=30)
+    if result is None:
+        raise RuntimeError(f"子进程未能显示主窗口（返回码 {proc.returncode}）：\n{err.strip()}")
+    return result
+
+
+def run_benchmark(runs: int, budget_ms: float) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        samples = [measure_once(os.path.join(tmp, "bench.log")) for _ in range(runs)]
+    first = [s["first_window_ms"] for s in samples]
+    median = statistics.median(first)
+    print(f"{'次':>3} {'窗口可见':>10} {'import ui':>10} {'构造界面':>10} {'映射窗口':>10}")
+    for i, s in enumerate(samples, 1):
+        print(f"{i:>3} {s['first_window_ms']:>10.1f} {s['import_ms']:>10.1f} "
+              f"{s['build_ms']:>10.1f} {s['map_ms']:>10.1f}")
+    print(f"中位数 {median:.1f} ms（最小 {min(first):.1f}，最大 {max(first):.1f}），预算 {budget_ms:.0f} ms")
+
+    failed = False
+    heavy = sorted({m for s in samples for m in s["heavy"]})
+    if heavy:
+        print(f"回归：主窗口出现前已加载重模块：{', '.join(heavy)}")
+        failed = True
+    if median > budget_ms:
+        print(f"回归：启动中位数 {median:.1f} ms 超出预算 {budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("通过")
+    return 1 if failed else 0
+
+
+def import_time_report(top: int, module: str = "ui") -> int:
+    """用 -X importtime 导入 module，按累计耗时排序输出（层级缩进保留，便于看是谁拖进来的）。"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=APP_DIR, capture_output=True, text=True, encoding="utf-8")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        try:
+            rows.append((int(self_us), int(cum_us), name.rstrip()))
+        except ValueError:
+            continue
+    if proc.returncode != 0:
+        print(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "导入失败")
+        return 1
+    total = next((cum for _s, cum, name in reversed(rows) if name.strip() == module), 0)
+    print(f"import {module} 共 {total / 1000:.1f} ms；累计耗时前 {top} 的模块（单位 ms）：")
+    print(f"{'自身':>8} {'累计':>8}  模块")
+    for self_us, cum_us, name in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"{self_us / 1000:>8.1f} {cum_us / 1000:>8.1f}  {name}")
+    loaded = sorted({name.strip().split(".")[0] for _s, _c, name in rows} & set(HEAVY_MODULES))
+    if loaded:
+        print(f"注意：import {module} 时已加载重模块：{', '.join(loaded)}")
+    return 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="启动耗时基准 / import 耗时报告")
+    ap.add_argument("--importtime", action="store_true", help="只输出 import 耗时报告")
+    ap.add_argument("--module", default="ui", help="--importtime 时导入的模块（默认 ui）")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    ap.add_argument("--top", type=int, default=25)
+    args = ap.parse_args(argv)
+    if args.importtime:
+        return import_time_report(args.top, args.module)
+    return run_benchmark(max(1, args.runs), args.budget_ms)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
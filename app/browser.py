@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+browser.py
+
+结果浏览窗口：
+- 数据来自结果库（store.ResultsStore），不打开 Excel，采集中也可随时查看；
+- Treeview 只放“当前可见”的那几行，滚动条/滚轮/翻页键都换算成偏移量按页查询（虚拟列表）；
+- 按卦象名字（前缀）、干支-日、日期范围、全文（卦象文本/简介里的片段，如神煞、某一爻）筛选，点列头按索引列排序；
+- 双击一行查看全部字段（含卦象文本）；
+- “导出日汇总”按当前日期范围把每日各卦象名字条数写成 CSV（读汇总表，不扫结果行）；
+- “导出Excel”把当前筛选出的全部行写成新的 xlsx（后台线程，文本原样拼回，字符串走共享字符串表）。
+"""
+import re
+import threading
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+
+from store import ResultsStore
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+class ResultsBrowser:
+    # (结果表列名, 可排序时对应的库列名, 列宽)
+    COLUMNS = (
+        ("序号", "id", 60),
+        ("excel写入时间", "write_time", 140),
+        ("卦象名字", "gua_name", 90),
+        ("本卦简称", None, 60),
+        ("变卦简称", None, 60),
+        ("干支-日", "gz_day", 60),
+        ("旬空-日", None, 60),
+        ("月卦身", None, 60),
+        ("来源窗口", "source", 130),
+    )
+    ROW_HEIGHT = 20
+    POLL_MS = 2000          # 采集中新行到达时自动刷新计数
+
+    def __init__(self, master, excel_path: str, log=None):
+        self.excel_path = excel_path
+        self._log = log or (lambda _msg: None)
+        self.store = ResultsStore.for_excel(excel_path)
+        self.offset = 0
+        self.total = 0
+        self.visible = 20
+        self.sort, self.desc = "id", True
+        self.filters = {}
+        self._last_id = None
+        self._export_state = None  # 导出线程结果：None / ("done", 行数, 路径) / ("error", 信息)
+        self._sync_state = None   # 回填线程进度：None / 已读行数 / ("done", 新增) / ("error", 信息)
+
+        top = self.top = tk.Toplevel(master)
+        top.title(f"结果浏览 - {excel_path}")
+        top.geometry("1040x560")
+        top.protocol("WM_DELETE_WINDOW", self.close)
+
+        # ===== 筛选区 =====
+        bar = tk.Frame(top)
+        bar.pack(fill="x", padx=8, pady=(8, 4))
+        self.name_var, self.gz_var = tk.StringVar(), tk.StringVar()
+        self.from_var, self.to_var = tk.StringVar(), tk.StringVar()
+        self.text_var = tk.StringVar()
+        for label, var, width in (("卦象名字：", self.name_var, 10), ("干支-日：", self.gz_var, 6),
+                                  ("日期从：", self.from_var, 11), ("到：", self.to_var, 11),
+                                  ("全文：", self.text_var, 14)):
+            tk.Label(bar, text=label).pack(side="left")
+            ent = tk.Entry(bar, textvariable=var, width=width)
+            ent.pack(side="left", padx=(0, 8))
+            ent.bind("<Return>", lambda _e: self.apply_filters())
+        tk.Button(bar, text="查询", width=6, command=self.apply_filters).pack(side="left", padx=2)
+        tk.Button(bar, text="重置", width=6, command=self.reset_filters).pack(side="left", padx=2)
+        tk.Button(bar, text="导出日汇总…", command=self.export_daily).pack(side="right", padx=2)
+        tk.Button(bar, text="导出Excel…", command=self.export_excel).pack(side="right", padx=2)
+
+        # ===== 列表 + 自管的滚动条 =====
+        body = tk.Frame(top)
+        body.pack(fill="both", expand=True, padx=8)
+        style = ttk.Style(top)
+        style.configure("Results.Treeview", rowheight=self.ROW_HEIGHT)
+        cols = [c for c, _s, _w in self.COLUMNS]
+        self.tree = ttk.Treeview(body, columns=cols, show="headings", style="Results.Treeview",
+                                 selectmode="browse")
+        for name, sort_key, width in self.COLUMNS:
+            self.tree.column(name, width=width, anchor="w", stretch=(name == "来源窗口"))
+            if sort_key:
+                self.tree.heading(name, text=name, command=lambda k=sort_key: self.sort_by(k))
+            else:
+                self.tree.heading(name, text=name)
+        self.ybar = ttk.Scrollbar(body, orient="vertical", command=self._on_scrollbar)
+        self.ybar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<Double-1>", self._show_detail)
+        for w in (self.tree, self.ybar):
+            w.bind("<MouseWheel>", lambda e: self.scroll_by(-3 if e.delta > 0 else 3), add="+")
+            w.bind("<Button-4>", lambda _e: self.scroll_by(-3), add="+")
+            w.bind("<Button-5>", lambda _e: self.scroll_by(3), add="+")
+        top.bind("<Prior>", lambda _e: self.scroll_by(-self.visible))
+        top.bind("<Next>", lambda _e: self.scroll_by(self.visible))
+        top.bind("<Home>", lambda _e: self.scroll_to(0))
+        top.bind("<End>", lambda _e: self.scroll_to(self.total))
+
+        self.status_var = tk.StringVar()
+        tk.Label(top, textvariable=self.status_var, fg="#555", anchor="w").pack(fill="x", padx=8, pady=(4, 8))
+
+        self._start_sync_if_needed()
+        self.refresh()
+        self._poll_id = top.after(self.POLL_MS, self._poll)
+
+    # ===== 数据 =====
+    def _start_sync_if_needed(self):
+        """Excel 在库外被改过（或第一次打开）时，后台线程流式回填；完成后自动刷新。"""
+        if not self.store.needs_sync(self.excel_path):
+            return
+
+        def _work():
+            store = ResultsStore(self.store.db_path)   # 回填线程用自己的连接
+            try:
+                added = store.sync_from_excel(self.excel_path, progress=self._set_sync_progress)
+                self._sync_state = ("done", added)
+            except Exception as e:
+                self._sync_state = ("error", str(e))
+            finally:
+                store.close()
+
+        self._sync_state = 0
+        threading.Thread(target=_work, daemon=True).start()
+
+    def _set_sync_progress(self, n: int):
+        self._sync_state = n
+
+    def _query_filters(self) -> dict:
+        return dict(self.filters)
+
+    def refresh(self):
+        self.total = self.store.count(**self._query_filters())
+        self.offset = max(0, min(self.offset, self.total - self.visible))
+        self._render()
+
+    def _render(self):
+        rows = self.store.fetch(self.offset, self.visible, self.sort, self.desc, **self._query_filters())
+        selected = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        for rid, row in rows:
+            self.tree.insert("", "end", iid=str(rid),
+                             values=[row.get(c, "") for c, _s, _w in self.COLUMNS])
+        keep = [iid for iid in selected if self.tree.exists(iid)]
+        if keep:
+            self.tree.selection_set(keep)
+        if self.total:
+            first = self.offset / self.total
+            last = min(1.0, (self.offset + len(rows)) / self.total)
+        else:
+            first, last = 0.0, 1.0
+        self.ybar.set(first, last)
+        self._update_status(len(rows))
+
+    def _update_status(self, shown: int):
+        text = f"共 {self.total} 条" + (f"，显示第 {self.offset + 1}–{self.offset + shown} 条" if shown else "")
+        state = self._sync_state
+        if isinstance(state, int):
+            text += f"  |  正在从 Excel 回填：已读 {state} 行…"
+        elif isinstance(state, tuple) and state[0] == "error":
+            text += f"  |  回填失败：{state[1]}"
+        self.status_var.set(text)
+
+    def _poll(self):
+        state = self._sync_state
+        if isinstance(state, tuple) and state[0] == "done":
+            self._sync_state = None
+            if state[1]:
+                self._log(f"结果库已从 Excel 回填 {state[1]} 行")
+        state, self._export_state = self._export_state, None
+        if state is not None:
+            if state[0] == "done":
+                self._log(f"[结果浏览] 已导出 {state[1]} 行：{state[2]}")
+                messagebox.showinfo("完成", f"已导出 {state[1]} 行：\n{state[2]}", parent=self.top)
+            else:
+                messagebox.showerror("错误", f"导出失败：{state[1]}", parent=self.top)
+        try:
+            # 库里没有新行就不重新计数/重画：避免闪烁和丢选中，全文筛选时也不用每轮重查
+            last = self.store.last_id()
+            if last != self._last_id:
+                self._last_id = last
+                self.refresh()
+            else:
+                self._update_status(len(self.tree.get_children()))
+        except tk.TclError:
+            return
+        self._poll_id = self.top.after(self.POLL_MS, self._poll)
+
+    # ===== 滚动（把滚动条位置换算成偏移量）=====
+    def scroll_to(self, offset: int):
+        new = max(0, min(int(offset), self.total - self.visible))
+        if new != self.offset:
+            self.offset = new
+            self._render()
+
+    def scroll_by(self, n: int):
+        self.scroll_to(self.offset + n)
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(float(args[0]) * self.total)
+        elif action == "scroll":
+            n = int(args[0])
+            self.scroll_by(n * self.visible if args[1] == "pages" else n)
+
+    def _on_resize(self, event):
+        # 表头约占一行，其余按行高算出能看到几行
+        rows = max(1, event.height // self.ROW_HEIGHT - 1)
+        if rows != self.visible:
+            self.visible = rows
+            self.refresh()
+
+    # ===== 筛选/排序 =====
+    def apply_filters(self):
+        name = self.name_var.get().strip()
+        gz = self.gz_var.get().strip()
+        d_from, d_to = self.from_var.get().strip(), self.to_var.get().strip()
+        text = " ".join(self.text_var.get().split())
+        for d in (d_from, d_to):
+            if d and not _DATE_RE.match(d):
+                messagebox.showwarning("提示", "日期格式应为 YYYY-MM-DD。", parent=self.top)
+                return
+        self.filters = {k: v for k, v in (("name_prefix", name), ("gz_day", gz),
+                                          ("date_from", d_from), ("date_to", d_to), ("text", text)) if v}
+        self.offset = 0
+        self.refresh()
+
+    def reset_filters(self):
+        for var in (self.name_var, self.gz_var, self.from_var, self.to_var, self.text_var):
+            var.set("")
+        self.apply_filters()
+
+    def sort_by(self, key: str):
+        if self.sort == key:
+            self.desc = not self.desc
+        else:
+            self.sort, self.desc = key, False
+        self.offset = 0
+        self._render()
+
+    # ===== 日汇总 =====
+    def export_daily(self):
+        path = filedialog.asksaveasfilename(parent=self.top, title="导出日汇总", defaultextension=".csv",
+                                            initialfile="日汇总.csv", filetypes=[("CSV", "*.csv")])
+        if not path:
+            return
+        try:
+            n = self.store.export_daily_summary(path, self.filters.get("date_from", ""),
+                                                self.filters.get("date_to", ""))
+        except OSError as e:
+            messagebox.showerror("错误", f"导出失败：{e}", parent=self.top)
+            return
+        self._log(f"[结果浏览] 日汇总已导出 {n} 行：{path}")
+        messagebox.showinfo("完成", f"已导出 {n} 行：\n{path}", parent=self.top)
+
+    def export_excel(self):
+        path = filedialog.asksaveasfilename(parent=self.top, title="导出 Excel", defaultextension=".xlsx",
+                                            initialfile="结果导出.xlsx", filetypes=[("Excel", "*.xlsx")])
+        if not path:
+            return
+        filters = self._query_filters()
+
+        def _work():
+            store = ResultsStore(self.store.db_path)   # 导出线程用自己的连接
+            try:
+                self._export_state = ("done", store.export_excel(path, **filters), path)
+            except Exception as e:
+                self._export_state = ("error", str(e))
+            finally:
+                store.close()
+
+        self._log(f"[结果浏览] 开始导出 {self.total} 行…")
+        threading.Thread(target=_work, daemon=True).start()
+
+    # ===== 详情 =====
+    def _show_detail(self, _event=None):
+        sel = self.tree.selection()
+        if not sel:
+            return
+        row = self.store.get(int(sel[0]))
+        if row is None:
+            return
+        win = tk.Toplevel(self.top)
+        win.title(f"{row.get('卦象名字', '')}  {row.get('excel写入时间', '')}")
+        win.geometry("640x560")
+        ybar = tk.Scrollbar(win)
+        ybar.pack(side="right", fill="y")
+        txt = tk.Text(win, wrap="word", yscrollcommand=ybar.set)
+        txt.pack(fill="both", expand=True)
+        ybar.config(command=txt.yview)
+        for k, v in row.items():
+            if k in ("卦象文本", "卦象文本简介"):
+                continue
+            txt.insert("end", f"{k}：{v}\n")
+        for k in ("卦象文本简介", "卦象文本"):
+            if row.get(k):
+                txt.insert("end", f"\n【{k}】\n{row[k]}\n")
+        txt.config(state="disabled")
+
+    def close(self):
+        try:
+            self.top.after_cancel(self._poll_id)
+        except (tk.TclError, ValueError):
+            pass
+        self.store.close()
+        self.top.destroy()
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+capture_archive.py
+
+原始采集存档：每次读到的（卦象文本, 简介文本, 触发时间, 读取时间, 窗口句柄）在解析之前追加进只增不改的二进制存档，
+解析规则改了可以拿原始文本重解析，基准/回放也能直接用真实输入。
+- <结果文件名>.captures.bin：文件头 + 各条文本的 UTF-8 字节，首尾相接；
+- <结果文件名>.captures.idx：文件头 + 定长索引项（偏移、两段长度、两个时间戳、窗口句柄、CRC32），
+  第 i 条的索引项就在 HEADER.size + i * ENTRY.size 处，按条号随机访问不用扫描；
+- 写入端先写文本再写索引项，写失败时把两边截回上一条；打开时把崩溃留下的半截索引项、文本不全的条目和孤立文本截掉；
+- 读取端（CaptureArchiveReader）把两个文件 mmap 进来，raw(i) 返回 memoryview 切片（零拷贝），get(i) 才解码。
+命令行：
+    python capture_archive.py gua_auto_results.captures            # 条数、时间范围、各窗口条数
+    python capture_archive.py gua_auto_results.captures --show 12  # 打印第 12 条（从 0 起）
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from collections import Counter, namedtuple
+from datetime import datetime
+
+MAGIC_BIN = b"GUARAWB1"
+MAGIC_IDX = b"GUARAWI1"
+VERSION = 1
+HEADER = struct.Struct("<8sII")            # 魔数、版本、索引项长度（数据文件的第三项为 0）
+# 偏移、卦象文本字节数、简介字节数、触发时间、读取时间（epoch 秒）、窗口句柄、两段文本的 CRC32
+ENTRY = struct.Struct("<QIIddQI4x")
+
+RawCapture = namedtuple("RawCapture", "full_text intro_text trigger_ts capture_ts window")
+
+
+def archive_prefix(excel_path: str) -> str:
+    """结果文件 -> 存档前缀（.bin/.idx 两个文件共用）。"""
+    return os.path.splitext(excel_path)[0] + ".captures"
+
+
+def _check_header(f, magic: bytes, entry_size: int, path: str):
+    raw = f.read(HEADER.size)
+    got_magic, version, size = HEADER.unpack(raw)
+    if got_magic != magic or version != VERSION or size != entry_size:
+        raise ValueError(f"不是可识别的采集存档：{path}")
+
+
+def _write_all(f, data: bytes):
+    """无缓冲文件的 write 可能只写了一部分：写完为止。"""
+    view = memoryview(data)
+    while view:
+        n = f.write(view)
+        if not n:
+            raise OSError("写入采集存档时没有写出任何字节")
+        view = view[n:]
+
+
+class CaptureArchive:
+    """追加写入端：多个采集线程共用一个实例（内部加锁）。"""
+
+    def __init__(self, prefix: str):
+        self.bin_path = prefix + ".bin"
+        self.idx_path = prefix + ".idx"
+        self._lock = threading.Lock()
+        self._broken = False
+        self._bin = self._open(self.bin_path, MAGIC_BIN, 0)
+        self._idx = self._open(self.idx_path, MAGIC_IDX, ENTRY.size)
+        self.count, self._end = self._recover()
+
+    @staticmethod
+    def _open(path: str, magic: bytes, entry_size: int):
+        # 不带缓冲：写失败时没有残留在缓冲区里、之后才落盘的半截数据，回滚只需截断文件
+        f = open(path, "a+b", buffering=0)
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            _write_all(f, HEADER.pack(magic, VERSION, entry_size))
+        else:
+            f.seek(0)
+            _check_header(f, magic, entry_size, path)
+        return f
+
+    def _recover(self) -> tuple:
+        """
+        截掉崩溃留下的半截索引项；文本没写全的索引项（指到 .bin 末尾之外）连同其后各项一并丢掉；
+        再截掉最后一条完整条目之后的孤立文本。返回 (条数, 数据末尾偏移)。
+        """
+        idx_size = os.path.getsize(self.idx_path)
+        bin_size = os.path.getsize(self.bin_path)
+        count = (idx_size - HEADER.size) // ENTRY.size
+        end = HEADER.size
+        while count:
+            self._idx.seek(HEADER.size + (count - 1) * ENTRY.size)
+            offset, n_full, n_intro, *_ = ENTRY.unpack(self._idx.read(ENTRY.size))
+            end = offset + n_full + n_intro
+            if end <= bin_size:
+                break
+            count -= 1
+            end = HEADER.size
+        if HEADER.size + count * ENTRY.size != idx_size:
+            self._idx.truncate(HEADER.size + count * ENTRY.size)
+        if bin_size > end:
+            self._bin.truncate(end)
+        return count, end
+
+    def append(self, full_text: str, intro_text: str, trigger_ts: float, capture_ts: float,
+               window: int = 0) -> int:
+        """
+        追加一条，返回条号（从 0 起）。先写文本再写索引项（不 fsync）。
+        写失败（磁盘满等）时把两个文件截回这条之前再抛出，后续条目的偏移仍然对齐；截断也失败则存档停用。
+        """
+        full = (full_text or "").encode("utf-8")
+        intro = (intro_text or "").encode("utf-8")
+        crc = zlib.crc32(intro, zlib.crc32(full))
+        with self._lock:
+            if self._broken:
+                raise OSError(f"采集存档已停用（之前写入失败且无法回滚）：{self.bin_path}")
+            offset = self._end
+            try:
+                _write_all(self._bin, full + intro)
+                _write_all(self._idx, ENTRY.pack(offset, len(full), len(intro), trigger_ts, capture_ts,
+                                                 window, crc))
+            except BaseException:
+                self._rollback()
+                raise
+            self._end = offset + len(full) + len(intro)
+            self.count += 1
+            return self.count - 1
+
+    def _rollback(self):
+        """把两个文件截回最后一条完整条目（调用方持锁）。"""
+        try:
+            self._bin.truncate(self._end)
+            self._idx.truncate(HEADER.size + self.count * ENTRY.size)
+        except OSError:
+            self._broken = True
+
+    def close(self):
+        with self._lock:
+            self._bin.close()
+            self._idx.close()
+
+
+class CaptureArchiveReader:
+    """只读端：mmap 两个文件；写入端仍在追加时调 refresh() 看到新条目。"""
+
+    def __init__(self, prefix: str):
+        self.bin_path = prefix + ".bin"
+        self.idx_path = prefix + ".idx"
+        self._bin_f = open(self.bin_path, "rb")
+        self._idx_f = open(self.idx_path, "rb")
+        _check_header(self._bin_f, MAGIC_BIN, 0, self.bin_path)
+        _check_header(self._idx_f, MAGIC_IDX, ENTRY.size, self.idx_path)
+        self._bin = self._idx = None
+        self.count = 0
+        self.refresh()
+
+    def refresh(self) -> int:
+        """按当前文件大小重新映射；返回条数。"""
+        self._unmap()
+        idx_size = os.path.getsize(self.idx_path)
+        self.count = max(0, (idx_size - HEADER.size) // ENTRY.size)
+        if self.count:
+            self._idx = mmap.mmap(self._idx_f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._bin = mmap.mmap(self._bin_f.fileno(), 0, access=mmap.ACCESS_READ)
+            # 写入端先写文本后写索引：索引项指到映射范围之外说明文本那边还没刷到，先不算这几条
+            while self.count:
+                offset, n_full, n_intro = self._entry(self.count - 1)[:3]
+                if offset + n_full + n_intro <= len(self._bin):
+                    break
+                self.count -= 1
+        return self.count
+
+    def _unmap(self):
+        for m in (self._bin, self._idx):
+            if m is not None:
+                m.close()
+        self._bin = self._idx = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _entry(self, i: int) -> tuple:
+        return ENTRY.unpack_from(self._idx, HEADER.size + i * ENTRY.size)
+
+    def raw(self, i: int) -> tuple:
+        """(卦象文本字节, 简介字节, 触发时间, 读取时间, 窗口句柄, crc)；文本是 mmap 上的 memoryview，不拷贝，
+        在下一次 refresh()/close() 之前用完（映射还被引用时无法关闭）。"""
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        offset, n_full, n_intro, trigger_ts, capture_ts, window, crc = self._entry(i)
+        view = memoryview(self._bin)
+        return (view[offset:offset + n_full], view[offset + n_full:offset + n_full + n_intro],
+                trigger_ts, capture_ts, window, crc)
+
+    def meta(self, i: int) -> tuple:
+        """(触发时间, 读取时间, 窗口句柄)：只读索引，不碰文本。"""
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return self._entry(i)[3:6]
+
+    def verify(self, i: int) -> bool:
+        full, intro, *_ts, crc = self.raw(i)
+        try:
+            return zlib.crc32(intro, zlib.crc32(full)) == crc
+        finally:
+            full.release()
+            intro.release()
+
+    def get(self, i: int, verify: bool = False) -> RawCapture:
+        if verify and not self.verify(i):
+            raise ValueError(f"第 {i} 条校验失败")
+        full, intro, trigger_ts, capture_ts, window, _crc = self.raw(i)
+        try:
+            return RawCapture(str(full, "utf-8"), str(intro, "utf-8"), trigger_ts, capture_ts, window)
+        finally:
+            full.release()
+            intro.release()
+
+    def __getitem__(self, i: int) -> RawCapture:
+        return self.get(i)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.get(i)
+
+    def close(self):
+        self._unmap()
+        self._bin_f.close()
+        self._idx_f.close()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="查看原始采集存档")
+    ap.add_argument("prefix", help="存档前缀（xxx.captures，也可直接给 .bin/.idx 或结果 Excel）")
+    ap.add_argument("--show", type=int, help="打印第几条（从 0 起）")
+    ap.add_argument("--verify", action="store_true", help="逐条校验 CRC")
+    args = ap.parse_args(argv)
+
+    prefix = args.prefix
+    if prefix.endswith((".bin", ".idx")):
+        prefix = prefix[:-4]
+    elif prefix.endswith(".xlsx"):
+        prefix = archive_prefix(prefix)
+    if not os.path.exists(prefix + ".idx"):
+        print(f"存档不存在：{prefix}.idx")
+        return 1
+
+    reader = CaptureArchiveReader(prefix)
+    try:
+        if args.show is not None:
+            cap = reader.get(args.show, verify=True)
+            print(f"#{args.show}  触发 {datetime.fromtimestamp(cap.trigger_ts)}  读取 {datetime.fromtimestamp(cap.capture_ts)}"
+                  f"  窗口 {cap.window:#x}")
+            print(cap.full_text)
+            print("----")
+            print(cap.intro_text)
+            return 0
+        n = len(reader)
+        print(f"共 {n} 条，数据 {os.path.getsize(reader.bin_path) / 1e6:.1f} MB")
+        if n:
+            print(f"时间范围：{datetime.fromtimestamp(reader.meta(0)[1])} ~ {datetime.fromtimestamp(reader.meta(n - 1)[1])}")
+            windows = Counter(reader.meta(i)[2] for i in range(n))
+            for w, c in windows.most_common():
+                print(f"  窗口 {w:#x}：{c} 条")
+        if args.verify:
+            bad = [i for i in range(n) if not reader.verify(i)]
+            print(f"校验：{len(bad)} 条不一致" + (f"（{bad[:10]}…）" if bad else ""))
+    finally:
+        reader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
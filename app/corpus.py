@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+corpus.py
+
+合成卦象语料（压测解析、去重、写入端用）：
+- 结果框全文：公历/农历/干支/旬空/节气行 + 卦体（hexagrams.render_body，与软件排版一致）；
+- 简介栏：“本之变；月卦身X；世身在N爻； \\n\\n神煞：……”；
+- 历法为近似推算（太阳黄经低精度公式求节气，平朔加主要修正求朔日，无中气之月为闰月），
+  与万年历偶有一两天出入，但各字段之间自洽；
+- 同一 seed 产出完全相同的序列；iter_samples 是生成器，可流式产出上百万条而不占内存；
+- 按 edge_rate 混入边界样本：初十、廿X、闰月、冒号全角/半角互换、缺简介。
+
+命令行：
+    python corpus.py --seed 1 --count 1000000 --out corpus.jsonl.gz
+每行一个 JSON：{"full_text", "intro_text", "ts", "ben", "moving", "edge"}
+"""
+import argparse
+import gzip
+import json
+import math
+import random
+import sys
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+import hexagrams as hx
+
+STEMS, BRANCHES = hx.STEMS, hx.BRANCHES
+ZODIAC = "鼠牛虎兔龙蛇马羊猴鸡狗猪"
+TERMS = ("春分", "清明", "谷雨", "立夏", "小满", "芒种", "夏至", "小暑", "大暑", "立秋", "处暑", "白露",
+         "秋分", "寒露", "霜降", "立冬", "小雪", "大雪", "冬至", "小寒", "大寒", "立春", "雨水", "惊蛰")
+EDGE_KINDS = ("初十", "廿", "闰月", "冒号", "无简介")
+WEEKDAYS = "一二三四五六日"
+_CN_NUM = "〇一二三四五六七八九十"
+_MONTH_CN = ("", "正", "二", "三", "四", "五", "六", "七", "八", "九", "十", "十一", "十二")
+
+_J2000 = datetime(2000, 1, 1, 12)
+_SYNODIC = 29.530588861
+_DAY0_INDEX = 54      # 2000-01-01 为戊午日（六十甲子序号 54）
+_DELTA_T = 69.0 / 86400.0   # 力学时与世界时之差（近年约 69 秒）
+HOUR_OFFSET = timedelta(minutes=-14)   # 时柱按北京地方平时（东经约 116.5°）起，与软件一致
+
+
+# ===== 天文近似 =====
+def _jd(dt: datetime) -> float:
+    """北京时间 -> 儒略日（世界时）。"""
+    return (dt - _J2000).total_seconds() / 86400.0 + 2451545.0 - 8.0 / 24.0
+
+
+def _from_jd(jd: float) -> datetime:
+    return _J2000 + timedelta(days=jd - 2451545.0 + 8.0 / 24.0)
+
+
+def _sun_longitude(jd: float) -> float:
+    """太阳视黄经（度），Meeus 低精度公式，误差约 0.01°。"""
+    t = (jd + _DELTA_T - 2451545.0) / 36525.0
+    l0 = 280.46646 + 36000.76983 * t + 0.0003032 * t * t
+    m = math.radians(357.52911 + 35999.05029 * t - 0.0001537 * t * t)
+    c = ((1.914602 - 0.004817 * t - 0.000014 * t * t) * math.sin(m)
+         + (0.019993 - 0.000101 * t) * math.sin(2 * m) + 0.000289 * math.sin(3 * m))
+    omega = math.radians(125.04 - 1934.136 * t)
+    return (l0 + c - 0.00569 - 0.00478 * math.sin(omega)) % 360.0
+
+
+@lru_cache(maxsize=1024)
+def _term_jd(year: int, k: int) -> float:
+    """year 年春分起第 k 个节气（0=春分 … 23=次年惊蛰）的儒略日。"""
+    jd = _jd(datetime(year, 3, 20, 12)) + k * 15.2184
+    target = k * 15.0
+    for _ in range(5):
+        diff = (target - _sun_longitude(jd) + 180.0) % 360.0 - 180.0
+        jd += diff * 365.2422 / 360.0
+    return jd
+
+
+def _term_at(dt: datetime):
+    """dt 所处的节气：(春分年, 序号 k)。"""
+    k = int(_sun_longitude(_jd(dt)) // 15) % 24
+    year = dt.year - 1 if (dt.month <= 3 and k >= 18) else dt.year
+    return year, k
+
+
+def _shift_term(year: int, k: int, n: int):
+    k += n
+    return year + k // 24, k % 24
+
+
+def _new_moon(n: int) -> float:
+    """第 n 个朔（n=0 为 2000-01-06），平朔加主要周期项。"""
+    jd = 2451550.09766 + _SYNODIC * n
+    m = math.radians(2.5534 + 29.10535670 * n)
+    mp = math.radians(201.5643 + 385.81693528 * n)
+    return jd - 0.40720 * math.sin(mp) + 0.17241 * math.sin(m) + 0.01608 * math.sin(2 * mp)
+
+
+def _local_date(jd: float) -> date:
+    return _from_jd(jd).date()
+
+
+@lru_cache(maxsize=256)
+def _lunation_month(n: int):
+    """第 n 个朔望月的 (月份, 是否闰月, 大月)：含中气 330°（雨水）者为正月，依次类推；不含中气为闰月。"""
+    start, end = _local_date(_new_moon(n)), _local_date(_new_moon(n + 1))
+    big = (end - start).days == 30
+    lam0 = _sun_longitude(_jd(datetime.combine(start, datetime.min.time())))
+    lam1 = _sun_longitude(_jd(datetime.combine(end, datetime.min.time())))
+    span = (lam1 - lam0) % 360.0
+    nxt = math.ceil(lam0 / 30.0) * 30.0
+    if (nxt - lam0) % 360.0 < span:
+        month = (int(nxt % 360.0) // 30 + 1) % 12 + 1
+        return month, False, big
+    prev_month, _leap, _big = _lunation_month(n - 1)
+    return prev_month, True, big
+
+
+@lru_cache(maxsize=4096)
+def _lunar_date(d: date):
+    """公历日期 -> (农历年, 月, 是否闰月, 日, 大月)。"""
+    noon = _jd(datetime(d.year, d.month, d.day, 12))
+    n = math.floor((noon - 2451550.09766) / _SYNODIC)
+    while _local_date(_new_moon(n)) > d:
+        n -= 1
+    while _local_date(_new_moon(n + 1)) <= d:
+        n += 1
+    month, leap, big = _lunation_month(n)
+    day = (d - _local_date(_new_moon(n))).days + 1
+    year = d.year - 1 if (month >= 10 and d.month <= 3) else d.year
+    return year, month, leap, day, big
+
+
+# ===== 干支 =====
+def _gz(idx: int) -> str:
+    return STEMS[idx % 10] + BRANCHES[idx % 12]
+
+
+def _gz_index(stem: int, branch: int) -> int:
+    return next(i for i in range(stem, 60, 10) if i % 12 == branch)
+
+
+def _xunkong(idx: int) -> str:
+    head = BRANCHES.index(_gz(idx - idx % 10)[1])
+    return BRANCHES[(head + 10) % 12] + BRANCHES[(head + 11) % 12]
+
+
+def four_pillars(dt: datetime) -> list:
+    """年/月/日/时四柱的六十甲子序号（年以立春、月以节为界，日以零点为界，时按地方平时）。"""
+    y = dt.year if _jd(dt) >= _term_jd(dt.year - 1, 21) else dt.year - 1
+    y_idx = (y - 4) % 60
+    ty, k = _term_at(dt)
+    jie = k if k % 2 else k - 1                     # 月令以“节”起算
+    m_branch = ((jie % 24 - 21) // 2 + 2) % 12
+    m_stem = ((y_idx % 5) * 2 + 2 + (m_branch - 2) % 12) % 10
+    d_idx = (_DAY0_INDEX + (dt.date() - date(2000, 1, 1)).days) % 60
+    h_branch = (((dt + HOUR_OFFSET).hour + 1) // 2) % 12
+    h_stem = ((d_idx % 5) * 2 + h_branch) % 10
+    return [y_idx, _gz_index(m_stem, m_branch), d_idx, _gz_index(h_stem, h_branch)]
+
+
+# ===== 神煞（只生成软件免费版显示的那几项）=====
+_DIRECTION = dict(zip(BRANCHES, "坎艮艮震巽巽离坤坤兑乾乾"))
+_TIANDE = dict(zip("寅卯辰巳午未申酉戌亥子丑", "丁申壬辛亥甲癸寅丙乙巳庚"))
+_YUEDE = dict(zip("寅卯辰巳午未申酉戌亥子丑", "丙甲壬庚丙甲壬庚丙甲壬庚"))
+_ZHOUGUI = dict(zip(STEMS, "丑子亥酉丑子丑午卯巳"))
+
+
+def _shensha(pillars: list) -> str:
+    yb, mb, db = (BRANCHES[p % 12] for p in pillars[:3])
+
+    def po(b):
+        o = BRANCHES[(BRANCHES.index(b) + 6) % 12]
+        return o + _DIRECTION[o]
+
+    return (f"岁破{po(yb)}，月破{po(mb)}，日破{po(db)}，天德{_TIANDE[mb]}，月德{_YUEDE[mb]}，"
+            f"昼贵{_ZHOUGUI[STEMS[pillars[2] % 10]]}……＝＝（更多神煞注册可见）")
+
+
+# ===== 文本 =====
+def _lunar_day_cn(d: int) -> str:
+    if d <= 10:
+        return "初" + _CN_NUM[d]
+    if d < 20:
+        return "十" + _CN_NUM[d - 10]
+    if d == 20:
+        return "二十"
+    if d < 30:
+        return "廿" + _CN_NUM[d - 20]
+    return "三十"
+
+
+def _term_stamp(jd: float, colon: str) -> str:
+    t = _from_jd(jd)
+    return f"{t.month}月{t.day}日{t.hour}{colon}{t.minute:02d}"
+
+
+@lru_cache(maxsize=None)
+def _body_text(ben: int, moving: int, day_stem: str) -> str:
+    """卦体只取决于 (本卦, 动爻, 日干)，至多 64×64×10 种，缓存后生成百万条也不必重复排版。"""
+    return "\n\n".join(hx.render_body(ben, moving, day_stem)) + "\n\n"
+
+
+class Sample:
+    __slots__ = ("full_text", "intro_text", "ts", "ben", "moving", "edge")
+
+    def __init__(self, full_text, intro_text, ts, ben, moving, edge):
+        self.full_text = full_text
+        self.intro_text = intro_text
+        self.ts = ts
+        self.ben = ben
+        self.moving = moving
+        self.edge = edge
+
+    def as_dict(self) -> dict:
+        return {"full_text": self.full_text, "intro_text": self.intro_text,
+                "ts": self.ts.strftime("%Y-%m-%d %H:%M"), "ben": self.ben,
+                "moving": self.moving, "edge": self.edge}
+
+
+def cast(rng: random.Random):
+    """三钱法起卦：返回 (本卦码, 动爻掩码)。老阴/老阳各 1/8，少阴/少阳各 3/8。"""
+    code = moving = 0
+    for i in range(6):
+        r = rng.random()
+        if r < 0.125:                 # 老阴：阴爻动
+            moving |= 1 << i
+        elif r < 0.5:                 # 少阳
+            code |= 1 << i
+        elif r >= 0.875:              # 老阳：阳爻动
+            code |= 1 << i
+            moving |= 1 << i
+    return code, moving
+
+
+def render(ts: datetime, ben: int, moving: int, edge: str = "") -> Sample:
+    """按给定时间与卦象生成一条样本；edge 为 EDGE_KINDS 之一时套用对应的边界写法。"""
+    pillars = four_pillars(ts)
+    ly, lm, leap, ld, big = _lunar_date(ts.date())
+    if edge == "初十":
+        ld = 10
+    elif edge == "廿":
+        ld = 21 + ts.minute % 9
+    elif edge == "闰月":
+        leap = True
+    label, colon = ("：", ":") if edge != "冒号" else (":", "：")
+
+    ty, k = _term_at(ts)
+    jy, jie = (ty, k) if k % 2 else _shift_term(ty, k, -1)
+    qy, qi = _shift_term(jy, jie, 1)
+    lunar = (f"{_gz((ly - 4) % 60)}({ZODIAC[(ly - 4) % 12]})年{'闰' if leap else ''}{_MONTH_CN[lm]}月"
+             f"{'大' if big else '小'}{_lunar_day_cn(ld)} {TERMS[k]} ")
+    head = [
+        f"公历{label} {ts.year}年{ts.month}月{ts.day}日{ts.hour:02d}{colon}{ts.minute:02d} 星期{WEEKDAYS[ts.weekday()]}",
+        f"农历{label} {lunar}",
+        f"干支{label}　" + "　".join(_gz(p) for p in pillars),
+        f"旬空{label}　" + "　".join(_xunkong(p) for p in pillars),
+        f"{TERMS[jie]}{_term_stamp(_term_jd(jy, jie), colon)}  {TERMS[qi]}{_term_stamp(_term_jd(qy, qi), colon)} ",
+    ]
+    full_text = "\n\n".join(head) + "\n\n\n\n" + _body_text(ben, moving, STEMS[pillars[2] % 10])
+
+    if edge == "无简介":
+        intro = ""
+    else:
+        b = hx.HEXAGRAMS[ben]
+        v = hx.HEXAGRAMS[ben ^ moving]
+        intro = (f"{b.short}之{v.short}；月卦身{hx.month_body(ben)}；世身在{hx.shi_body(ben)}； \n\n"
+                 f"神煞{label}{_shensha(pillars)}")
+    return Sample(full_text, intro, ts, ben, moving, edge)
+
+
+def iter_samples(seed: int = 0, count=None, start: datetime = datetime(2024, 1, 1, 8, 0),
+                 mean_gap_sec: float = 60.0, edge_rate: float = 0.05):
+    """
+    流式产出 Sample：时间从 start 起按指数分布间隔递增（精确到分钟），count=None 时无限产出。
+    同一组参数产出的序列完全一致。
+    """
+    rng = random.Random(seed)
+    ts = start.replace(second=0, microsecond=0)
+    n = 0
+    while count is None or n < count:
+        ts += timedelta(seconds=max(60.0, rng.expovariate(1.0 / mean_gap_sec)))
+        ts = ts.replace(second=0)
+        ben, moving = cast(rng)
+        edge = rng.choice(EDGE_KINDS) if rng.random() < edge_rate else ""
+        yield render(ts, ben, moving, edge)
+        n += 1
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="生成合成卦象语料（JSON Lines，可 .gz）")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--count", type=int, default=10000)
+    ap.add_argument("--start", default="2024-01-01 08:00", help="起始时间 YYYY-MM-DD HH:MM")
+    ap.add_argument("--gap-sec", type=float, default=60.0, help="平均间隔（秒）")
+    ap.add_argument("--edge-rate", type=float, default=0.05, help="边界样本比例")
+    ap.add_argument("--out", default="-", help="输出文件（.gz 结尾则压缩），- 为标准输出")
+    args = ap.parse_args(argv)
+
+    start = datetime.strptime(args.start, "%Y-%m-%d %H:%M")
+    if args.out == "-":
+        out = sys.stdout
+    elif args.out.endswith(".gz"):
+        out = gzip.open(args.out, "wt", encoding="utf-8")
+    else:
+        out = open(args.out, "w", encoding="utf-8")
+    try:
+        for s in iter_samples(args.seed, args.count, start, args.gap_sec, args.edge_rate):
+            out.write(json.dumps(s.as_dict(), ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+diagnostics.py
+
+解析失败遥测：
+- 按类别计数：empty_text / incomplete / too_few_lines / 其它解析异常，
+  以及“能写入但字段没解析出来”的软失败（gl_miss / nl_miss / gz_miss / xk_miss / tline_miss /
+  intro_empty / intro_name_miss / body_miss，见 io_parse.diagnose_row）；
+- 每个类别用蓄水池抽样保留最多 SAMPLES_PER_CATEGORY 条原始文本；
+- flush() 把计数、触发→成行转化率和样本写到 <结果文件名>.parse_failures.json，
+  这些样本可直接并入解析基准语料。
+"""
+import json
+import os
+import random
+import threading
+from datetime import datetime
+
+from io_parse import diagnose_row
+from metrics import counters
+
+
+class ParseTelemetry:
+    SAMPLES_PER_CATEGORY = 20
+    HARD_FAILURES = ("empty_text", "incomplete")   # 读到的文本本身不可用
+
+    def __init__(self, seed=None):
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.path = ""
+        self.reset()
+
+    def reset(self, path: str = ""):
+        with self._lock:
+            self.path = path
+            self.triggers = 0
+            self.rows = 0
+            self.categories = {}
+            self._samples = {}
+
+    def record_trigger(self):
+        with self._lock:
+            self.triggers += 1
+
+    def record_failure(self, category: str, full_text: str, intro_text: str = ""):
+        """读取/解析阶段的硬失败（本次尝试没有产出行）。"""
+        if category not in self.HARD_FAILURES:
+            counters.incr("parse_failed")
+        counters.incr(f"parse:{category}")
+        with self._lock:
+            self._sample(category, full_text, intro_text)
+
+    def record_row(self, row: dict, full_text: str, intro_text: str = ""):
+        """成功产出一行；同时检查字段级的软失败。"""
+        misses = diagnose_row(row)
+        for cat in misses:
+            counters.incr(f"parse:{cat}")
+        with self._lock:
+            self.rows += 1
+            for cat in misses:
+                self._sample(cat, full_text, intro_text)
+
+    def _sample(self, category: str, full_text: str, intro_text: str):
+        """蓄水池抽样（Algorithm R），调用方持锁。"""
+        n = self.categories.get(category, 0) + 1
+        self.categories[category] = n
+        bucket = self._samples.setdefault(category, [])
+        item = {"time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "full_text": full_text or "", "intro_text": intro_text or ""}
+        if len(bucket) < self.SAMPLES_PER_CATEGORY:
+            bucket.append(item)
+        else:
+            j = self._rng.randrange(n)
+            if j < self.SAMPLES_PER_CATEGORY:
+                bucket[j] = item
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "triggers": self.triggers,
+                "rows": self.rows,
+                "rows_per_trigger": round(self.rows / self.triggers, 4) if self.triggers else None,
+                "categories": dict(self.categories),
+                "samples": {k: list(v) for k, v in self._samples.items()},
+            }
+
+    def flush(self):
+        """把当前统计与样本写到 self.path（未设置路径或没有任何数据时跳过）。"""
+        if not self.path:
+            return
+        data = self.summary()
+        if not data["triggers"] and not data["categories"]:
+            return
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"写入解析诊断失败：{e}")
+
+
+parse_telemetry = ParseTelemetry()
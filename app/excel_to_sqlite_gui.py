@@ -7,6 +7,8 @@ excel_to_sqlite_gui.py
 - 选择主列与参数列（可调整顺序）；
 - 每次导入前清空表；
 - 主列不允许重复，如重复则仅保留最后一条；
+- 主列是卦名（“本之变”，简称/全称/繁体/带空白均可）时统一存为规范写法“鼎之恒”，
+  不同写法指向同一组合也按重复处理；认不出的名字原样保存；
 - 写入 SQLite 数据库（伪装后缀 .gdbx）；
 - 表名 gui_para(name TEXT, param_order INTEGER, param_value TEXT)。
 """
@@ -18,6 +20,8 @@ import sqlite3
 import os
 import time
 
+import hexagrams
+
 DEFAULT_DB_EXT = ".gdbx"  # 可改为伪装后缀
 
 
@@ -196,6 +200,8 @@ class App:
 
             rows_written = 0
             null_count = 0
+            renamed = 0
+            unknown = []
 
             # 小工具：把单元格值转换为将要入库的值（空 -> None）
             def cell_to_db_value(v):
@@ -212,6 +218,13 @@ class App:
                 if name_val in (None, ""):
                     # 主键标识为空，无法建唯一占位，跳过整行
                     continue
+                key = hexagrams.pair_key(name_val)
+                if key is None:
+                    unknown.append(name_val)
+                else:
+                    canonical = hexagrams.pair_name(key)
+                    renamed += canonical != name_val
+                    name_val = canonical
 
                 # 先删除旧记录再插入（保证主列唯一、只保留最后一次）
                 cur.execute("DELETE FROM gui_para WHERE name=?", (name_val,))
@@ -230,6 +243,11 @@ class App:
             conn.commit()
             conn.close()
             self.log(f"导入完成：共写入 {rows_written} 条记录（包含 NULL 占位 {null_count} 条）到 {db_path}")
+            if renamed:
+                self.log(f"卦名统一为规范写法：{renamed} 个")
+            if unknown:
+                sample = "、".join(unknown[:10]) + ("…" if len(unknown) > 10 else "")
+                self.log(f"未识别为卦名、按原样保存：{len(unknown)} 个（{sample}）")
             messagebox.showinfo(
                 "完成",
                 f"导入完成：共写入 {rows_written} 条（展开后）。\n其中空值占位（NULL）{null_count} 条。\n文件：{db_path}"
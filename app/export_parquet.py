@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+export_parquet.py
+
+结果历史导出为按月分区的 Parquet（离线分析用，需要 pyarrow；主程序不依赖它）：
+    python export_parquet.py gua_auto_results.xlsx out_dir
+    python export_parquet.py gua_auto_results.results.db out_dir --from 2025-10-01 --to 2025-10-31
+- 数据从结果库按 id 顺序流式读出（给的是 Excel 时先按需回填），每攒够 ROW_GROUP 行写一个行组，内存与总行数无关；
+- 目录按写入月份分区：out_dir/month=2025-10/part-0.parquet（Hive 风格，pandas/pyarrow 读整个目录即可）；
+  每次只替换本次导出涉及的月份目录，其余月份不动，可按日期范围增量刷新（范围自动扩到整月，分区总是完整的）；
+- 列类型：公历年月日/星期、农历月日、序号、世爻/应爻为整数，卦码为 uint8，excel写入时间为时间戳；
+  干支/旬空/卦名等取值有限的文本列用字典编码（pandas 读出即 category），卦象文本等长文本用 zstd 压缩。
+读回：pandas.read_parquet("out_dir")，或加 filters=[("month", "=", "2025-10")] 只读某月。
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+from store import ResultsStore, results_db_path
+
+ROW_GROUP = 10000         # 每个行组的行数（也是每个月份缓冲的上限，行里带整段卦象文本）
+PARTITION_KEY = "month"
+# 列名 -> pyarrow 整数类型名
+INT_COLS = {
+    "序号": "int64",
+    "公历-年": "int16", "公历-月": "int8", "公历-日": "int8", "公历-星期": "int8",
+    "农历-月": "int8", "农历-日": "int8",
+    "世爻": "int8", "应爻": "int8",
+    "本卦码": "uint8", "变卦码": "uint8", "动爻码": "uint8", "宫位码": "uint8",
+}
+TIME_COLS = ("excel写入时间",)
+# 几乎每行都不同的长文本/摘要：不做字典编码
+PLAIN_TEXT_COLS = ("卦象文本", "卦象文本简介", "哈希值")
+
+
+def _to_int(v):
+    if v is None or v == "":
+        return None
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        try:
+            return int(float(v))
+        except (TypeError, ValueError):
+            return None
+
+
+def _to_time(v):
+    try:
+        return datetime.strptime(str(v)[:19], "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def _to_text(v):
+    return None if v is None or v == "" else str(v)
+
+
+class MonthlyParquetWriter:
+    """按月份分区写 Parquet：每个月份一个 ParquetWriter，行缓冲满 ROW_GROUP 行即写成一个行组。"""
+
+    def __init__(self, out_dir: str, headers: list):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.out_dir = out_dir
+        self.stage_dir = out_dir.rstrip("/\\") + ".exporting"
+        shutil.rmtree(self.stage_dir, ignore_errors=True)      # 上次中断留下的半成品
+        self.headers = headers
+        fields, self._convert = [], []
+        for name in headers:
+            if name in INT_COLS:
+                fields.append(pa.field(name, getattr(pa, INT_COLS[name])()))
+                self._convert.append(_to_int)
+            elif name in TIME_COLS:
+                fields.append(pa.field(name, pa.timestamp("s")))
+                self._convert.append(_to_time)
+            elif name in PLAIN_TEXT_COLS:
+                fields.append(pa.field(name, pa.string()))
+                self._convert.append(_to_text)
+            else:
+                fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+                self._convert.append(_to_text)
+        self.schema = pa.schema(fields)
+        self._writers = {}
+        self._buffers = {}
+        self.rows = 0
+
+    def add(self, row: dict):
+        month = str(row.get("excel写入时间") or "")[:7] or "unknown"
+        buf = self._buffers.setdefault(month, [])
+        buf.append(row)
+        self.rows += 1
+        if len(buf) >= ROW_GROUP:
+            self._flush(month)
+
+    def _flush(self, month: str):
+        import pyarrow.parquet as pq
+
+        rows = self._buffers.pop(month, None)
+        if not rows:
+            return
+        pa = self.pa
+        arrays = []
+        for name, conv, field in zip(self.headers, self._convert, self.schema):
+            values = [conv(r.get(name)) for r in rows]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+        writer = self._writers.get(month)
+        if writer is None:
+            part_dir = os.path.join(self.stage_dir, f"{PARTITION_KEY}={month}")
+            os.makedirs(part_dir, exist_ok=True)
+            writer = pq.ParquetWriter(
+                os.path.join(part_dir, "part-0.parquet"), self.schema, compression="zstd",
+                use_dictionary=[f.name for f in self.schema if pa.types.is_dictionary(f.type)
+                                or f.name in INT_COLS])
+            self._writers[month] = writer
+        writer.write_table(table, row_group_size=ROW_GROUP)
+
+    def close(self) -> list:
+        """写完剩余缓冲并把各月份目录换进 out_dir；返回导出的月份列表。"""
+        for month in list(self._buffers):
+            self._flush(month)
+        for writer in self._writers.values():
+            writer.close()
+        months = sorted(self._writers)
+        os.makedirs(self.out_dir, exist_ok=True)
+        for month in months:
+            name = f"{PARTITION_KEY}={month}"
+            dst = os.path.join(self.out_dir, name)
+            if os.path.exists(dst):
+                shutil.rmtree(dst)
+            os.replace(os.path.join(self.stage_dir, name), dst)
+        shutil.rmtree(self.stage_dir, ignore_errors=True)
+        return months
+
+    def abort(self):
+        for writer in self._writers.values():
+            try:
+                writer.close()
+            except Exception:
+                pass
+        shutil.rmtree(self.stage_dir, ignore_errors=True)
+
+
+def export(store: ResultsStore, out_dir: str, date_from: str = "", date_to: str = "") -> tuple:
+    """(行数, 月份列表)。"""
+    # 月份目录整个替换，所以日期范围扩到整月；按字符串比较，“-31”对小月也能覆盖到月底
+    filters = {"date_from": date_from[:7] + "-01" if date_from else "",
+               "date_to": date_to[:7] + "-31" if date_to else ""}
+    writer = MonthlyParquetWriter(out_dir, store.export_headers(**filters))
+    try:
+        for row in store.iter_rows(**filters):
+            writer.add(row)
+        months = writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.rows, months
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="结果历史导出为按月分区的 Parquet")
+    ap.add_argument("path", help="结果 Excel（自动找同名 .results.db，必要时先从 Excel 回填）或结果库 .db")
+    ap.add_argument("out_dir", help="输出目录（其下按 month=YYYY-MM 分子目录）")
+    ap.add_argument("--from", dest="date_from", default="", help="起始日期 YYYY-MM-DD")
+    ap.add_argument("--to", dest="date_to", default="", help="截止日期 YYYY-MM-DD")
+    args = ap.parse_args(argv)
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("需要 pyarrow：pip install pyarrow")
+        return 1
+
+    if args.path.endswith(".db"):
+        if not os.path.exists(args.path):
+            print(f"结果库不存在：{args.path}")
+            return 1
+        store = ResultsStore(args.path)
+    else:
+        store = ResultsStore(results_db_path(args.path))
+        if store.needs_sync(args.path):
+            print(f"从 Excel 回填结果库：新增 {store.sync_from_excel(args.path)} 行")
+    try:
+        t0 = time.perf_counter()
+        rows, months = export(store, args.out_dir, date_from=args.date_from, date_to=args.date_to)
+    finally:
+        store.close()
+    print(f"导出 {rows} 行，{len(months)} 个月份（{', '.join(months)}），用时 {time.perf_counter() - t0:.1f} s"
+          f" -> {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
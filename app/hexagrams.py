@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+hexagrams.py
+
+六爻卦象基础表（纯数据 + 推算，不依赖界面/窗口）：
+- 卦码：6 位整数，第 1 爻（初爻）为最低位，阳爻为 1；下卦 = 低 3 位，上卦 = 高 3 位；
+- HEXAGRAMS[卦码]：64 卦（卦名简称/全称、上下卦、所属宫、世代、世应位置、宫五行）；
+  反查：BY_SHORT / BY_FULL / BY_PALACE_CODE，code_of_name、code_from_yinyang；
+- 卦名规范化：NAME_INDEX（单卦各种写法）、PAIR_INDEX / pair_key（“本之变” -> 0..4095 组合键）；
+- 京房八宫：本宫→一世…五世→游魂→归魂；
+- 纳甲、六亲、六神、伏神，以及与软件界面一致的卦体文本排版（render_body）。
+"""
+import re
+
+# ===== 八卦：值 = 初爻 | 二爻<<1 | 三爻<<2 =====
+TRIGRAM_BITS = {"坤": 0, "震": 1, "坎": 2, "兑": 3, "艮": 4, "离": 5, "巽": 6, "乾": 7}
+TRIGRAMS = {v: k for k, v in TRIGRAM_BITS.items()}
+NATURE = {"乾": "天", "兑": "泽", "离": "火", "震": "雷", "巽": "风", "坎": "水", "艮": "山", "坤": "地"}
+TRIGRAM_ELEMENT = {"乾": "金", "兑": "金", "离": "火", "震": "木", "巽": "木", "坎": "水", "艮": "土", "坤": "土"}
+
+STEMS = "甲乙丙丁戊己庚辛壬癸"
+BRANCHES = "子丑寅卯辰巳午未申酉戌亥"
+BRANCH_ELEMENT = dict(zip(BRANCHES, "水土木木土火火土金金土水"))
+
+# 纳甲：(内卦天干, 外卦天干, 内卦三爻地支, 外卦三爻地支)，地支自下而上
+NAJIA = {
+    "乾": ("甲", "壬", "子寅辰", "午申戌"),
+    "坤": ("乙", "癸", "未巳卯", "丑亥酉"),
+    "震": ("庚", "庚", "子寅辰", "午申戌"),
+    "巽": ("辛", "辛", "丑亥酉", "未巳卯"),
+    "坎": ("戊", "戊", "寅辰午", "申戌子"),
+    "离": ("己", "己", "卯丑亥", "酉未巳"),
+    "艮": ("丙", "丙", "辰午申", "戌子寅"),
+    "兑": ("丁", "丁", "巳卯丑", "亥酉未"),
+}
+
+# 五行生克
+_GENERATES = {"木": "火", "火": "土", "土": "金", "金": "水", "水": "木"}
+_OVERCOMES = {"木": "土", "土": "水", "水": "火", "火": "金", "金": "木"}
+LIUQIN = ("父母", "兄弟", "子孙", "妻财", "官鬼")
+
+LIUSHEN = ("青龙", "朱雀", "勾陈", "螣蛇", "白虎", "玄武")
+_LIUSHEN_START = {"甲": 0, "乙": 0, "丙": 1, "丁": 1, "戊": 2, "己": 3, "庚": 4, "辛": 4, "壬": 5, "癸": 5}
+
+GENERATIONS = ("六世", "一世", "二世", "三世", "四世", "五世", "游魂", "归魂")   # 下标即世代码
+_SHI_LINE = (6, 1, 2, 3, 4, 5, 4, 3)
+PALACE_ORDER = ("乾", "兑", "离", "震", "巽", "坎", "艮", "坤")
+
+# 文王卦序：(简称, 上卦, 下卦)
+KING_WEN = (
+    ("乾", "乾", "乾"), ("坤", "坤", "坤"), ("屯", "坎", "震"), ("蒙", "艮", "坎"),
+    ("需", "坎", "乾"), ("讼", "乾", "坎"), ("师", "坤", "坎"), ("比", "坎", "坤"),
+    ("小畜", "巽", "乾"), ("履", "乾", "兑"), ("泰", "坤", "乾"), ("否", "乾", "坤"),
+    ("同人", "乾", "离"), ("大有", "离", "乾"), ("谦", "坤", "艮"), ("豫", "震", "坤"),
+    ("随", "兑", "震"), ("蛊", "艮", "巽"), ("临", "坤", "兑"), ("观", "巽", "坤"),
+    ("噬嗑", "离", "震"), ("贲", "艮", "离"), ("剥", "艮", "坤"), ("复", "坤", "震"),
+    ("无妄", "乾", "震"), ("大畜", "艮", "乾"), ("颐", "艮", "震"), ("大过", "兑", "巽"),
+    ("坎", "坎", "坎"), ("离", "离", "离"), ("咸", "兑", "艮"), ("恒", "震", "巽"),
+    ("遁", "乾", "艮"), ("大壮", "震", "乾"), ("晋", "离", "坤"), ("明夷", "坤", "离"),
+    ("家人", "巽", "离"), ("睽", "离", "兑"), ("蹇", "坎", "艮"), ("解", "震", "坎"),
+    ("损", "艮", "兑"), ("益", "巽", "震"), ("夬", "兑", "乾"), ("姤", "乾", "巽"),
+    ("萃", "兑", "坤"), ("升", "坤", "巽"), ("困", "兑", "坎"), ("井", "坎", "巽"),
+    ("革", "兑", "离"), ("鼎", "离", "巽"), ("震", "震", "震"), ("艮", "艮", "艮"),
+    ("渐", "巽", "艮"), ("归妹", "震", "兑"), ("丰", "震", "离"), ("旅", "离", "艮"),
+    ("巽", "巽", "巽"), ("兑", "兑", "兑"), ("涣", "巽", "坎"), ("节", "坎", "兑"),
+    ("中孚", "巽", "兑"), ("小过", "震", "艮"), ("既济", "坎", "离"), ("未济", "离", "坎"),
+)
+
+
+def code_of(upper: str, lower: str) -> int:
+    return TRIGRAM_BITS[lower] | (TRIGRAM_BITS[upper] << 3)
+
+
+def line_is_yang(code: int, line: int) -> bool:
+    """line 为 1..6（初爻为 1）。"""
+    return bool((code >> (line - 1)) & 1)
+
+
+class Hexagram:
+    __slots__ = ("code", "number", "short", "full", "upper", "lower",
+                 "palace", "generation", "shi", "ying", "element")
+
+    def __init__(self, code, number, short, upper, lower, palace, generation):
+        self.code = code
+        self.number = number                  # 文王卦序 1..64
+        self.short = short                    # 简称：鼎
+        self.full = (f"{upper}为{NATURE[upper]}" if upper == lower
+                     else f"{NATURE[upper]}{NATURE[lower]}{short}")   # 全称：火风鼎
+        self.upper = upper
+        self.lower = lower
+        self.palace = palace                  # 所属宫（八卦名）
+        self.generation = generation          # 世代码：0 本宫(六世) 1..5 一世..五世 6 游魂 7 归魂
+        self.shi = _SHI_LINE[generation]
+        self.ying = self.shi - 3 if self.shi > 3 else self.shi + 3
+        self.element = TRIGRAM_ELEMENT[palace]
+
+    @property
+    def palace_code(self) -> int:
+        """宫位码（6 位）：高 3 位为宫在 PALACE_ORDER 中的序号，低 3 位为世代码。"""
+        return (PALACE_ORDER.index(self.palace) << 3) | self.generation
+
+    @property
+    def label(self) -> str:
+        """界面上卦名后的方括号内容，如“离宫二世卦”。"""
+        return f"{self.palace}宫{GENERATIONS[self.generation]}卦"
+
+    def __repr__(self):
+        return f"Hexagram({self.full}, {self.label})"
+
+
+def _build_palaces() -> dict:
+    """京房八宫：卦码 -> (宫, 世代码)。"""
+    out = {}
+    for palace in PALACE_ORDER:
+        t = TRIGRAM_BITS[palace]
+        code = t | (t << 3)
+        out[code] = (palace, 0)
+        for k in range(1, 6):
+            code ^= 1 << (k - 1)
+            out[code] = (palace, k)
+        youhun = code ^ (1 << 3)                      # 五世卦第四爻复原
+        out[youhun] = (palace, 6)
+        out[(youhun & ~0b111) | t] = (palace, 7)     # 内卦复原为本宫卦
+    return out
+
+
+def _build_table():
+    palaces = _build_palaces()
+    table = [None] * 64
+    for number, (short, upper, lower) in enumerate(KING_WEN, 1):
+        code = code_of(upper, lower)
+        palace, gen = palaces[code]
+        table[code] = Hexagram(code, number, short, upper, lower, palace, gen)
+    return tuple(table)
+
+
+HEXAGRAMS = _build_table()
+BY_SHORT = {h.short: h for h in HEXAGRAMS}
+BY_FULL = {h.full: h for h in HEXAGRAMS}
+PURE = {h.palace: h for h in HEXAGRAMS if h.generation == 0}
+BY_PALACE_CODE = {h.palace_code: h for h in HEXAGRAMS}
+
+
+# ===== 卦名规范化：各种写法 -> 卦码；“本之变” -> 组合键 =====
+PAIR_COUNT = 64 * 64
+# 繁体/异体 -> 简体（只列卦名里写法不同的字）
+_VARIANTS = str.maketrans("遯無濟隨蠱臨觀剝復頤過離晉損漸歸豐兌渙節為風澤師訟謙賁壯蹇睽",
+                          "遁无济随蛊临观剥复颐过离晋损渐归丰兑涣节为风泽师讼谦贲壮蹇睽")
+_NAME_NOISE = re.compile(r"[\s　]+|[\[【(（].*?[\]】)）]|卦(?=之|$)")
+
+
+def normalize_name(name: str) -> str:
+    """去空白（含全角空格）、去方括号/括号注释（如“[离宫二世卦]”）、繁体转简体。"""
+    return _NAME_NOISE.sub("", str(name or "")).translate(_VARIANTS)
+
+
+# 单卦写法：简称（鼎、中孚）、全称（火风鼎、离为火）
+NAME_INDEX = {**{h.short: h.code for h in HEXAGRAMS}, **{h.full: h.code for h in HEXAGRAMS}}
+# 组合写法：简称/全称两两组合“本之变”，共 128×128 种 -> 组合键 本卦码*64+变卦码
+PAIR_INDEX = {f"{a}之{b}": ca * 64 + cb for a, ca in NAME_INDEX.items() for b, cb in NAME_INDEX.items()}
+
+
+def code_of_name(name: str):
+    """简称（鼎）或全称（火风鼎），容许空白/繁体 -> 卦码；不认识返回 None。"""
+    code = NAME_INDEX.get(name)
+    return code if code is not None else NAME_INDEX.get(normalize_name(name))
+
+
+def pair_key(name: str):
+    """
+    “本卦之变卦”（简称/全称任意组合，容许空白/繁体）-> 组合键 本卦码*64+变卦码；
+    不带“之”的单个卦名视为静卦（本=变）。不认识返回 None。
+    """
+    key = PAIR_INDEX.get(name)
+    if key is not None:
+        return key
+    name = normalize_name(name)
+    key = PAIR_INDEX.get(name)
+    if key is not None:
+        return key
+    ben, sep, bian = name.partition("之")
+    ca = NAME_INDEX.get(ben)
+    cb = NAME_INDEX.get(bian) if sep else ca
+    return None if ca is None or cb is None else ca * 64 + cb
+
+
+def pair_name(key: int) -> str:
+    """组合键 -> 规范写法“鼎之恒”（与界面简介里的卦象名字一致）。"""
+    return f"{HEXAGRAMS[key >> 6].short}之{HEXAGRAMS[key & 63].short}"
+
+
+def code_from_yinyang(yy: str):
+    """“阴阳阳阳阴阳”（初爻→上爻）-> 卦码；长度不是 6 或含其它字符返回 None。"""
+    if len(yy) != 6:
+        return None
+    code = 0
+    for i, ch in enumerate(yy):
+        if ch == "阳":
+            code |= 1 << i
+        elif ch != "阴":
+            return None
+    return code
+
+
+# ===== 纳甲 / 六亲 / 六神 / 伏神 =====
+def najia(code: int) -> list:
+    """自下而上 6 个 (天干, 地支, 五行)。"""
+    h = HEXAGRAMS[code]
+    lo_stem, _, lo_br, _ = NAJIA[h.lower]
+    _, up_stem, _, up_br = NAJIA[h.upper]
+    lines = [(lo_stem, b) for b in lo_br] + [(up_stem, b) for b in up_br]
+    return [(s, b, BRANCH_ELEMENT[b]) for s, b in lines]
+
+
+def liuqin(palace_element: str, element: str) -> str:
+    if element == palace_element:
+        return "兄弟"
+    if _GENERATES[palace_element] == element:
+        return "子孙"
+    if _GENERATES[element] == palace_element:
+        return "父母"
+    if _OVERCOMES[palace_element] == element:
+        return "妻财"
+    return "官鬼"
+
+
+def liushen(day_stem: str) -> list:
+    """自下而上 6 个六神。"""
+    start = _LIUSHEN_START[day_stem]
+    return [LIUSHEN[(start + i) % 6] for i in range(6)]
+
+
+def fushen(code: int) -> dict:
+    """本卦缺失的六亲从本宫纯卦同位取出：{爻位(1..6): '父母己卯木'}。"""
+    h = HEXAGRAMS[code]
+    present = {liuqin(h.element, e) for _s, _b, e in najia(code)}
+    out = {}
+    for i, (s, b, e) in enumerate(najia(PURE[h.palace].code), 1):
+        rel = liuqin(h.element, e)
+        if rel not in present:
+            out[i] = f"{rel}{s}{b}{e}"
+    return out
+
+
+# ===== 界面排版 =====
+YANG_SYMBOL = "▆▆▆▆▆"
+YIN_SYMBOL = "▆▆　▆▆"
+MOVING_MARK = {True: "Ｏ→", False: "Ｘ→"}    # 阳动/阴动
+_SP = "　"
+
+
+def render_body(ben_code: int, moving_mask: int, day_stem: str) -> list:
+    """
+    生成与软件结果框一致的卦体各行（不含空行）：表头、六爻（自上而下）、页脚。
+    moving_mask 的第 i 位为 1 表示第 i+1 爻发动；为 0 时是静卦（只有本卦）。
+    """
+    ben = HEXAGRAMS[ben_code]
+    moving = moving_mask & 0x3F
+    bian = HEXAGRAMS[ben_code ^ moving] if moving else None
+    shen = liushen(day_stem)
+    fu = fushen(ben_code)
+    ben_lines = najia(ben_code)
+    bian_lines = najia(bian.code) if bian else None
+
+    ben_title = f"{ben.full}[{ben.label}]"
+    if bian:
+        header = (f"六神{_SP * 2}伏神{_SP * 2}" + ben_title.ljust(15, _SP)
+                  + f"{bian.full}[{bian.label}]".ljust(11, _SP))
+    else:
+        header = f"六神{_SP * 2}伏神{_SP * 2}" + ben_title.ljust(14, _SP)
+
+    def _mark(h, line):
+        return "世" if h.shi == line else "应" if h.ying == line else _SP
+
+    def _desc(h_lines, line):
+        s, b, e = h_lines[line - 1]
+        return f"{liuqin(ben.element, e)}{s}{b}{e}"
+
+    rows = [header]
+    for line in range(6, 0, -1):
+        yang = line_is_yang(ben_code, line)
+        row = (shen[line - 1] + _SP + fu.get(line, _SP * 5)
+               + (YANG_SYMBOL if yang else YIN_SYMBOL) + _desc(ben_lines, line) + _mark(ben, line))
+        if bian:
+            moves = (moving >> (line - 1)) & 1
+            row += (MOVING_MARK[yang] if moves else _SP * 2) + _SP
+            row += (YANG_SYMBOL if line_is_yang(bian.code, line) else YIN_SYMBOL)
+            row += _desc(bian_lines, line) + _mark(bian, line) + _SP
+        else:
+            row += _SP * 3
+        rows.append(row)
+    if bian:
+        rows.append(_SP * 9 + "[本卦]" + _SP * 11 + "[变卦]" + _SP * 6)
+    else:
+        rows.append(_SP * 9 + "[本卦]" + _SP * 9)
+    return rows
+
+
+# ===== 简介栏 =====
+_SHISHEN_POS = {"子": "一", "午": "一", "丑": "二", "未": "二", "寅": "三", "申": "三",
+                "卯": "四", "酉": "四", "辰": "五", "戌": "五", "巳": "六", "亥": "六"}
+
+
+def month_body(code: int) -> str:
+    """月卦身：阳世从子起、阴世从午起，自初爻数到世爻。"""
+    h = HEXAGRAMS[code]
+    start = 0 if line_is_yang(code, h.shi) else 6
+    return BRANCHES[(start + h.shi - 1) % 12]
+
+
+def shi_body(code: int) -> str:
+    """世身：按世爻地支定位（子午一、丑未二……巳亥六），返回“六爻”之类。"""
+    h = HEXAGRAMS[code]
+    return _SHISHEN_POS[najia(code)[h.shi - 1][1]] + "爻"
@@ -5,22 +5,33 @@ import time
 import hashlib
 from typing import Optional
 from datetime import datetime
-import pandas as pd
+
+import hexagrams
+from metrics import metrics
 
 
 class ExcelWriteResult:
-    """保存写入结果：兼容布尔语义，同时带回整行快照供日志展示。"""
+    """保存写入结果：兼容布尔语义，同时带回整行快照供日志展示，以及保存后的完整表头。"""
 
-    __slots__ = ("written", "snapshot")
+    __slots__ = ("written", "snapshot", "headers")
 
-    def __init__(self, written: bool, snapshot: Optional[dict]):
+    def __init__(self, written: bool, snapshot: Optional[dict], headers: Optional[tuple] = None):
         self.written = bool(written)
         self.snapshot = snapshot
+        self.headers = headers
 
     def __bool__(self) -> bool:
         return self.written
 
 
+class ParseError(ValueError):
+    """解析失败；category 用于失败分类统计（如 too_few_lines）。"""
+
+    def __init__(self, message: str, category: str):
+        super().__init__(message)
+        self.category = category
+
+
 # ===== 统一列顺序（不存在文件时按此建表；存在则按列名对齐）=====
 COL_ORDER = [
     "序号", "excel写入时间", "哈希值",
@@ -32,6 +43,12 @@ COL_ORDER = [
     "月卦身", "世身", "八节", "神煞",
     "卦象文本", "卦象文本简介",
     "卦象名字", "本卦简称", "变卦简称",
+    "本卦全名", "本卦宫位", "变卦全名", "变卦宫位",
+    "本卦爻象", "变卦爻象", "世爻", "应爻", "动爻",
+    "本卦码", "变卦码", "动爻码", "宫位码",
+    *[f"{pos}-{k}" for pos in ("初爻", "二爻", "三爻", "四爻", "五爻", "上爻")
+      for k in ("六神", "伏神", "本", "变")],
+    "来源窗口",
 ]
 
 # ===== 工具 =====
@@ -84,7 +101,7 @@ def _parse_first_block(full_text: str) -> dict:
     lines = [ln.rstrip() for ln in full_text.replace("\r\n", "\n").split("\n")]
     non_empty = [ln for ln in lines if ln.strip()]
     if len(non_empty) < 5:
-        raise ValueError("文本格式不完整：关键行不足5行")
+        raise ParseError("文本格式不完整：关键行不足5行", "too_few_lines")
     line_g  = non_empty[0]  # 公历行（含“公历：”）
     line_n  = non_empty[1]  # 农历行（含“农历：”）
     line_gz = non_empty[2]  # 干支行
@@ -177,6 +194,81 @@ def _parse_intro(intro_text: str):
         "intro_all": intro_all
     }
 
+# ===== 卦体（六神/伏神/六爻/世应/动爻/变爻）=====
+DEDUP_SCAN_ROWS = 500      # 写入去重时从表尾往上找“上一条”的最大行数
+
+LINE_NAMES = ("初爻", "二爻", "三爻", "四爻", "五爻", "上爻")
+_YANG = "▆▆▆▆▆"
+_MOVING = {"Ｏ": "Ｏ", "O": "Ｏ", "○": "Ｏ", "Ｘ": "Ｘ", "X": "Ｘ", "×": "Ｘ"}
+_GZ_WX = r"(?:父母|兄弟|子孙|妻财|官鬼)[甲乙丙丁戊己庚辛壬癸][子丑寅卯辰巳午未申酉戌亥][金木水火土]"
+_TITLE_RE = re.compile(r"([^\s\[\]]+)\[([^\]]+)\]")
+_YAO_RE = re.compile(
+    r"^(?P<liushen>青龙|朱雀|勾陈|螣蛇|白虎|玄武)[\s]*"
+    rf"(?P<fushen>{_GZ_WX})?[\s]*"
+    r"(?P<sym>▆▆▆▆▆|▆▆　▆▆)"
+    rf"(?P<ben>{_GZ_WX})(?P<shiying>[世应])?[\s]*"
+    r"(?:(?P<moving>[ＯＸOX○×])→)?[\s]*"
+    rf"(?:(?P<bsym>▆▆▆▆▆|▆▆　▆▆)(?P<bian>{_GZ_WX})(?P<bshiying>[世应])?)?"
+)
+
+
+def _parse_body(full_text: str) -> dict:
+    """
+    解析五行表头之后的卦体，直接产出表格列：
+      标题行“六神　　伏神　　火风鼎[离宫二世卦]　…雷风恒[震宫三世卦]” → 本卦/变卦全名、宫位；
+      其后 6 行自上爻到初爻 → 各爻六神、伏神、本爻（六亲干支五行+世应）、变爻（动爻标记+变爻+世应），
+      以及汇总列 本卦/变卦爻象（初爻→上爻的阴阳）、世爻、应爻、动爻（爻位，逗号分隔）；
+      整数列（见 hexagrams）：本卦码、变卦码（= 本卦码 ^ 动爻码，静卦即本卦码）、动爻码（第 n 爻动则第 n-1 位为 1）、
+      宫位码（本卦的宫序<<3 | 世代码），分组/关联/位运算查询（如“三爻动”：动爻码 & 4）直接用整数。
+    任何一处对不上都返回全空列（与表头解析一样静默，诊断里记 body_miss）。
+    """
+    at = full_text.find("六神")
+    if at < 0:
+        return dict(_EMPTY_BODY_COLUMNS)
+    lines = [ln.strip() for ln in full_text[at:].splitlines() if ln and not ln.isspace()]
+    titles = _TITLE_RE.findall(lines[0])
+    if len(lines) < 7 or not titles:
+        return dict(_EMPTY_BODY_COLUMNS)
+    bian_full, bian_palace = titles[1] if len(titles) > 1 else ("", "")
+    cols = {"本卦全名": titles[0][0], "本卦宫位": titles[0][1], "变卦全名": bian_full, "变卦宫位": bian_palace,
+            "本卦爻象": "", "变卦爻象": "", "世爻": "", "应爻": "", "动爻": ""}
+    ben_yy, bian_yy, moving = [], [], []
+    code = mask = 0
+    for i, pos in enumerate(LINE_NAMES):
+        m = _YAO_RE.match(lines[6 - i])
+        if not m:
+            return dict(_EMPTY_BODY_COLUMNS)
+        liushen, fushen, sym, ben, shiying, mv, bsym, bian, bshiying = m.groups()
+        if sym == _YANG:
+            code |= 1 << i
+            ben_yy.append("阳")
+        else:
+            ben_yy.append("阴")
+        if shiying:
+            cols["世爻" if shiying == "世" else "应爻"] = i + 1
+        cols[pos + "-六神"] = liushen
+        cols[pos + "-伏神"] = fushen or ""
+        cols[pos + "-本"] = ben + (shiying or "")
+        if bian_full and bian:
+            mv = _MOVING.get(mv, "")
+            if mv:
+                moving.append(str(i + 1))
+                mask |= 1 << i
+            bian_yy.append("阳" if bsym == _YANG else "阴")
+            cols[pos + "-变"] = mv + bian + (bshiying or "")
+        else:
+            cols[pos + "-变"] = ""
+    cols["本卦爻象"] = "".join(ben_yy)
+    cols["变卦爻象"] = "".join(bian_yy) if len(bian_yy) == 6 else ""
+    cols["动爻"] = ",".join(moving)
+    cols["本卦码"], cols["变卦码"], cols["动爻码"] = code, code ^ mask, mask
+    cols["宫位码"] = hexagrams.HEXAGRAMS[code].palace_code
+    return cols
+
+
+_EMPTY_BODY_COLUMNS = {k: "" for k in COL_ORDER[COL_ORDER.index("本卦全名"):COL_ORDER.index("来源窗口")]}
+
+
 # ===== 生成行数据 =====
 def build_excel_row(full_text: str, intro_text: str, write_dt: datetime) -> dict:
     """
@@ -240,28 +332,63 @@ def build_excel_row(full_text: str, intro_text: str, write_dt: datetime) -> dict
         "卦象文本简介": intro["intro_all"],
         "卦象名字": intro["name"], "本卦简称": intro["ben_gua"], "变卦简称": intro["bian_gua"],
     }
+    row.update(_parse_body(full_text))
     return row
 
 
+# ===== 解析质量诊断（不影响写入，只用于统计）=====
+def diagnose_row(row: dict) -> list:
+    """
+    检查 build_excel_row 的结果里哪些字段“正则没匹配上”（解析器对这些情况静默留空）。
+    返回失败类别列表，例如 ['gl_miss', 'intro_empty']；全部正常时返回空列表。
+    """
+    misses = []
+    if not row.get("公历-年"):
+        misses.append("gl_miss")
+    if not row.get("农历-年") or not row.get("农历-月") or not row.get("农历-日"):
+        misses.append("nl_miss")
+    if not all(row.get(k) for k in ("干支-年", "干支-月", "干支-日", "干支-时")):
+        misses.append("gz_miss")
+    if not all(row.get(k) for k in ("旬空-年", "旬空-月", "旬空-日", "旬空-时")):
+        misses.append("xk_miss")
+    if not row.get("时间1"):
+        misses.append("tline_miss")
+    if not row.get("卦象文本简介"):
+        misses.append("intro_empty")
+    elif not row.get("卦象名字") or not row.get("本卦简称"):
+        misses.append("intro_name_miss")
+    if not row.get("本卦全名"):
+        misses.append("body_miss")
+    return misses
+
+
 # ===== 保存行到 Excel（按列名匹配；不存在则创建）=====
 def save_row_to_excel(row: dict, path: str, extra_params=None):
     """
     仅写入“本次要写的列”，按列名匹配，不动其它列与格式/列宽；
     写入位置为：'excel写入时间' 列的“第一个空行”（从第2行开始）。
     若找不到该列，则自动建表头，并从第2行开始写。
-    去重逻辑：与“最后一条已写入（excel写入时间非空）”的哈希值相同则跳过。
+    去重逻辑：与“最后一条已写入（excel写入时间非空）”的哈希值相同则跳过；
+    若行内带“来源窗口”，则只与同一来源窗口的最后一条比较（最多往上看 DEDUP_SCAN_ROWS 行）。
 
     返回：ExcelWriteResult（可当作 bool 使用，同时 snapshot 字段提供写入行的完整值）。
     """
+    return save_rows_to_excel([(row, extra_params)], path)[0]
+
+
+def save_rows_to_excel(items, path: str) -> list:
+    """
+    批量版 save_row_to_excel：items 为 [(row, extra_params), ...]，
+    只打开/保存工作簿一次，逐行套用与单行写入完全相同的规则。
+    返回与 items 一一对应的 ExcelWriteResult 列表。
+    """
     from openpyxl import load_workbook, Workbook
     import os
 
-    extra_params = extra_params or []
-    param_cols = [f"参数{i}" for i in range(1, len(extra_params) + 1)]
-
     # 1) 打开或新建工作簿
     if os.path.exists(path):
-        wb = load_workbook(path)
+        with metrics.timer("excel_load"):
+            wb = load_workbook(path)
         ws = wb.active
         # 读取表头（第一行），保留原顺序
         headers = []
@@ -282,10 +409,26 @@ def save_row_to_excel(row: dict, path: str, extra_params=None):
         for j, name in enumerate(headers, 1):
             ws.cell(row=1, column=j, value=name)
 
+    results = []
+    for row, extra_params in items:
+        results.append(_write_row(ws, headers, row, extra_params or [], path))
+    final_headers = tuple(headers)
+    for res in results:
+        res.headers = final_headers
+
+    # 10) 保存（整批只保存一次）
+    with metrics.timer("excel_save"):
+        wb.save(path)
+    return results
+
+
+def _write_row(ws, headers: list, row: dict, extra_params: list, path: str) -> ExcelWriteResult:
+    """在已打开的工作表上写入一行；headers 会被就地追加缺失列。"""
+    param_cols = [f"参数{i}" for i in range(1, len(extra_params) + 1)]
+
     # 3) 需要写入的这些列：来自 row 的键 + 动态“参数1..N”
     #    仅确保这些列存在；缺失的列“只在末尾追加”，不改变已有列顺序/格式。
     def ensure_col(col_name: str):
-        nonlocal headers
         if col_name not in headers:
             headers.append(col_name)
             ws.cell(row=1, column=len(headers), value=col_name)
@@ -302,20 +445,26 @@ def save_row_to_excel(row: dict, path: str, extra_params=None):
     col_excel_time = col_idx("excel写入时间")
     col_hash = col_idx("哈希值")
     col_seq = col_idx("序号")
+    col_source = col_idx("来源窗口") if "来源窗口" in row else -1
+    source = str(row.get("来源窗口", "") or "").strip()
 
     # 4) 去重：与“最后一条已写入（excel写入时间非空）”记录的哈希相同则跳过
-    #    从底向上找第一行 excel写入时间 非空的记录
+    #    从底向上找第一行 excel写入时间 非空的记录（有来源窗口时只看同一窗口的记录）；
+    #    最多往上看 DEDUP_SCAN_ROWS 行，找不到同窗口的记录就当没有上一条
     last_filled_hash = None
     if col_hash > 0 and col_excel_time > 0 and ws.max_row >= 2:
-        for r in range(ws.max_row, 1, -1):
+        for r in range(ws.max_row, max(1, ws.max_row - DEDUP_SCAN_ROWS), -1):
             t = ws.cell(row=r, column=col_excel_time).value
             if t is not None and str(t).strip() != "":
+                if col_source > 0:
+                    src = ws.cell(row=r, column=col_source).value
+                    if str(src or "").strip() != source:
+                        continue
                 last_filled_hash = ws.cell(row=r, column=col_hash).value
                 break
     new_hash = str(row.get("哈希值", "")).strip()
     if last_filled_hash and new_hash and str(last_filled_hash).strip() == new_hash:
         print("（与上一条内容相同，跳过写入）")
-        wb.save(path)  # 以防刚才有补表头/补列
         return ExcelWriteResult(False, None)
 
     # 5) 计算写入的“目标行号”：从第2行开始，找“excel写入时间”列的第一个空行
@@ -365,29 +514,53 @@ def save_row_to_excel(row: dict, path: str, extra_params=None):
             ws.cell(row=write_row, column=j, value=v)
             row_snapshot[key] = v
 
-    # 10) 保存
-    wb.save(path)
     print(f"已写入：{path}（第 {write_row} 行）")
     return ExcelWriteResult(True, row_snapshot)
 
 
 
 # ====== Excel 中批量插入空列（UI 按钮会调用）=====
-def insert_blank_cols(path: str, x_col_1based: int, col_names: list):
+def _check_insert_args(x_col_1based, col_names):
     if not isinstance(x_col_1based, int) or x_col_1based < 1:
         raise ValueError("X 必须是从 1 开始的正整数。")
     if (not isinstance(col_names, list)
         or any(not isinstance(n, str) or n.strip() == "" for n in col_names)):
         raise ValueError("列名必须为非空字符串列表。")
 
-    if os.path.exists(path):
-        df = pd.read_excel(path)
+
+def insert_blank_cols(path: str, x_col_1based: int, col_names: list):
+    """
+    在第 X 列前插入若干空列并写表头（X 超过现有表头宽度时接在末尾）。
+    直接流式改写工作表 XML（见 xlsx_stream），不整表加载，原有格式/列宽/数据类型保持不变。
+    文件不存在时新建一个只含这些表头的工作簿。
+    """
+    _check_insert_args(x_col_1based, col_names)
+    if not os.path.exists(path):
+        from openpyxl import Workbook
+
+        wb = Workbook()
+        for j, nm in enumerate(col_names, 1):
+            wb.active.cell(row=1, column=j, value=nm)
+        wb.save(path)
+        at = 1
     else:
-        df = pd.DataFrame()
+        from xlsx_stream import insert_cols
 
-    insert_loc = max(0, min(x_col_1based - 1, len(df.columns)))
-    for i, nm in enumerate(col_names):
-        df.insert(loc=insert_loc + i, column=nm, value="")
+        at = insert_cols(path, x_col_1based, col_names)
+    print(f"已在第 {at} 列前插入 {len(col_names)} 列：{col_names}")
+    return at
 
-    df.to_excel(path, index=False)
-    print(f"已在第 {x_col_1based} 列前插入 {len(col_names)} 列：{col_names}")
+
+def insert_blank_cols_batch(paths, x_col_1based: int, col_names: list) -> list:
+    """
+    对多个工作簿执行同样的插入；逐个处理，单个失败不影响其它文件。
+    返回 [(path, 实际插入位置 or None, 错误信息 or None), ...]。
+    """
+    _check_insert_args(x_col_1based, col_names)
+    results = []
+    for p in paths:
+        try:
+            results.append((p, insert_blank_cols(p, x_col_1based, col_names), None))
+        except Exception as e:
+            results.append((p, None, str(e)))
+    return results
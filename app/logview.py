@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+logview.py
+
+界面日志：
+- 任意线程 put() 只入队，不碰 Tk 控件、不做磁盘 IO；
+- 后台线程要回到 Tk 线程做事（弹提示等）用 post(fn)：与日志同一个队列，排在它之前的日志先显示；
+- Tk 线程每 DRAIN_MS 毫秒批量取出，一次 insert 写入 Text；
+- Text 只保留最近 MAX_LINES 行（环形缓冲，超出从头部裁掉）；
+- 完整日志同步写入滚动文件（RotatingFileHandler）。
+"""
+import logging
+import queue
+import tkinter as tk
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+
+class LogPump:
+    DRAIN_MS = 100
+    BATCH_MAX = 500          # 每次最多取出的条数，避免一次塞太多卡住界面
+    MAX_LINES = 2000
+    FILE_MAX_BYTES = 5 * 1024 * 1024
+    FILE_BACKUPS = 3
+
+    def __init__(self, root, text_widget, file_path: str = "./liuyao_reader.log"):
+        self.root = root
+        self.text = text_widget
+        self._queue = queue.SimpleQueue()
+        self._file_log = self._open_file_log(file_path)
+        self.root.after(self.DRAIN_MS, self._drain)
+
+    def _open_file_log(self, file_path: str):
+        logger = logging.getLogger(f"liuyao.gui.{id(self)}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        try:
+            handler = RotatingFileHandler(file_path, maxBytes=self.FILE_MAX_BYTES,
+                                          backupCount=self.FILE_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        except OSError as e:
+            print(f"无法打开日志文件 {file_path}：{e}")
+            return None
+        return logger
+
+    def put(self, text: str):
+        """任意线程调用；只入队，立即返回。"""
+        self._queue.put((datetime.now(), text))
+
+    def post(self, fn):
+        """任意线程调用：fn() 稍后在 Tk 线程里执行。"""
+        self._queue.put((None, fn))
+
+    def _drain(self):
+        items, calls = [], []
+        try:
+            while len(items) < self.BATCH_MAX:
+                ts, item = self._queue.get_nowait()
+                if ts is None:
+                    calls.append(item)
+                else:
+                    items.append((ts, item))
+        except queue.Empty:
+            pass
+
+        if items:
+            lines = [f"{ts:%H:%M:%S}  {text}" for ts, text in items]
+            try:
+                # 用户往上翻看时不强制滚到底
+                at_bottom = self.text.yview()[1] >= 0.999
+                self.text.insert(tk.END, "\n".join(lines) + "\n")
+                total = int(self.text.index("end-1c").split(".")[0])
+                excess = total - 1 - self.MAX_LINES
+                if excess > 0:
+                    self.text.delete("1.0", f"{excess + 1}.0")
+                if at_bottom:
+                    self.text.see(tk.END)
+            except tk.TclError:
+                return  # 窗口已销毁
+            if self._file_log is not None:
+                for ts, text in items:
+                    self._file_log.info(f"{ts:%Y-%m-%d %H:%M:%S}  {text}")
+
+        # 回调各自排一个 after：弹出的模态框不会卡住后面的日志
+        for fn in calls:
+            self.root.after(0, fn)
+
+        # 队列还有积压时尽快再来一轮
+        self.root.after(1 if len(items) >= self.BATCH_MAX else self.DRAIN_MS, self._drain)
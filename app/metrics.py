@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+metrics.py
+
+分阶段耗时统计：
+- Histogram：HDR 风格的对数-线性分桶（微秒），O(1) 记录，相对误差约 3%；
+- Metrics：按阶段名管理直方图；关闭时 timer() 返回空操作对象，几乎零开销；
+- MetricsDumper：后台线程定期把快照追加到 CSV、覆盖写 JSON，供离线分析；
+- Counters：按线程分片的计数器 + 简单仪表值，写入端无锁，供界面每秒汇总。
+
+用法：
+    from metrics import metrics
+    with metrics.timer("parse"):
+        ...
+环境变量 LIUYAO_METRICS=1 可在启动时默认开启。
+"""
+import csv
+import json
+import os
+import threading
+import time
+import weakref
+from datetime import datetime
+
+
+class Histogram:
+    """对数-线性分桶直方图：< 64µs 精确计数，之后每个 2 的幂区间细分 32 格。"""
+
+    SUB_BUCKETS = 32
+    EXACT_LIMIT = 64
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @classmethod
+    def _index(cls, v: int) -> int:
+        if v < cls.EXACT_LIMIT:
+            return v
+        shift = v.bit_length() - 6
+        return cls.EXACT_LIMIT + (shift - 1) * cls.SUB_BUCKETS + ((v >> shift) - cls.SUB_BUCKETS)
+
+    @classmethod
+    def _upper(cls, idx: int) -> int:
+        """桶内可能的最大值（HDR 的 highest equivalent value）。"""
+        if idx < cls.EXACT_LIMIT:
+            return idx
+        shift = (idx - cls.EXACT_LIMIT) // cls.SUB_BUCKETS + 1
+        top = (idx - cls.EXACT_LIMIT) % cls.SUB_BUCKETS + cls.SUB_BUCKETS
+        return ((top + 1) << shift) - 1
+
+    def record(self, us: int):
+        if us < 0:
+            us = 0
+        idx = self._index(us)
+        with self._lock:
+            self._counts[idx] = self._counts.get(idx, 0) + 1
+            self.count += 1
+            self.total += us
+            if us > self.max:
+                self.max = us
+
+    def percentile(self, p: float) -> int:
+        """返回第 p 百分位（微秒）。"""
+        with self._lock:
+            if not self.count:
+                return 0
+            target = max(1, int(p / 100.0 * self.count + 0.999999))
+            seen = 0
+            for idx in sorted(self._counts):
+                seen += self._counts[idx]
+                if seen >= target:
+                    return min(self._upper(idx), self.max)
+            return self.max
+
+    def summary(self) -> dict:
+        """毫秒为单位的摘要：count/mean/p50/p95/p99/max。"""
+        n = self.count
+        return {
+            "count": n,
+            "mean_ms": round(self.total / n / 1000.0, 3) if n else 0.0,
+            "p50_ms": round(self.percentile(50) / 1000.0, 3),
+            "p95_ms": round(self.percentile(95) / 1000.0, 3),
+            "p99_ms": round(self.percentile(99) / 1000.0, 3),
+            "max_ms": round(self.max / 1000.0, 3),
+        }
+
+
+class _StageTimer:
+    __slots__ = ("_hist", "_t0")
+
+    def __init__(self, hist: Histogram):
+        self._hist = hist
+        self._t0 = 0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._hist.record((time.perf_counter_ns() - self._t0) // 1000)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._hists = {}
+        self._lock = threading.Lock()
+
+    def _hist(self, stage: str) -> Histogram:
+        h = self._hists.get(stage)
+        if h is None:
+            with self._lock:
+                h = self._hists.setdefault(stage, Histogram())
+        return h
+
+    def timer(self, stage: str):
+        """计时上下文；关闭时返回共享的空操作对象。"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self._hist(stage))
+
+    def record(self, stage: str, seconds: float):
+        """直接记录一段已测得的耗时（秒）。"""
+        if self.enabled:
+            self._hist(stage).record(int(seconds * 1_000_000))
+
+    def reset(self):
+        with self._lock:
+            self._hists = {}
+
+    def snapshot(self) -> dict:
+        """{阶段: summary}，按首次出现顺序。"""
+        return {name: h.summary() for name, h in list(self._hists.items())}
+
+
+metrics = Metrics(enabled=os.environ.get("LIUYAO_METRICS", "") not in ("", "0"))
+
+
+class Counters:
+    """
+    计数器：每个线程只写自己的分片（单写者，无需加锁），读取时把所有分片相加。
+    分片登记时带上所属线程的弱引用：线程结束后其分片并入 _base（登记新分片时顺带清理），
+    反复 Start/Stop 不会越积越多；reset() 在锁内换一代，各线程下次计数时自动换新分片，
+    不去清空别的线程正在写的字典。
+    gauges 为“最新值”型指标（如上次保存耗时），直接覆盖写。
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []               # [(线程弱引用, 分片)]
+        self._base = {}                 # 已结束线程的累计
+        self._gen = 0                   # reset() 换代：旧代分片不再计入
+        self._lock = threading.Lock()   # 登记分片、并入、读取、重置时持有；incr 本身不加锁
+        self.gauges = {}
+
+    def _shard(self) -> dict:
+        local = self._local
+        if getattr(local, "gen", None) != self._gen:
+            shard = {}
+            with self._lock:
+                self._fold_dead()
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+                local.shard, local.gen = shard, self._gen
+        return local.shard
+
+    def _fold_dead(self):
+        """（持锁调用）把已结束线程的分片并入 _base：线程不在了，分片不会再被写。"""
+        alive = []
+        for ref, shard in self._shards:
+            thread = ref()
+            if thread is not None and thread.is_alive():
+                alive.append((ref, shard))
+            else:
+                for name, n in shard.items():
+                    self._base[name] = self._base.get(name, 0) + n
+        self._shards = alive
+
+    def incr(self, name: str, n: int = 1):
+        shard = self._shard()
+        shard[name] = shard.get(name, 0) + n
+
+    def set_gauge(self, name: str, value):
+        self.gauges[name] = value
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._base.get(name, 0) + sum(shard.get(name, 0) for _ref, shard in self._shards)
+
+    def reset(self):
+        with self._lock:
+            self._gen += 1
+            self._shards = []
+            self._base = {}
+        self.gauges.clear()
+
+
+counters = Counters()
+
+
+class MetricsDumper(threading.Thread):
+    """每 interval_sec 秒把快照追加到 <prefix>.metrics.csv，并覆盖写 <prefix>.metrics.json。"""
+
+    CSV_FIELDS = ["time", "stage", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+    def __init__(self, prefix: str, interval_sec: float = 30.0, source: Metrics = None):
+        super().__init__(daemon=True)
+        self.csv_path = prefix + ".metrics.csv"
+        self.json_path = prefix + ".metrics.json"
+        self.interval_sec = interval_sec
+        self.source = source or metrics
+        self._stop_evt = threading.Event()
+
+    def stop(self):
+        self._stop_evt.set()
+
+    def run(self):
+        while not self._stop_evt.wait(self.interval_sec):
+            self.dump()
+        self.dump()
+
+    def dump(self):
+        snap = self.source.snapshot()
+        if not snap:
+            return
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            new_file = not os.path.exists(self.csv_path)
+            with open(self.csv_path, "a", newline="", encoding="utf-8-sig") as f:
+                w = csv.DictWriter(f, fieldnames=self.CSV_FIELDS)
+                if new_file:
+                    w.writeheader()
+                for stage, s in snap.items():
+                    w.writerow({"time": now, "stage": stage, **s})
+
+            tmp = self.json_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"time": now, "stages": snap}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.json_path)
+        except OSError as e:
+            print(f"写入性能统计失败：{e}")
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+param_index.py
+
+gui_para 参数表的内存索引（采集时查参数用）：
+- 启动时整表读一次：能认出卦名的（“本之变”，简称/全称/繁体/带空白均可，见 hexagrams.pair_key）
+  放进 64×64 的数组槽位，其余名字按原有的字符串规范化放进字典；
+- 查询时优先用行里的 本卦码/变卦码（卦体解析得到，必定有效）直接按下标取，
+  其次用卦象名字、“本卦简称之变卦简称”换算组合键，最后才按字符串匹配非卦名的条目。
+"""
+import re
+import sqlite3
+
+import hexagrams
+
+
+def _normalize(s: str) -> str:
+    """非卦名条目的字符串规范化（与早先按 SQL 查询时的规则一致）。"""
+    s = re.sub(r"\s+", "", (s or "").strip())
+    return s.replace("；", ";").replace("，", ",").replace("：", ":")
+
+
+class ParamIndex:
+    def __init__(self):
+        self.slots = [None] * hexagrams.PAIR_COUNT   # 组合键 -> 参数元组
+        self.others = {}                              # 规范化名字 -> 参数元组（认不出卦名的条目）
+        self.names = 0
+
+    @classmethod
+    def load(cls, db_path: str):
+        """读取整个 gui_para；同一组合键有多种写法时，后导入的覆盖先导入的（与导入工具“保留最后一条”一致）。"""
+        index = cls()
+        groups = {}
+        conn = sqlite3.connect(db_path)
+        try:
+            cur = conn.execute("SELECT name, param_order, param_value FROM gui_para ORDER BY rowid")
+            for name, order, value in cur:
+                groups.setdefault(name, []).append((order if order is not None else 0,
+                                                    "" if value is None else str(value).strip()))
+        finally:
+            conn.close()
+        for name, items in groups.items():
+            items.sort(key=lambda it: it[0])
+            index.add(name, tuple(v for _o, v in items))
+        return index
+
+    def add(self, name: str, params: tuple):
+        self.names += 1
+        key = hexagrams.pair_key(name or "")
+        if key is not None:
+            self.slots[key] = params
+        else:
+            self.others[_normalize(name)] = params
+
+    @property
+    def matched(self) -> int:
+        return sum(1 for p in self.slots if p is not None)
+
+    def key_for(self, row: dict):
+        """行 -> 组合键；认不出返回 None。"""
+        ben, bian = row.get("本卦码"), row.get("变卦码")
+        if isinstance(ben, int) and isinstance(bian, int):
+            return ben * 64 + bian
+        key = hexagrams.pair_key(row.get("卦象名字", "") or "")
+        if key is None and (row.get("本卦简称") or row.get("变卦简称")):
+            key = hexagrams.pair_key(f"{row.get('本卦简称', '')}之{row.get('变卦简称', '')}")
+        return key
+
+    def lookup(self, row: dict):
+        """返回参数元组；没有对应条目返回 None。"""
+        key = self.key_for(row)
+        if key is not None and self.slots[key] is not None:
+            return self.slots[key]
+        if not self.others:
+            return None
+        names = [row.get("卦象名字", "") or ""]
+        if row.get("本卦简称") or row.get("变卦简称"):
+            names.append(f"{row.get('本卦简称', '')}之{row.get('变卦简称', '')}")
+        for name in names:
+            params = self.others.get(_normalize(name))
+            if params is not None:
+                return params
+        return None
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+profiling.py
+
+采集线程的按需剖析（默认关闭）：
+- WorkerProfiler：在 Worker 线程内开启 cProfile（或装了 pyinstrument 时用采样剖析），
+  运行满 duration_sec 后自动停止，输出 .prof / 文本摘要；
+- MemoryTracer：tracemalloc 定时快照，把“相对基线/相对上一次”的分配增长前 N 名追加写入文本。
+输出文件都放在结果 Excel 旁边：<结果文件名>.<标识>.<时间戳>.*
+
+开启方式：界面勾选“性能剖析”，或环境变量
+    LIUYAO_PROFILE=300             剖析时长（秒）
+    LIUYAO_PROFILER=cprofile       cprofile / sampling / auto（默认 auto：有 pyinstrument 就采样）
+    LIUYAO_TRACEMALLOC_SEC=60      内存快照间隔（秒），0 为不做内存快照
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class ProfileOptions:
+    """一次剖析的参数；out_prefix 为输出文件前缀（通常是结果 Excel 去掉扩展名）。"""
+
+    __slots__ = ("duration_sec", "mode", "mem_interval_sec", "out_prefix")
+
+    def __init__(self, duration_sec: float = 300.0, mode: str = "auto",
+                 mem_interval_sec: float = 60.0, out_prefix: str = "./gua_auto_results"):
+        self.duration_sec = float(duration_sec)
+        self.mode = mode
+        self.mem_interval_sec = float(mem_interval_sec)
+        self.out_prefix = out_prefix
+
+
+def options_from_env(out_prefix: str):
+    """按环境变量生成 ProfileOptions；未设置 LIUYAO_PROFILE 时返回 None。"""
+    raw = os.environ.get("LIUYAO_PROFILE", "").strip()
+    if not raw or raw == "0":
+        return None
+    try:
+        duration = float(raw)
+    except ValueError:
+        duration = 300.0
+    try:
+        mem_interval = float(os.environ.get("LIUYAO_TRACEMALLOC_SEC", "60"))
+    except ValueError:
+        mem_interval = 60.0
+    mode = os.environ.get("LIUYAO_PROFILER", "auto").strip().lower() or "auto"
+    return ProfileOptions(duration, mode, mem_interval, out_prefix)
+
+
+def _stamp() -> str:
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+def _safe_tag(tag: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in tag) or "worker"
+
+
+class WorkerProfiler:
+    """
+    必须在被剖析的线程里调用 start()/tick()/finish()（cProfile 与采样剖析都是按线程挂钩的）。
+    tick() 在 Worker 主循环里每轮调用一次，超过时长即自动停止并落盘。
+    """
+
+    def __init__(self, options: ProfileOptions, tag: str = "worker"):
+        self.options = options
+        self.tag = _safe_tag(tag)
+        self._prof = None
+        self._kind = ""
+        self._deadline = 0.0
+        self.outputs = []
+
+    def start(self):
+        mode = self.options.mode
+        if mode in ("auto", "sampling"):
+            try:
+                from pyinstrument import Profiler
+                self._prof = Profiler(interval=0.001)
+                self._kind = "sampling"
+            except ImportError:
+                self._prof = None
+        if self._prof is None:
+            import cProfile
+            self._prof = cProfile.Profile()
+            self._kind = "cprofile"
+            self._prof.enable()
+        else:
+            self._prof.start()
+        self._deadline = time.monotonic() + self.options.duration_sec
+
+    @property
+    def active(self) -> bool:
+        return self._prof is not None
+
+    def tick(self):
+        if self._prof is not None and time.monotonic() >= self._deadline:
+            self.finish()
+
+    def finish(self):
+        prof, self._prof = self._prof, None
+        if prof is None:
+            return
+        base = f"{self.options.out_prefix}.{self.tag}.{_stamp()}"
+        try:
+            if self._kind == "sampling":
+                prof.stop()
+                with open(base + ".sampling.txt", "w", encoding="utf-8") as f:
+                    f.write(prof.output_text(unicode=True, color=False))
+                with open(base + ".sampling.html", "w", encoding="utf-8") as f:
+                    f.write(prof.output_html())
+                self.outputs += [base + ".sampling.txt", base + ".sampling.html"]
+            else:
+                import io
+                import pstats
+                prof.disable()
+                prof.dump_stats(base + ".prof")
+                buf = io.StringIO()
+                pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(40)
+                with open(base + ".prof.txt", "w", encoding="utf-8") as f:
+                    f.write(buf.getvalue())
+                self.outputs += [base + ".prof", base + ".prof.txt"]
+        except OSError as e:
+            print(f"写入剖析结果失败：{e}")
+
+
+class MemoryTracer(threading.Thread):
+    """进程级 tracemalloc 快照：每 interval 秒比较一次，持续 duration 秒后停止。"""
+
+    TOP_N = 25
+    FRAMES = 10
+
+    def __init__(self, options: ProfileOptions):
+        super().__init__(daemon=True)
+        self.options = options
+        self.path = f"{options.out_prefix}.tracemalloc.{_stamp()}.txt"
+        self._stop_evt = threading.Event()
+
+    def stop(self):
+        self._stop_evt.set()
+
+    def run(self):
+        import tracemalloc   # 连带 pickle 等，只有真的做内存快照时才导入
+
+        interval = self.options.mem_interval_sec
+        if interval <= 0:
+            return
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(self.FRAMES)
+        try:
+            baseline = prev = tracemalloc.take_snapshot()
+            deadline = time.monotonic() + self.options.duration_sec
+            while not self._stop_evt.wait(interval):
+                snap = tracemalloc.take_snapshot()
+                self._write(snap, baseline, prev)
+                prev = snap
+                if time.monotonic() >= deadline:
+                    break
+        finally:
+            if started_here:
+                tracemalloc.stop()
+
+    def _write(self, snap, baseline, prev):
+        import tracemalloc
+
+        cur, peak = tracemalloc.get_traced_memory()
+        lines = [f"===== {datetime.now():%Y-%m-%d %H:%M:%S}  当前 {cur / 1048576:.1f} MiB  峰值 {peak / 1048576:.1f} MiB ====="]
+        for title, ref in (("相对基线", baseline), ("相对上一次", prev)):
+            lines.append(f"--- {title}（前 {self.TOP_N}）---")
+            for st in snap.compare_to(ref, "lineno")[:self.TOP_N]:
+                lines.append(str(st))
+        lines.append("")
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"写入内存快照失败：{e}")
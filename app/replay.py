@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+replay.py
+
+采集回放（开发环境在源码目录运行，不参与打包；不需要目标程序和真实窗口，Linux 无界面也能跑）：
+把原始采集存档（capture_archive.py）里的文本按原来的节奏或尽快重新送进 BaseWorker 的下游
+（_process_capture：解析 → 本窗口去重 → 查 gui_para → 交给写入端），用真实输入复现吞吐问题、对比不同写入端。
+    python replay.py gua_auto_results.captures                          # 尽快回放，写到 gua_auto_results.captures.replay.xlsx
+    python replay.py gua_auto_results.xlsx --speed 1 --db gui_para.db   # 按原始节奏回放（xlsx 会换成同名存档）
+    python replay.py gua_auto_results.captures --sink direct --overwrite --json direct.json
+- 每个原窗口句柄一个 Worker（来源窗口、窗口级去重与线上一致），由一个调度线程按存档顺序依次送入；
+- --speed 0 为尽快；1 为按读取时间的原始间隔；N 为 N 倍速。跟不上原始节奏时记入 replay_lag；
+- --sink：batched（ResultSink，写 Excel + 结果库，线上默认）、no-store（ResultSink，只写 Excel）、
+  direct（不经写入端，逐行 save_row_to_excel）；
+- 回放时不再往存档里写；写入时间默认取回放时刻，--keep-time 改用存档里的原读取时间。
+输出：条数、写入/去重/失败、用时与行/秒、写入端最大积压，以及各阶段耗时（含 replay_e2e：送入到写完）。
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from capture_archive import CaptureArchiveReader, archive_prefix
+from diagnostics import parse_telemetry
+from metrics import counters, metrics
+from sink import ResultSink
+from store import results_db_path
+from workers import BaseWorker, HeadlessGui
+
+SINKS = ("batched", "no-store", "direct")
+PROGRESS_SEC = 5.0        # 进度输出间隔
+
+
+def _gui_log(verbose: bool):
+    """日志回调：“记录完成”默认不打印，其余（写入失败等）打到 stderr。"""
+    def log(msg: str):
+        if verbose or not msg.startswith("记录完成"):
+            print(msg, file=sys.stderr)
+    return log
+
+
+class _ReplayWorker(BaseWorker):
+    """不起线程：调度线程直接调 _process_capture；记录每行从送入到写完的耗时。"""
+
+    def __init__(self, gui, **kw):
+        super().__init__(gui, **kw)
+        self._dispatched = 0.0        # 当前这条送入的时刻（调度线程单线程写）
+        self._inflight = {}           # id(row) -> 送入时刻；写线程回调时取走
+
+    def _commit_row(self, row: dict, new_text: str) -> bool:
+        self._inflight[id(row)] = self._dispatched
+        submitted = super()._commit_row(row, new_text)
+        if not submitted:
+            self._inflight.pop(id(row), None)
+        return submitted
+
+    def _on_written(self, row: dict, result):
+        t0 = self._inflight.pop(id(row), None)
+        if t0 is not None:
+            metrics.record("replay_e2e", time.perf_counter() - t0)
+        super()._on_written(row, result)
+
+
+def _remove_outputs(excel: str):
+    """--overwrite：删掉上次回放的结果文件、结果库与解析诊断。"""
+    db = results_db_path(excel)
+    for path in (excel, db, db + "-wal", db + "-shm", os.path.splitext(excel)[0] + ".parse_failures.json"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def replay(prefix: str, excel: str, db: str = "", sink_kind: str = "batched", speed: float = 0.0,
+           start: int = 0, limit: int = 0, keep_time: bool = False, batch_max: int = 0,
+           verbose: bool = False) -> dict:
+    """回放 prefix 存档的 [start, start+limit) 条到 excel；返回统计（见 main 的打印）。"""
+    gui = HeadlessGui(excel, db, log=_gui_log(verbose))
+    params = None
+    if db:
+        from param_index import ParamIndex
+        params = ParamIndex.load(db)                  # 与 _prepare 中一致：各窗口共用一份索引
+
+    metrics.enabled = True
+    metrics.reset()
+    counters.reset()
+    parse_telemetry.reset(os.path.splitext(excel)[0] + ".parse_failures.json")
+
+    sink = None
+    if sink_kind != "direct":
+        sink = ResultSink(excel, log=gui.log, use_store=(sink_kind == "batched"))
+        if batch_max:
+            sink.BATCH_MAX = batch_max
+        sink.start()
+
+    reader = CaptureArchiveReader(prefix)
+    # save_row_to_excel / save_rows_to_excel 每行都会 print（写线程里也有）：回放期间整体丢掉，进度走 stderr
+    quiet = contextlib.ExitStack()
+    quiet.enter_context(contextlib.redirect_stdout(quiet.enter_context(open(os.devnull, "w", encoding="utf-8"))))
+    workers = {}                                      # 窗口句柄 -> _ReplayWorker（按首次出现编号）
+    stats = {"captures": 0, "submitted": 0, "parse_failed": 0, "max_pending": 0}
+    end = len(reader) if not limit else min(len(reader), start + limit)
+    try:
+        base_ts = reader.meta(start)[1] if start < end else 0.0
+        multi = len({reader.meta(i)[2] for i in range(start, end)}) > 1   # 单窗口时来源窗口留空，同 CaptureGroup
+        t_start = time.perf_counter()
+        next_progress = t_start + PROGRESS_SEC
+        for i in range(start, end):
+            cap = reader.get(i)
+            if speed > 0:
+                # 按读取时间的原始间隔（除以倍速）送入；已经落后就立即送并记下落后多少
+                due = t_start + (cap.capture_ts - base_ts) / speed
+                now = time.perf_counter()
+                if due > now:
+                    time.sleep(due - now)
+                else:
+                    metrics.record("replay_lag", now - due)
+
+            w = workers.get(cap.window)
+            if w is None:
+                source = f"窗口{len(workers) + 1}" if multi else ""
+                w = workers[cap.window] = _ReplayWorker(gui, sink=sink, source=source)
+                w._db_ok, w._db_path, w._params = bool(db), db, params
+
+            captured = datetime.fromtimestamp(cap.capture_ts) if keep_time else datetime.now()
+            parse_telemetry.record_trigger()
+            w._dispatched = time.perf_counter()
+            handled = w._process_capture(cap.full_text, cap.intro_text, cap.trigger_ts, captured)
+
+            stats["captures"] += 1
+            if handled is None:
+                stats["parse_failed"] += 1
+            elif handled:
+                stats["submitted"] += 1
+            if sink is not None:
+                stats["max_pending"] = max(stats["max_pending"], sink.pending())
+            if time.perf_counter() >= next_progress:
+                next_progress += PROGRESS_SEC
+                print(f"  {i + 1 - start}/{end - start} 条，已写入 {counters.get('written')} 行"
+                      + (f"，写入端积压 {sink.pending()}" if sink is not None else ""), file=sys.stderr)
+
+        dispatch_sec = time.perf_counter() - t_start
+        if sink is not None:
+            # 已排队的行全部落盘才算结束（与 CaptureGroup 停止时一致）
+            sink.stop()
+            sink.join()
+            sink = None
+        wall_sec = time.perf_counter() - t_start
+    finally:
+        if sink is not None:
+            sink.stop()
+            sink.join()
+        reader.close()
+        quiet.close()
+        parse_telemetry.flush()
+
+    written = counters.get("written")
+    stats.update({
+        "windows": len(workers),
+        "written": written,
+        "dup_skipped": counters.get("dup_skipped"),
+        "write_failed": counters.get("write_failed"),
+        "param_cache_miss": counters.get("param_cache_miss"),
+        "dispatch_sec": round(dispatch_sec, 3),
+        "wall_sec": round(wall_sec, 3),
+        "rows_per_sec": round(written / wall_sec, 1) if wall_sec > 0 else None,
+        "stages": metrics.snapshot(),
+    })
+    return stats
+
+
+def print_report(stats: dict):
+    print(f"回放 {stats['captures']} 条（{stats['windows']} 个窗口）：提交 {stats['submitted']}，写入 {stats['written']}，"
+          f"去重跳过 {stats['dup_skipped']}，解析失败 {stats['parse_failed']}，写入失败 {stats['write_failed']}")
+    if stats["param_cache_miss"]:
+        print(f"gui_para 未命中 {stats['param_cache_miss']} 行")
+    print(f"用时 {stats['wall_sec']:.2f} s（送入 {stats['dispatch_sec']:.2f} s），{stats['rows_per_sec']} 行/秒，"
+          f"写入端最大积压 {stats['max_pending']}")
+    print(f"{'阶段':<14}{'次数':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, s in stats["stages"].items():
+        print(f"{stage:<14}{s['count']:>8}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}{s['p99_ms']:>10.3f}"
+              f"{s['max_ms']:>10.3f}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="把原始采集存档重新送进 Worker 下游（解析/去重/查参数/写入端），离线复现吞吐")
+    ap.add_argument("prefix", help="存档前缀（xxx.captures，也可直接给 .bin/.idx 或结果 Excel）")
+    ap.add_argument("--excel", default="", help="回放写入的结果文件（默认 <存档前缀>.replay.xlsx）")
+    ap.add_argument("--db", default="", help="gui_para 数据库（不给则跳过查参数）")
+    ap.add_argument("--sink", choices=SINKS, default="batched", help="写入端（默认 batched，与线上一致）")
+    ap.add_argument("--batch-max", type=int, default=0, help="覆盖 ResultSink.BATCH_MAX")
+    ap.add_argument("--speed", type=float, default=0.0, help="0=尽快（默认），1=原始节奏，N=N 倍速")
+    ap.add_argument("--start", type=int, default=0, help="从第几条开始（从 0 起）")
+    ap.add_argument("--limit", type=int, default=0, help="最多回放多少条（0=全部）")
+    ap.add_argument("--keep-time", action="store_true", help="写入时间用存档里的原读取时间")
+    ap.add_argument("--overwrite", action="store_true", help="先删掉上次回放的结果文件与结果库")
+    ap.add_argument("--json", default="", help="统计另存为 JSON")
+    ap.add_argument("-v", "--verbose", action="store_true", help="打印每条“记录完成”日志")
+    args = ap.parse_args(argv)
+
+    prefix = args.prefix
+    if prefix.endswith((".bin", ".idx")):
+        prefix = prefix[:-4]
+    elif prefix.endswith(".xlsx"):
+        prefix = archive_prefix(prefix)
+    if not os.path.exists(prefix + ".idx"):
+        print(f"存档不存在：{prefix}.idx")
+        return 1
+    if args.db and not os.path.exists(args.db):
+        print(f"gui_para 数据库不存在：{args.db}")
+        return 1
+    excel = args.excel or prefix + ".replay.xlsx"
+    if args.overwrite:
+        _remove_outputs(excel)
+    elif os.path.exists(excel):
+        print(f"注意：{excel} 已存在，回放行会追加在后面（对比写入端时请加 --overwrite）")
+
+    mode = "尽快" if args.speed <= 0 else f"{args.speed:g} 倍速"
+    print(f"回放 {prefix} -> {excel}（{mode}，写入端 {args.sink}）", flush=True)
+    stats = replay(prefix, excel, db=args.db, sink_kind=args.sink, speed=args.speed, start=args.start,
+                   limit=args.limit, keep_time=args.keep_time, batch_max=args.batch_max,
+                   verbose=args.verbose)
+    stats.update({"archive": prefix, "excel": excel, "sink": args.sink, "speed": args.speed})
+    print_report(stats)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+        print(f"统计：{args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
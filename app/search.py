@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+search.py
+
+结果全文检索（命令行）：在卦象文本、卦象文本简介（含神煞）里找原文片段，走结果库的 FTS5 trigram 索引。
+    python search.py gua_auto_results.xlsx 妻财辛酉金世
+    python search.py gua_auto_results.xlsx "天德丙 日破酉兑" --from 2025-10-01 --limit 50
+多个词用空白分开，须同时出现；不足三个字的词没法走索引，按逐行匹配处理（会慢一些）。
+"""
+import argparse
+import os
+import sys
+import time
+
+from store import FTS_MIN_TERM, ResultsStore, results_db_path
+
+CONTEXT = 12        # 命中处前后各显示的字数
+
+
+def excerpt(row: dict, term: str) -> str:
+    """命中词所在的一小段原文（换行、全角空格压成一个空格）。"""
+    for key in ("卦象文本", "卦象文本简介"):
+        text = str(row.get(key) or "")
+        pos = text.find(term)
+        if pos >= 0:
+            seg = text[max(0, pos - CONTEXT): pos + len(term) + CONTEXT]
+            return " ".join(seg.replace("　", " ").split())
+    return ""
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="在卦象文本/简介里检索原文片段（如某个神煞、某一爻）")
+    ap.add_argument("path", help="结果 Excel（自动找同名 .results.db，必要时先从 Excel 回填）或结果库 .db")
+    ap.add_argument("text", help="要找的片段，多个用空白分开")
+    ap.add_argument("--from", dest="date_from", default="", help="起始日期 YYYY-MM-DD")
+    ap.add_argument("--to", dest="date_to", default="", help="截止日期 YYYY-MM-DD")
+    ap.add_argument("--limit", type=int, default=20, help="最多列出多少行（最新的在前）")
+    args = ap.parse_args(argv)
+
+    if args.path.endswith(".db"):
+        if not os.path.exists(args.path):
+            print(f"结果库不存在：{args.path}")
+            return 1
+        store = ResultsStore(args.path)
+    else:
+        store = ResultsStore(results_db_path(args.path))
+        if store.needs_sync(args.path):
+            print(f"从 Excel 回填结果库：新增 {store.sync_from_excel(args.path)} 行")
+    try:
+        if not store.fulltext:
+            print("注意：当前 sqlite 不支持 FTS5 trigram，改为逐行匹配")
+        elif any(len(t) < FTS_MIN_TERM for t in args.text.split()):
+            print(f"注意：不足 {FTS_MIN_TERM} 个字的词不走索引")
+        filters = {"text": args.text, "date_from": args.date_from, "date_to": args.date_to}
+        t0 = time.perf_counter()
+        total = store.count(**filters)
+        rows = store.fetch(0, args.limit, "id", True, **filters)
+        ms = (time.perf_counter() - t0) * 1000
+        first = args.text.split()[0] if args.text.split() else ""
+        for rid, row in rows:
+            print(f"{rid:>8}  {row.get('excel写入时间', ''):<19}  {row.get('卦象名字', ''):<8}  "
+                  f"{excerpt(row, first)}")
+        print(f"共 {total} 行命中，列出 {len(rows)} 行（{ms:.1f} ms）")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+sink.py
+
+结果写入端：独占结果 Excel 的单一写线程。
+- 多个采集 Worker 只负责 submit()，不直接碰工作簿；
+- 写线程把排队中的行合并成一批，整批只 load/save 一次；
+- 每行写入完成后在写线程里回调 on_done(row, result)；
+- 保存失败（多半是文件正在 Excel 里打开）时整批留在写线程里，按 RETRY_MIN_SEC 起翻倍退避重试，
+  期间新来的行排在后面一起写；停止时再试最后一次，仍失败才放弃（on_done 的 result 为 None）；
+- 保存后把最新表头放进 header_cache，界面读表头时不必再打开工作簿；
+- 同时把实际写入的行同步进结果库（store.ResultsStore），供结果浏览器查询。
+"""
+import os
+import queue
+import threading
+import time
+
+from io_parse import save_rows_to_excel
+from metrics import counters, metrics
+from store import ResultsStore
+
+
+class HeaderCache:
+    """
+    结果文件表头缓存，按（绝对路径, mtime, 大小）校验：
+    写入端每次保存后 update()；文件被外部改动（例如插入空列、在 Excel 里编辑）时自动失效。
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path: str):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, path: str):
+        """命中返回表头元组；未缓存/已失效/文件不存在返回 None。只做一次 stat，不读文件内容。"""
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            counters.incr("header_cache_miss")
+            return None
+        try:
+            stamp = self._stamp(key)
+        except OSError:
+            return None
+        if stamp != entry[0]:
+            counters.incr("header_cache_miss")
+            return None
+        counters.incr("header_cache_hit")
+        return entry[1]
+
+    def update(self, path: str, headers):
+        key = os.path.abspath(path)
+        try:
+            stamp = self._stamp(key)
+        except OSError:
+            return
+        with self._lock:
+            self._entries[key] = (stamp, tuple(headers))
+
+    def load(self, path: str):
+        """缓存未命中时读一次首行并缓存；文件不存在返回 None。"""
+        if not os.path.exists(path):
+            return None
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            headers = []
+            for row in wb.active.iter_rows(min_row=1, max_row=1, values_only=True):
+                headers = ["" if v is None else str(v).strip() for v in row]
+                break
+        finally:
+            wb.close()
+        self.update(path, headers)
+        return tuple(headers)
+
+    def headers(self, path: str):
+        hit = self.get(path)
+        return hit if hit is not None else self.load(path)
+
+
+header_cache = HeaderCache()
+
+
+class ResultSink(threading.Thread):
+    BATCH_MAX = 50          # 单次合并写入的最大行数
+    IDLE_POLL_SEC = 0.2     # 空闲时检查停止标志的间隔
+    RETRY_MIN_SEC = 1.0     # 保存失败后第一次重试前的等待
+    RETRY_MAX_SEC = 30.0    # 重试间隔上限（每失败一次翻倍）
+
+    def __init__(self, path: str, log=None, use_store: bool = True):
+        super().__init__(daemon=True)
+        self.path = path
+        self._log = log or (lambda _msg: None)
+        self._use_store = use_store
+        self._store = None          # 在写线程内打开（sqlite 连接不跨线程）
+        self._queue = queue.Queue()
+        self._stop_evt = threading.Event()
+        self._retry = []            # 保存失败、等待重试的行（按提交顺序；只在写线程里读写）
+        self._retry_delay = 0.0
+        self._retry_at = 0.0
+
+    def submit(self, row: dict, extra_params=None, on_done=None):
+        """排队一行（非阻塞）。on_done(row, result) 在写线程中回调。"""
+        self._queue.put((row, extra_params or [], on_done))
+
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._retry)
+
+    def stop(self):
+        """请求停止：已排队的行会先全部写完再退出。"""
+        self._stop_evt.set()
+
+    def _open_store(self):
+        if not self._use_store:
+            return
+        try:
+            self._store = ResultsStore.for_excel(self.path)
+        except Exception as e:
+            self._store = None
+            self._log(f"结果库不可用（仅写 Excel）：{e}")
+
+    def run(self):
+        self._open_store()
+        try:
+            self._loop()
+        finally:
+            if self._store is not None:
+                self._store.close()
+
+    def _take(self, limit=None) -> list:
+        """不等待地取出排队中的行（最多 limit 行，None 为全部）。"""
+        items = []
+        while limit is None or len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _loop(self):
+        while True:
+            final = False
+            if self._retry:
+                # 有待重试的行：到点（或要停止了）才再试，期间新来的行接在后面一起写
+                final = self._stop_evt.is_set()
+                left = self._retry_at - time.monotonic()
+                if left > 0 and not final:
+                    self._stop_evt.wait(min(left, self.IDLE_POLL_SEC))
+                    continue
+                batch = self._retry + self._take(None if final else self.BATCH_MAX)
+                self._retry = []
+            else:
+                try:
+                    first = self._queue.get(timeout=self.IDLE_POLL_SEC)
+                except queue.Empty:
+                    if self._stop_evt.is_set():
+                        return
+                    continue
+                batch = [first] + self._take(self.BATCH_MAX - 1)
+
+            error = self._write_batch(batch)
+            if error is None:
+                if self._retry_delay:
+                    self._log(f"已补写之前保存失败的行（本批 {len(batch)} 行）")
+                    self._retry_delay = 0.0
+                    counters.set_gauge("sink_retry_rows", 0)
+            elif final:
+                self._give_up(batch, error)
+            else:
+                self._schedule_retry(batch, error)
+
+    def _schedule_retry(self, batch, error):
+        counters.incr("write_retry")
+        first = not self._retry_delay
+        self._retry_delay = min(max(self._retry_delay * 2, self.RETRY_MIN_SEC), self.RETRY_MAX_SEC)
+        self._retry_at = time.monotonic() + self._retry_delay
+        self._retry = batch
+        counters.set_gauge("sink_retry_rows", len(batch))
+        if first:
+            self._log(f"写入 Excel 失败：{error}（{len(batch)} 行已暂存，稍后自动重试；若文件正在 Excel 中打开请先关闭）")
+
+    def _give_up(self, batch, error):
+        counters.incr("write_failed", len(batch))
+        counters.set_gauge("sink_retry_rows", 0)
+        self._log(f"写入 Excel 失败：{error}（停止时仍无法保存，{len(batch)} 行未写入）")
+        for row, _params, on_done in batch:
+            if on_done is not None:
+                try:
+                    on_done(row, None)
+                except Exception as e:
+                    self._log(f"写入回调异常：{e}")
+
+    def _write_batch(self, batch):
+        """保存一批；成功返回 None，保存失败返回异常（行原样留给调用方重试）。"""
+        t0 = time.monotonic()
+        store = self._store
+        # 保存前库与文件一致，保存后才能直接标记为已同步；否则留给浏览器打开时回填
+        in_sync = store is not None and not store.needs_sync(self.path)
+        try:
+            with metrics.timer("sink_batch"):
+                results = save_rows_to_excel([(row, params) for row, params, _ in batch], self.path)
+        except Exception as e:
+            return e
+        counters.set_gauge("last_save_ms", (time.monotonic() - t0) * 1000.0)
+        if results and results[-1].headers is not None:
+            header_cache.update(self.path, results[-1].headers)
+        counters.set_gauge("last_batch_rows", len(batch))
+        if store is not None:
+            try:
+                with metrics.timer("store_insert"):
+                    store.add_rows([r.snapshot for r in results if r and r.snapshot])
+                if in_sync:
+                    store.mark_synced(self.path)
+            except Exception as e:
+                self._log(f"写入结果库失败：{e}")
+
+        for (row, _params, on_done), result in zip(batch, results):
+            counters.incr("written" if result else "dup_skipped")
+            if on_done is None:
+                continue
+            try:
+                on_done(row, result)
+            except Exception as e:
+                self._log(f"写入回调异常：{e}")
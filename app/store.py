@@ -0,0 +1,568 @@
+# -*- coding: utf-8 -*-
+"""
+store.py
+
+结果库：结果 Excel 的只读镜像（SQLite，放在 <结果文件名>.results.db）。
+- 写入端（ResultSink）每批保存 Excel 成功后，把实际写入的行同步插入；
+- 打开结果浏览器时若 Excel 在库外被改过（按 mtime/大小判断），流式回填一次；
+- 常用筛选/排序列（excel写入时间、卦象名字、干支-日、来源窗口）单独成列并建索引，
+  卦象的整数编码（本卦码/变卦码/动爻码/宫位码，见 io_parse._parse_body）也单独成列，
+  其余字段整行存 JSON；浏览时只按页取数，不碰 Excel，也就不会锁住结果文件。
+唯一键 (excel写入时间, 哈希值, 来源窗口)：实时写入与回填重复到达时自动忽略。
+汇总表（每日各卦象名字、各干支-日、各 本卦/变卦 组合的条数）由 results 上的触发器随插入逐行累加，
+被唯一键忽略的重复行不会触发；旧库第一次打开时按现有数据重建一次。日汇总直接读汇总表，与总行数无关。
+大段文本（卦象文本、卦象文本简介、神煞）按内容寻址存进 blobs 表（键为内容摘要），行里只留摘要列表：
+卦象文本在“六神”表头前切成 抬头/卦体 两段、简介在“神煞”前切开，分段去重（同一分钟的抬头、
+同卦同日干的卦体、同一天的神煞只存一份）；读行时（fetch/get）透明拼回原文。
+全文索引（可选，FTS5 trigram，中文按三字切分）：卦象文本、卦象文本简介（含神煞）随插入进索引，
+text 筛选条件里三个字及以上的词走索引，不足三字的（或没有索引时）退回逐行 LIKE。
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from io_parse import COL_ORDER, _parse_body
+
+# 库列名 -> 结果表列名
+INDEXED_COLS = {
+    "write_time": "excel写入时间",
+    "gua_name": "卦象名字",
+    "gz_day": "干支-日",
+    "source": "来源窗口",
+}
+SORTABLE = ("id", "write_time", "gua_name", "gz_day", "source")
+# 库列名 -> 结果表列名（整数编码）
+CODE_COLS = {
+    "ben_code": "本卦码",
+    "bian_code": "变卦码",
+    "moving_mask": "动爻码",
+    "palace_code": "宫位码",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id         INTEGER PRIMARY KEY,
+    seq        TEXT,
+    write_time TEXT NOT NULL,
+    hash       TEXT NOT NULL DEFAULT '',
+    source     TEXT NOT NULL DEFAULT '',
+    gua_name   TEXT NOT NULL DEFAULT '',
+    gz_day     TEXT NOT NULL DEFAULT '',
+    ben_code   INTEGER,
+    bian_code  INTEGER,
+    moving_mask INTEGER,
+    palace_code INTEGER,
+    data       TEXT NOT NULL,
+    UNIQUE (write_time, hash, source)
+);
+CREATE INDEX IF NOT EXISTS ix_results_time ON results (write_time, id);
+CREATE INDEX IF NOT EXISTS ix_results_name ON results (gua_name, id);
+CREATE INDEX IF NOT EXISTS ix_results_gzday ON results (gz_day, id);
+CREATE INDEX IF NOT EXISTS ix_results_source ON results (source, id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    text TEXT NOT NULL
+);
+"""
+# 按内容寻址存放的字段 -> 切分标记（标记前后各成一段；None 表示整段）；每个字段最多两段
+BLOB_FIELDS = {"卦象文本": "六神", "卦象文本简介": "神煞", "神煞": None}
+BLOB_SEGMENTS = 2
+BLOB_VERSION = "1"
+
+
+def _text_sql(field: str, row: str = "") -> str:
+    """某个大段文本字段原文的 SQL 表达式：行里是摘要列表时从 blobs 拼回，旧格式的行直接取 JSON 里的原文。"""
+    data, path = f"{row}data", f"'$.\"{field}\"'"
+    parts = " || ".join(
+        f"ifnull((SELECT text FROM blobs WHERE hash = json_extract({data}, '$.\"{field}\"[{i}]')), '')"
+        for i in range(BLOB_SEGMENTS))
+    return f"(CASE json_type({data}, {path}) WHEN 'array' THEN {parts} ELSE json_extract({data}, {path}) END)"
+
+
+# 旧库先补列（_migrate）再建这些索引与汇总
+_CODE_INDEXES = """
+CREATE INDEX IF NOT EXISTS ix_results_codes ON results (ben_code, bian_code, id);
+CREATE INDEX IF NOT EXISTS ix_results_palace ON results (palace_code, id);
+"""
+AGG_VERSION = "1"
+_AGGREGATES = """
+CREATE TABLE IF NOT EXISTS agg_name_day (
+    day      TEXT NOT NULL,
+    gua_name TEXT NOT NULL,
+    n        INTEGER NOT NULL,
+    PRIMARY KEY (day, gua_name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agg_gz_day (
+    gz_day TEXT PRIMARY KEY,
+    n      INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agg_pair (
+    ben_code  INTEGER NOT NULL,
+    bian_code INTEGER NOT NULL,
+    n         INTEGER NOT NULL,
+    PRIMARY KEY (ben_code, bian_code)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS trg_results_agg_ins AFTER INSERT ON results BEGIN
+    INSERT INTO agg_name_day (day, gua_name, n) VALUES (substr(NEW.write_time, 1, 10), NEW.gua_name, 1)
+        ON CONFLICT (day, gua_name) DO UPDATE SET n = n + 1;
+    INSERT INTO agg_gz_day (gz_day, n) VALUES (NEW.gz_day, 1)
+        ON CONFLICT (gz_day) DO UPDATE SET n = n + 1;
+    INSERT INTO agg_pair (ben_code, bian_code, n) SELECT NEW.ben_code, NEW.bian_code, 1
+        WHERE NEW.ben_code IS NOT NULL AND NEW.bian_code IS NOT NULL
+        ON CONFLICT (ben_code, bian_code) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_results_agg_del AFTER DELETE ON results BEGIN
+    UPDATE agg_name_day SET n = n - 1 WHERE day = substr(OLD.write_time, 1, 10) AND gua_name = OLD.gua_name;
+    UPDATE agg_gz_day SET n = n - 1 WHERE gz_day = OLD.gz_day;
+    UPDATE agg_pair SET n = n - 1 WHERE ben_code = OLD.ben_code AND bian_code = OLD.bian_code;
+END;
+"""
+FTS_VERSION = "2"
+# 无内容表（content=''）：只存索引不存原文，原文仍在 results/blobs 里，命中后按 rowid=id 取行
+_FULLTEXT_TABLE = f"""
+CREATE VIRTUAL TABLE results_fts USING fts5(full_text, intro_text, tokenize='trigram', content='');
+INSERT INTO results_fts (rowid, full_text, intro_text)
+    SELECT id, {_text_sql("卦象文本")}, {_text_sql("卦象文本简介")} FROM results;
+"""
+_FULLTEXT_TRIGGERS = f"""
+DROP TRIGGER IF EXISTS trg_results_fts_ins;
+DROP TRIGGER IF EXISTS trg_results_fts_del;
+CREATE TRIGGER trg_results_fts_ins AFTER INSERT ON results BEGIN
+    INSERT INTO results_fts (rowid, full_text, intro_text)
+    VALUES (NEW.id, {_text_sql("卦象文本", "NEW.")}, {_text_sql("卦象文本简介", "NEW.")});
+END;
+CREATE TRIGGER trg_results_fts_del AFTER DELETE ON results BEGIN
+    INSERT INTO results_fts (results_fts, rowid, full_text, intro_text)
+    VALUES ('delete', OLD.id, {_text_sql("卦象文本", "OLD.")}, {_text_sql("卦象文本简介", "OLD.")});
+END;
+"""
+FTS_MIN_TERM = 3          # trigram 索引只能查三个字及以上的词
+
+_REBUILD_AGGREGATES = """
+DELETE FROM agg_name_day;
+DELETE FROM agg_gz_day;
+DELETE FROM agg_pair;
+INSERT INTO agg_name_day (day, gua_name, n)
+    SELECT substr(write_time, 1, 10), gua_name, COUNT(*) FROM results GROUP BY 1, 2;
+INSERT INTO agg_gz_day (gz_day, n) SELECT gz_day, COUNT(*) FROM results GROUP BY 1;
+INSERT INTO agg_pair (ben_code, bian_code, n)
+    SELECT ben_code, bian_code, COUNT(*) FROM results
+    WHERE ben_code IS NOT NULL AND bian_code IS NOT NULL GROUP BY 1, 2;
+"""
+
+
+def results_db_path(excel_path: str) -> str:
+    return os.path.splitext(excel_path)[0] + ".results.db"
+
+
+def _text(v) -> str:
+    return "" if v is None else str(v).strip()
+
+
+def _int_or_none(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _pack(data: dict, blobs: dict) -> dict:
+    """把 BLOB_FIELDS 里的文本换成摘要列表（就地修改 data），各段原文放进 blobs {摘要: 原文}。"""
+    for field, marker in BLOB_FIELDS.items():
+        text = data.get(field)
+        if not isinstance(text, str):
+            continue
+        cut = text.find(marker) if marker else -1
+        segments = [text[:cut], text[cut:]] if cut > 0 else [text]
+        refs = []
+        for seg in segments:
+            h = _digest(seg)
+            blobs[h] = seg
+            refs.append(h)
+        data[field] = refs
+    return data
+
+
+def _codes(values: dict) -> tuple:
+    """(本卦码, 变卦码, 动爻码, 宫位码)；旧行没有这些列时从卦象文本现算。"""
+    codes = tuple(_int_or_none(values.get(c)) for c in CODE_COLS.values())
+    if codes[0] is None and values.get("卦象文本"):
+        body = _parse_body(str(values["卦象文本"]))
+        codes = tuple(_int_or_none(body.get(c)) for c in CODE_COLS.values())
+    return codes
+
+
+class ResultsStore:
+    """
+    每个线程各开一个实例（sqlite3 连接不跨线程）；库用 WAL，写入端与浏览器可同时读写。
+    """
+
+    IMPORT_BATCH = 2000
+    BLOB_CACHE = 4096       # 读行时缓存的文本段数（段内容不可变，按摘要缓存总是有效）
+    FULLTEXT = True         # 是否维护全文索引（sqlite 不带 FTS5/trigram 时自动不用）
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._blob_cache = {}
+        self._migrate()
+        self._migrate_blobs()
+        self.conn.executescript(_CODE_INDEXES)
+        self._ensure_aggregates()
+        self.fulltext = self.FULLTEXT and self._ensure_fulltext()
+
+    def _migrate(self):
+        """旧库没有整数编码列：补列，并从已存的卦象文本回算一次。"""
+        have = {r[1] for r in self.conn.execute("PRAGMA table_info(results)")}
+        missing = [c for c in CODE_COLS if c not in have]
+        if not missing:
+            return
+        with self.conn:
+            for c in missing:
+                self.conn.execute(f"ALTER TABLE results ADD COLUMN {c} INTEGER")
+            cur = self.conn.execute("SELECT id, data FROM results")
+            while True:
+                chunk = cur.fetchmany(self.IMPORT_BATCH)
+                if not chunk:
+                    break
+                self.conn.executemany(
+                    "UPDATE results SET ben_code=?, bian_code=?, moving_mask=?, palace_code=? WHERE id=?",
+                    [_codes(json.loads(data)) + (rid,) for rid, data in chunk])
+
+    def _migrate_blobs(self):
+        """旧格式的行（JSON 里直接存原文）改成摘要引用；按 id 分批，每批一个事务，中断后重开会接着做。
+        腾出的页留在库里给后续插入复用，不自动 VACUUM。"""
+        cur = self.conn.execute("SELECT value FROM meta WHERE key='blob_version'").fetchone()
+        if cur is not None and cur[0] == BLOB_VERSION:
+            return
+        last = 0
+        while True:
+            chunk = self.conn.execute("SELECT id, data FROM results WHERE id > ? ORDER BY id LIMIT ?",
+                                      (last, self.IMPORT_BATCH)).fetchall()
+            if not chunk:
+                break
+            last = chunk[-1][0]
+            blobs, updates = {}, []
+            for rid, data in chunk:
+                values = json.loads(data)
+                if any(isinstance(values.get(f), str) for f in BLOB_FIELDS):
+                    updates.append((json.dumps(_pack(values, blobs), ensure_ascii=False), rid))
+            if updates:
+                with self.conn:
+                    self.conn.executemany("INSERT OR IGNORE INTO blobs (hash, text) VALUES (?, ?)", blobs.items())
+                    self.conn.executemany("UPDATE results SET data = ? WHERE id = ?", updates)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('blob_version', ?)", (BLOB_VERSION,))
+
+    def _ensure_aggregates(self):
+        """建汇总表与触发器；版本不符（旧库、或汇总定义变了）时按 results 现有数据重建一次。"""
+        cur = self.conn.execute("SELECT value FROM meta WHERE key='agg_version'").fetchone()
+        if cur is not None and cur[0] == AGG_VERSION:
+            return
+        self.conn.executescript(
+            "BEGIN;"
+            "DROP TRIGGER IF EXISTS trg_results_agg_ins; DROP TRIGGER IF EXISTS trg_results_agg_del;"
+            + _AGGREGATES + _REBUILD_AGGREGATES
+            + f"INSERT OR REPLACE INTO meta (key, value) VALUES ('agg_version', '{AGG_VERSION}');"
+            "COMMIT;")
+
+    def _ensure_fulltext(self) -> bool:
+        """建全文索引（索引表不存在时按现有行灌入一次，版本变了只重建触发器）；
+        sqlite 不支持 FTS5 或 trigram 分词时返回 False。"""
+        cur = self.conn.execute("SELECT value FROM meta WHERE key='fts_version'").fetchone()
+        if cur is not None and cur[0] == FTS_VERSION:
+            return True
+        have = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name='results_fts'").fetchone()
+        try:
+            self.conn.executescript(
+                "BEGIN;" + ("" if have else _FULLTEXT_TABLE) + _FULLTEXT_TRIGGERS
+                + f"INSERT OR REPLACE INTO meta (key, value) VALUES ('fts_version', '{FTS_VERSION}');"
+                "COMMIT;")
+        except sqlite3.OperationalError:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            return False
+        return True
+
+    @classmethod
+    def for_excel(cls, excel_path: str):
+        return cls(results_db_path(excel_path))
+
+    def close(self):
+        self.conn.close()
+
+    # ===== 写入 =====
+    @staticmethod
+    def _record(values: dict, blobs: dict):
+        data = _pack({k: v for k, v in values.items() if v not in (None, "")}, blobs)
+        return (
+            _text(values.get("序号")),
+            _text(values.get("excel写入时间")),
+            _text(values.get("哈希值")),
+            _text(values.get("来源窗口")),
+            _text(values.get("卦象名字")),
+            _text(values.get("干支-日")),
+            *_codes(values),
+            json.dumps(data, ensure_ascii=False, default=str),
+        )
+
+    def add_rows(self, rows) -> int:
+        """插入若干行（dict，键为结果表列名）；没有 excel写入时间 的行跳过。返回新增行数。"""
+        blobs = {}
+        recs = [self._record(r, blobs) for r in rows if _text(r.get("excel写入时间"))]
+        if not recs:
+            return 0
+        with self._lock, self.conn:
+            # 文本段先入库（触发器建全文索引时要从 blobs 拼原文）；已有的段被主键忽略
+            self.conn.executemany("INSERT OR IGNORE INTO blobs (hash, text) VALUES (?, ?)", blobs.items())
+            # rowcount 只数语句本身插入的行；total_changes 还会把触发器写汇总表/全文索引的改动算进去
+            cur = self.conn.executemany(
+                "INSERT OR IGNORE INTO results (seq, write_time, hash, source, gua_name, gz_day,"
+                " ben_code, bian_code, moving_mask, palace_code, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", recs)
+            return cur.rowcount
+
+    # ===== 与 Excel 的同步状态 =====
+    @staticmethod
+    def _file_stamp(excel_path: str) -> str:
+        st = os.stat(excel_path)
+        return f"{st.st_mtime_ns}:{st.st_size}"
+
+    def mark_synced(self, excel_path: str):
+        """记录 Excel 当前的 mtime/大小：写入端保存后调用，表示库与文件一致。"""
+        try:
+            stamp = self._file_stamp(excel_path)
+        except OSError:
+            return
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('excel_stamp', ?)", (stamp,))
+
+    def needs_sync(self, excel_path: str) -> bool:
+        try:
+            stamp = self._file_stamp(excel_path)
+        except OSError:
+            return False
+        cur = self.conn.execute("SELECT value FROM meta WHERE key='excel_stamp'").fetchone()
+        return cur is None or cur[0] != stamp
+
+    def sync_from_excel(self, excel_path: str, progress=None) -> int:
+        """
+        流式读取 Excel（read_only，逐行迭代），按批插入；已在库里的行被唯一键忽略。
+        progress(已读行数) 每批回调一次。返回新增行数。
+        """
+        from openpyxl import load_workbook
+
+        if not os.path.exists(excel_path):
+            return 0
+        stamp = self._file_stamp(excel_path)
+        wb = load_workbook(excel_path, read_only=True, data_only=True)
+        added = seen = 0
+        try:
+            it = wb.active.iter_rows(values_only=True)
+            header = next(it, None) or ()
+            cols = [(j, _text(h)) for j, h in enumerate(header) if _text(h)]
+            batch = []
+            for values in it:
+                seen += 1
+                batch.append({name: values[j] for j, name in cols if j < len(values)})
+                if len(batch) >= self.IMPORT_BATCH:
+                    added += self.add_rows(batch)
+                    batch = []
+                    if progress:
+                        progress(seen)
+            added += self.add_rows(batch)
+        finally:
+            wb.close()
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('excel_stamp', ?)", (stamp,))
+        if progress:
+            progress(seen)
+        return added
+
+    # ===== 查询 =====
+    def _where(self, name_prefix: str = "", gz_day: str = "", date_from: str = "", date_to: str = "",
+               ben_code=None, bian_code=None, moving_line=None, palace_code=None, text: str = ""):
+        """
+        筛选条件都落在索引列上：名字用前缀区间（可走索引），日期按 'YYYY-MM-DD' 字符串比较；
+        卦码按整数相等，moving_line（1..6）按动爻码位与（如三爻动：moving_mask & 4）。
+        text 按空白拆成若干词，各词都须出现（卦象文本或简介里的原文片段，如“妻财辛酉金世”“天德丙”）。
+        """
+        clauses, args = [], []
+        for term in (text or "").split():
+            if self.fulltext and len(term) >= FTS_MIN_TERM:
+                clauses.append("id IN (SELECT rowid FROM results_fts WHERE results_fts MATCH ?)")
+                args.append('"' + term.replace('"', '""') + '"')
+            else:
+                pattern = "%" + re.sub(r"([%_\\])", r"\\\1", term) + "%"
+                clauses.append(f"({_text_sql('卦象文本')} LIKE ? ESCAPE '\\'"
+                               f" OR {_text_sql('卦象文本简介')} LIKE ? ESCAPE '\\')")
+                args += [pattern, pattern]
+        for col, val in (("ben_code", ben_code), ("bian_code", bian_code), ("palace_code", palace_code)):
+            if val is not None:
+                clauses.append(f"{col} = ?")
+                args.append(int(val))
+        if moving_line is not None:
+            clauses.append("(moving_mask & ?) != 0")
+            args.append(1 << (int(moving_line) - 1))
+        if name_prefix:
+            clauses.append("gua_name >= ? AND gua_name < ?")
+            args += [name_prefix, name_prefix + "\U0010ffff"]
+        if gz_day:
+            clauses.append("gz_day = ?")
+            args.append(gz_day)
+        if date_from:
+            clauses.append("write_time >= ?")
+            args.append(date_from)
+        if date_to:
+            clauses.append("write_time <= ?")
+            args.append(date_to + " 23:59:59" if len(date_to) <= 10 else date_to)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def count(self, **filters) -> int:
+        where, args = self._where(**filters)
+        return self.conn.execute(f"SELECT COUNT(*) FROM results{where}", args).fetchone()[0]
+
+    def group_counts(self, key: str = "ben_code", **filters) -> list:
+        """按某个整数编码列分组计数：[(值, 条数), ...]，条数多的在前；没有编码的行不计。"""
+        if key not in CODE_COLS:
+            raise ValueError(f"不支持按 {key} 分组")
+        where, args = self._where(**filters)
+        where = (where + " AND " if where else " WHERE ") + f"{key} IS NOT NULL"
+        return self.conn.execute(
+            f"SELECT {key}, COUNT(*) AS n FROM results{where} GROUP BY {key} ORDER BY n DESC, {key}",
+            args).fetchall()
+
+    def fetch(self, offset: int, limit: int, sort: str = "id", desc: bool = False, **filters) -> list:
+        """按页取数：返回 [(id, 行dict), ...]。排序列限定为带索引的列，id 作为次序键保证稳定。"""
+        if sort not in SORTABLE:
+            raise ValueError(f"不支持按 {sort} 排序")
+        where, args = self._where(**filters)
+        direction = "DESC" if desc else "ASC"
+        order = f"id {direction}" if sort == "id" else f"{sort} {direction}, id {direction}"
+        cur = self.conn.execute(
+            f"SELECT id, seq, data FROM results{where} ORDER BY {order} LIMIT ? OFFSET ?",
+            args + [int(limit), max(0, int(offset))])
+        out = []
+        for rid, seq, data in cur:
+            row = self._unpack(json.loads(data))
+            if seq and "序号" not in row:
+                row["序号"] = seq
+            out.append((rid, row))
+        return out
+
+    # ===== 导出 =====
+    def iter_rows(self, **filters):
+        """
+        按 id 顺序逐批取出（筛选后的）全部行，文本段已拼回原文；按 id 续读，不用 OFFSET。
+        旧 Excel 回填的行没有卦体各列（本卦全名、各爻、世应、卦码…）：从卦象文本现解析补齐，
+        与新行一样整组来自同一次解析（解析不出时整组为空）。
+        """
+        where, args = self._where(**filters)
+        where = (where + " AND " if where else " WHERE ") + "id > ?"
+        last = 0
+        while True:
+            chunk = self.conn.execute(f"SELECT id, seq, data FROM results{where} ORDER BY id LIMIT ?",
+                                      args + [last, self.IMPORT_BATCH]).fetchall()
+            if not chunk:
+                return
+            last = chunk[-1][0]
+            for _rid, seq, data in chunk:
+                row = self._unpack(json.loads(data))
+                if seq and "序号" not in row:
+                    row["序号"] = seq
+                if row.get("卦象文本") and not ("本卦全名" in row and "本卦码" in row):
+                    for name, value in _parse_body(str(row["卦象文本"])).items():
+                        row.setdefault(name, value)
+                yield row
+
+    def export_headers(self, **filters) -> list:
+        """导出用表头：COL_ORDER 在前，其余出现过的列（参数1..N 等）按首次出现的先后接在后面。"""
+        where, args = self._where(**filters)
+        seen = self.conn.execute(
+            f"SELECT j.key FROM (SELECT id, data FROM results{where}) AS r, json_each(r.data) AS j"
+            " GROUP BY j.key ORDER BY MIN(r.id), MIN(j.id)", args).fetchall()
+        known = set(COL_ORDER)
+        return list(COL_ORDER) + [k for (k,) in seen if k not in known]
+
+    def export_excel(self, xlsx_path: str, **filters) -> int:
+        """（筛选后的）结果写成新的 xlsx：文本原样拼回，字符串走共享字符串表。返回行数。"""
+        from xlsx_stream import write_rows_xlsx
+
+        return write_rows_xlsx(xlsx_path, self.export_headers(**filters), self.iter_rows(**filters))
+
+    # ===== 汇总（读汇总表，不扫 results）=====
+    def daily_summary(self, date_from: str = "", date_to: str = "") -> list:
+        """[(日期, 卦象名字, 条数), ...]：按日期升序、同日条数降序。"""
+        clauses, args = ["n > 0"], []
+        if date_from:
+            clauses.append("day >= ?")
+            args.append(date_from)
+        if date_to:
+            clauses.append("day <= ?")
+            args.append(date_to)
+        return self.conn.execute(
+            f"SELECT day, gua_name, n FROM agg_name_day WHERE {' AND '.join(clauses)}"
+            " ORDER BY day, n DESC, gua_name", args).fetchall()
+
+    def gz_day_counts(self) -> list:
+        """[(干支-日, 条数), ...]，条数降序。"""
+        return self.conn.execute(
+            "SELECT gz_day, n FROM agg_gz_day WHERE n > 0 ORDER BY n DESC, gz_day").fetchall()
+
+    def pair_counts(self) -> list:
+        """[(本卦码, 变卦码, 条数), ...]，条数降序。"""
+        return self.conn.execute(
+            "SELECT ben_code, bian_code, n FROM agg_pair WHERE n > 0 ORDER BY n DESC, ben_code, bian_code").fetchall()
+
+    def export_daily_summary(self, csv_path: str, date_from: str = "", date_to: str = "") -> int:
+        """日汇总写成 CSV（utf-8-sig，Excel 直接打开不乱码）：日期、卦象名字、条数、当日合计。返回行数。"""
+        rows = self.daily_summary(date_from, date_to)
+        totals = {}
+        for day, _name, n in rows:
+            totals[day] = totals.get(day, 0) + n
+        with open(csv_path, "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.writer(f)
+            w.writerow(["日期", "卦象名字", "条数", "当日合计"])
+            for day, name, n in rows:
+                w.writerow([day, name, n, totals[day]])
+        return len(rows)
+
+    def last_id(self) -> int:
+        """最大行 id（主键上取，O(1)）：浏览器据此判断有没有新行到达。"""
+        return self.conn.execute("SELECT MAX(id) FROM results").fetchone()[0] or 0
+
+    def get(self, rid: int):
+        cur = self.conn.execute("SELECT data FROM results WHERE id = ?", (rid,)).fetchone()
+        return self._unpack(json.loads(cur[0])) if cur else None
+
+    # ===== 文本段 =====
+    def _unpack(self, row: dict) -> dict:
+        """摘要列表拼回原文（就地修改并返回 row）。"""
+        for field in BLOB_FIELDS:
+            refs = row.get(field)
+            if isinstance(refs, list):
+                row[field] = "".join(self._blob(h) for h in refs)
+        return row
+
+    def _blob(self, h: str) -> str:
+        text = self._blob_cache.get(h)
+        if text is None:
+            cur = self.conn.execute("SELECT text FROM blobs WHERE hash = ?", (h,)).fetchone()
+            text = cur[0] if cur else ""
+            if len(self._blob_cache) >= self.BLOB_CACHE:
+                self._blob_cache.clear()
+            self._blob_cache[h] = text
+        return text
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""app/ 下各模块按顶层模块互相导入（与打包后一致）：测试从 app/ 目录导入。"""
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""原始采集存档：追加/读取、崩溃后恢复、写失败后的偏移对齐。"""
+import os
+
+import pytest
+
+from capture_archive import ENTRY, HEADER, CaptureArchive, CaptureArchiveReader, RawCapture
+
+ITEMS = [("卦象一\n初爻", "简介一", 1.0, 1.5, 0x10),
+         ("卦象二", "", 2.0, 2.5, 0x20),
+         ("", "只有简介", 3.0, 3.5, 0x10)]
+
+
+@pytest.fixture
+def prefix(tmp_path):
+    return str(tmp_path / "results.captures")
+
+
+def _fill(prefix, items=ITEMS):
+    archive = CaptureArchive(prefix)
+    for item in items:
+        archive.append(*item)
+    archive.close()
+
+
+def _read_all(prefix):
+    reader = CaptureArchiveReader(prefix)
+    try:
+        assert all(reader.verify(i) for i in range(len(reader)))
+        return list(reader)
+    finally:
+        reader.close()
+
+
+def test_append_and_get(prefix):
+    archive = CaptureArchive(prefix)
+    assert [archive.append(*item) for item in ITEMS] == [0, 1, 2]
+    archive.close()
+    assert _read_all(prefix) == [RawCapture(*item) for item in ITEMS]
+
+    reader = CaptureArchiveReader(prefix)
+    try:
+        assert reader.meta(1) == (2.0, 2.5, 0x20)
+        assert reader.get(2, verify=True).intro_text == "只有简介"
+        with pytest.raises(IndexError):
+            reader.get(3)
+    finally:
+        reader.close()
+
+
+def test_reopen_appends_after_existing(prefix):
+    _fill(prefix, ITEMS[:2])
+    archive = CaptureArchive(prefix)
+    assert archive.count == 2
+    assert archive.append(*ITEMS[2]) == 2
+    archive.close()
+    assert _read_all(prefix) == [RawCapture(*item) for item in ITEMS]
+
+
+def test_recover_torn_index_entry_and_orphan_text(prefix):
+    _fill(prefix)
+    with open(prefix + ".idx", "ab") as f:
+        f.write(b"\x01" * (ENTRY.size // 2))        # 崩溃：索引项只写了一半
+    with open(prefix + ".bin", "ab") as f:
+        f.write("孤立文本".encode("utf-8"))
+    bin_size = os.path.getsize(prefix + ".bin")
+
+    archive = CaptureArchive(prefix)
+    assert archive.count == 3
+    assert os.path.getsize(prefix + ".idx") == HEADER.size + 3 * ENTRY.size
+    assert os.path.getsize(prefix + ".bin") < bin_size
+    archive.append("新的一条", "简介", 4.0, 4.5, 0x30)
+    archive.close()
+    assert [c.full_text for c in _read_all(prefix)] == ["卦象一\n初爻", "卦象二", "", "新的一条"]
+
+
+def test_recover_index_pointing_past_text(prefix):
+    _fill(prefix)
+    # 索引项已落盘但文本末尾丢了几个字节：最后一条不完整，整条丢掉
+    with open(prefix + ".bin", "r+b") as f:
+        f.truncate(os.path.getsize(prefix + ".bin") - 3)
+
+    archive = CaptureArchive(prefix)
+    assert archive.count == 2
+    assert os.path.getsize(prefix + ".idx") == HEADER.size + 2 * ENTRY.size
+    archive.append("补上", "简介", 4.0, 4.5, 0x10)
+    archive.close()
+    assert [(c.full_text, c.intro_text) for c in _read_all(prefix)] == [
+        ("卦象一\n初爻", "简介一"), ("卦象二", ""), ("补上", "简介")]
+
+
+class _DiskFull:
+    """只写出前几个字节就报错的文件（模拟磁盘满）。"""
+
+    def __init__(self, f, limit=2):
+        self._f = f
+        self._limit = limit
+
+    def write(self, data):
+        self._f.write(bytes(data[:self._limit]))
+        raise OSError(28, "No space left on device")
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+@pytest.mark.parametrize("which", ["_bin", "_idx"])
+def test_failed_write_keeps_offsets_aligned(prefix, which):
+    archive = CaptureArchive(prefix)
+    archive.append("AAAA", "BB", 1.0, 1.5)
+    good = getattr(archive, which)
+    setattr(archive, which, _DiskFull(good))
+    with pytest.raises(OSError):
+        archive.append("XXXX", "YY", 2.0, 2.5)
+    setattr(archive, which, good)
+    assert archive.append("CCEE", "EE", 3.0, 3.5) == 1
+    archive.close()
+
+    assert [(c.full_text, c.intro_text) for c in _read_all(prefix)] == [("AAAA", "BB"), ("CCEE", "EE")]
+    reopened = CaptureArchive(prefix)            # 重新打开也是同样两条，没有留下半截数据
+    assert reopened.count == 2
+    reopened.close()
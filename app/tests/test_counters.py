@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""计数器：结束的线程分片并入总数、不越积越多；reset() 与其它线程计数同时进行也安全。"""
+import threading
+
+from metrics import Counters
+
+
+def _run_threads(counters, threads, per_thread):
+    def work():
+        for _ in range(per_thread):
+            counters.incr("rows")
+
+    for _ in range(threads):
+        t = threading.Thread(target=work)
+        t.start()
+        t.join()
+
+
+def test_dead_thread_shards_are_folded():
+    counters = Counters()
+    for _ in range(20):                      # 反复 Start/Stop：每轮一个新线程
+        _run_threads(counters, 1, 10)
+    counters.incr("rows")                    # 登记本线程分片时并入已结束的线程
+    assert counters.get("rows") == 201
+    assert len(counters._shards) == 1
+
+
+def test_reset_swaps_shards():
+    counters = Counters()
+    counters.incr("rows", 5)
+    stale = counters._local.shard
+    counters.reset()
+    assert counters.get("rows") == 0
+    counters.incr("rows")
+    assert counters._local.shard is not stale
+    assert stale == {"rows": 5}              # 旧分片不被别的线程清空
+    assert counters.get("rows") == 1
+
+
+def test_reset_while_counting():
+    counters = Counters()
+    stop = threading.Event()
+
+    def work():
+        while not stop.is_set():
+            counters.incr("rows")
+
+    workers = [threading.Thread(target=work) for _ in range(4)]
+    for t in workers:
+        t.start()
+    for _ in range(200):
+        counters.reset()
+        assert counters.get("rows") >= 0
+    stop.set()
+    for t in workers:
+        t.join()
+
+    counters.reset()
+    _run_threads(counters, 3, 100)
+    assert counters.get("rows") == 300
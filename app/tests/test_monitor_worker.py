@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""监测模式：用 FakeTriggerSource 驱动 MonitorClickWorker，不需要真实窗口。"""
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import corpus
+from triggers import FakeTriggerSource
+from workers import BaseWorker, HeadlessGui, MonitorClickWorker
+
+WAIT_SEC = 5.0
+
+
+class _FakeControl:
+    def __init__(self, text=""):
+        self.text = text
+
+    def window_text(self):
+        return self.text
+
+
+class _ListSink:
+    """代替 ResultSink：记下提交的行，立即回调。"""
+
+    def __init__(self):
+        self.rows = []
+        self.changed = threading.Condition()
+
+    def submit(self, row, extra_params=None, on_done=None):
+        with self.changed:
+            self.rows.append(row)
+            self.changed.notify_all()
+        if on_done is not None:
+            on_done(row, True)
+
+    def wait_for(self, n: int) -> bool:
+        with self.changed:
+            return self.changed.wait_for(lambda: len(self.rows) >= n, timeout=WAIT_SEC)
+
+
+class _OfflineMonitorWorker(MonitorClickWorker):
+    # 去掉等待：事件一到就读
+    _RECORD_COOLDOWN_SEC = 0
+    READ_DELAY_SEC = 0
+    SETTLE_GAP_SEC = 0.01
+
+    def _prepare(self):
+        pass                                    # 控件由测试直接给（_FakeControl），不连窗口、不查数据库
+
+
+@pytest.fixture
+def samples():
+    return list(corpus.iter_samples(7, 2, start=datetime(2025, 10, 1), edge_rate=0.0))
+
+
+@pytest.fixture
+def monitor(tmp_path):
+    source = FakeTriggerSource()
+    source.DEBOUNCE_SEC = 0.3
+    sink = _ListSink()
+    worker = _OfflineMonitorWorker(HeadlessGui(str(tmp_path / "results.xlsx")), wait_poll=0.01,
+                                   trigger_source=source, sink=sink, source="窗口1[0x1]")
+    worker.WAIT_SLICE_SEC = 0.05
+    worker.result_edit, worker.intro_static = _FakeControl(), _FakeControl()
+    yield worker, source, sink
+    worker.stop()
+    worker.join(WAIT_SEC)
+
+
+def test_fire_records_once_then_debounces(monitor, samples):
+    worker, source, sink = monitor
+    worker.result_edit.text, worker.intro_static.text = samples[0].full_text, samples[0].intro_text
+    worker.start()
+
+    assert source.fire("click")
+    assert not source.fire("enter")            # 同一次点击带来的第二个事件落在去抖窗口内
+    assert sink.wait_for(1)
+    time.sleep(0.1)
+    assert len(sink.rows) == 1
+    assert sink.rows[0]["卦象名字"]
+    assert sink.rows[0]["来源窗口"] == "窗口1[0x1]"
+
+    # 去抖窗口过后，新结果再触发一次 -> 第二行
+    time.sleep(source.DEBOUNCE_SEC)
+    worker.result_edit.text, worker.intro_static.text = samples[1].full_text, samples[1].intro_text
+    assert source.fire("text")
+    assert sink.wait_for(2)
+    assert sink.rows[1]["哈希值"] != sink.rows[0]["哈希值"]
+
+
+def test_same_text_is_not_recorded_twice(monitor, samples):
+    worker, source, sink = monitor
+    worker.result_edit.text = samples[0].full_text
+    worker.start()
+
+    assert source.fire()
+    assert sink.wait_for(1)
+    time.sleep(source.DEBOUNCE_SEC)
+    assert source.fire()                        # 事件会到，但文本没变：本窗口去重跳过
+    time.sleep(0.3)
+    assert len(sink.rows) == 1
+
+
+def test_base_worker_without_loop_just_logs(tmp_path):
+    logs = []
+    worker = BaseWorker(HeadlessGui(str(tmp_path / "results.xlsx"), log=logs.append))
+    worker.start()
+    worker.join(WAIT_SEC)
+    assert not worker.is_alive()
+    assert any("没有采集循环" in m for m in logs)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""卦名规范化与参数索引：各种写法落到同一组合键；认不出的名字走 others 字典兜底。"""
+import sqlite3
+
+import pytest
+
+import hexagrams
+from hexagrams import code_of_name, normalize_name, pair_key, pair_name
+from param_index import ParamIndex
+
+DING, HENG = code_of_name("鼎"), code_of_name("恒")
+DING_HENG = DING * 64 + HENG
+
+
+def test_every_hexagram_by_short_and_full_name():
+    for h in hexagrams.HEXAGRAMS:
+        assert code_of_name(h.short) == code_of_name(h.full) == h.code
+        assert pair_key(f"{h.short}之{h.full}") == h.code * 64 + h.code
+    assert len({h.full for h in hexagrams.HEXAGRAMS}) == 64
+
+
+@pytest.mark.parametrize("name", [
+    "鼎之恒", "火风鼎之雷风恒", "鼎之雷风恒", "火风鼎之恒",
+    " 鼎 之 恒 ", "鼎　之　恒", "鼎卦之恒卦",
+    "火风鼎[离宫二世卦]之雷风恒[震宫三世卦]", "火风鼎【离宫二世卦】之雷风恒（震宫三世卦）",
+])
+def test_pair_key_spellings(name):
+    assert pair_key(name) == DING_HENG
+
+
+@pytest.mark.parametrize("name, simplified", [
+    ("天山遯", "天山遁"), ("天雷無妄", "天雷无妄"), ("水火既濟", "水火既济"), ("離為火", "离为火"),
+    ("山風蠱", "山风蛊"), ("雷澤歸妹", "雷泽归妹"), ("兌為澤", "兑为泽"), ("風水渙", "风水涣"),
+])
+def test_traditional_spellings(name, simplified):
+    assert normalize_name(name) == simplified
+    assert code_of_name(name) == code_of_name(simplified) is not None
+
+
+def test_static_and_unknown_names():
+    assert pair_key("艮") == pair_key("艮之艮") == pair_key("艮为山") == code_of_name("艮") * 65
+    for name in ("", "鼎之", "之恒", "鼎之不存在", "不存在", "鼎之恒之乾"):
+        assert pair_key(name) is None, name
+
+
+def test_pair_name_round_trip():
+    for key in range(hexagrams.PAIR_COUNT):
+        assert pair_key(pair_name(key)) == key
+
+
+def _db(path, entries):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE gui_para (name TEXT, param_order INTEGER, param_value TEXT)")
+    conn.executemany("INSERT INTO gui_para (name, param_order, param_value) VALUES (?, ?, ?)", entries)
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ParamIndex.load(_db(str(tmp_path / "para.db"), [
+        ("火风鼎之雷风恒", 2, " 乙 "), ("火风鼎之雷风恒", 1, "甲"),
+        ("艮為山", 1, "静"),
+        ("离宫 ： 特例", 1, "兜底"),
+        ("乾之坤", 1, "旧"), ("乾为天之坤为地", 1, "新"),          # 同一组合键：后导入的覆盖
+    ]))
+
+
+def test_load_groups_orders_and_slots(index):
+    assert index.names == 5
+    assert index.matched == 3
+    assert index.slots[DING_HENG] == ("甲", "乙")
+    assert index.slots[pair_key("乾之坤")] == ("新",)
+    assert list(index.others) == ["离宫:特例"]
+
+
+def test_lookup_prefers_codes(index):
+    # 卦体解析出的码优先于（可能对不上的）名字
+    assert index.lookup({"本卦码": DING, "变卦码": HENG, "卦象名字": "乾之坤"}) == ("甲", "乙")
+    assert index.lookup({"本卦码": "", "变卦码": "", "卦象名字": "鼎之恒"}) == ("甲", "乙")
+    assert index.lookup({"卦象名字": "", "本卦简称": "鼎", "变卦简称": "恒"}) == ("甲", "乙")
+    assert index.lookup({"卦象名字": "艮之艮"}) == ("静",)
+    assert index.lookup({"本卦码": code_of_name("艮"), "变卦码": code_of_name("艮")}) == ("静",)
+
+
+def test_lookup_falls_back_to_others(index):
+    assert index.key_for({"卦象名字": "离宫：特例"}) is None
+    assert index.lookup({"卦象名字": " 离宫 ：特例"}) == ("兜底",)
+    # 认得出卦名但槽位空着：仍按字符串在 others 里找
+    index.add("蒙之蒙", ("槽位",))
+    index.others["坎之坎"] = ("字符串",)
+    assert index.lookup({"卦象名字": "蒙之蒙"}) == ("槽位",)
+    assert index.lookup({"卦象名字": "坎之坎"}) == ("字符串",)
+    assert index.lookup({"卦象名字": "屯之屯"}) is None
+
+
+def test_empty_index():
+    index = ParamIndex()
+    assert index.matched == 0
+    assert index.lookup({"卦象名字": "鼎之恒", "本卦码": DING, "变卦码": HENG}) is None
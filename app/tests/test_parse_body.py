@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""卦体解析：真实采集的 196 条全部能解析，且各列与卦表（hexagrams）、界面简介里的卦象名字一致。"""
+import os
+
+import pytest
+from openpyxl import load_workbook
+
+import hexagrams
+from io_parse import _EMPTY_BODY_COLUMNS, LINE_NAMES, _parse_body
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gua_auto_results.xlsx")
+
+
+@pytest.fixture(scope="module")
+def captures():
+    wb = load_workbook(SAMPLE, read_only=True)
+    rows = wb.active.iter_rows(values_only=True)
+    headers = list(next(rows))
+    text, name = headers.index("卦象文本"), headers.index("卦象名字")
+    items = [(r[text], r[name]) for r in rows if r[text]]
+    wb.close()
+    assert len(items) == 196
+    return items
+
+
+def test_real_captures_agree_with_tables(captures):
+    for text, name in captures:
+        cols = _parse_body(text)
+        ben, bian, mask = cols["本卦码"], cols["变卦码"], cols["动爻码"]
+        h = hexagrams.HEXAGRAMS[ben]
+        assert hexagrams.pair_key(name) == ben * 64 + bian, name
+        assert bian == ben ^ mask
+        assert (cols["本卦全名"], cols["本卦宫位"]) == (h.full, h.label)
+        assert hexagrams.code_from_yinyang(cols["本卦爻象"]) == ben
+        assert (cols["世爻"], cols["应爻"]) == (h.shi, h.ying)
+        assert cols["宫位码"] == h.palace_code
+        assert cols["动爻"] == ",".join(str(i + 1) for i in range(6) if mask >> i & 1)
+        for i, pos in enumerate(LINE_NAMES):
+            assert cols[pos + "-六神"] and cols[pos + "-本"]
+            assert cols[pos + "-变"].startswith(("Ｏ", "Ｘ")) == bool(mask >> i & 1)
+
+
+def test_moving_captures_fill_bian_columns(captures):
+    moving = [_parse_body(text) for text, _name in captures]
+    moving = [c for c in moving if c["动爻码"]]
+    assert moving
+    for cols in moving:
+        h = hexagrams.HEXAGRAMS[cols["变卦码"]]
+        assert (cols["变卦全名"], cols["变卦宫位"]) == (h.full, h.label)
+        assert hexagrams.code_from_yinyang(cols["变卦爻象"]) == cols["变卦码"]
+        assert all(cols[pos + "-变"] for pos in LINE_NAMES)
+
+
+def test_static_captures(captures):
+    static = [(_parse_body(text), name) for text, name in captures]
+    static = [(c, name) for c, name in static if not c["动爻码"]]
+    assert len(static) == 34
+    for cols, name in static:
+        ben, sep, bian = name.partition("之")
+        assert sep and ben == bian                      # 界面简介里静卦写作“艮之艮”
+        assert cols["变卦码"] == cols["本卦码"]
+        assert cols["变卦全名"] == cols["变卦宫位"] == cols["变卦爻象"] == cols["动爻"] == ""
+        assert all(cols[pos + "-变"] == "" for pos in LINE_NAMES)
+
+
+def test_half_width_moving_marks(captures):
+    text = next(t for t, _name in captures if "Ｏ→" in t and "Ｘ→" in t)
+    expected = _parse_body(text)
+    assert _parse_body(text.replace("Ｏ→", "O→").replace("Ｘ→", "×→")) == expected
+
+
+@pytest.mark.parametrize("text", ["", "公历： 2025年10月13日18:28 星期一", "六神　　伏神　　火风鼎"])
+def test_missing_body_gives_empty_columns(text):
+    assert _parse_body(text) == _EMPTY_BODY_COLUMNS
+
+
+def test_garbled_line_gives_empty_columns(captures):
+    text = captures[0][0]
+    at = text.index("▆", text.index("六神"))
+    assert _parse_body(text[:at] + "??" + text[at + 1:]) == _EMPTY_BODY_COLUMNS
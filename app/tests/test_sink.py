@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""写入端：保存失败的行留着退避重试；停止时仍失败才放弃；窗口去重哈希只在写完后前移。"""
+import threading
+from datetime import datetime
+
+import pytest
+
+import corpus
+import sink as sink_mod
+from io_parse import ExcelWriteResult, build_excel_row
+from metrics import counters
+from workers import BaseWorker, HeadlessGui
+
+
+class _Flaky:
+    """前 fails 次保存抛 PermissionError（文件在 Excel 里打开），之后照常返回“已写入”。"""
+
+    def __init__(self, fails):
+        self.fails = fails
+        self.calls = []
+        self.ok = threading.Event()
+
+    def __call__(self, items, path):
+        self.calls.append([row["id"] for row, _params in items])
+        if self.fails is None or len(self.calls) <= self.fails:
+            raise PermissionError(13, "Permission denied", path)
+        self.ok.set()
+        return [ExcelWriteResult(True, dict(row)) for row, _params in items]
+
+
+@pytest.fixture
+def make_sink(tmp_path, monkeypatch):
+    def make(fails):
+        flaky = _Flaky(fails)
+        monkeypatch.setattr(sink_mod, "save_rows_to_excel", flaky)
+        logs = []
+        s = sink_mod.ResultSink(str(tmp_path / "results.xlsx"), log=logs.append, use_store=False)
+        s.RETRY_MIN_SEC = 0.05
+        s.RETRY_MAX_SEC = 0.2
+        s.IDLE_POLL_SEC = 0.02
+        return s, flaky, logs
+    counters.reset()
+    return make
+
+
+def test_failed_batch_is_retried(make_sink):
+    s, flaky, logs = make_sink(fails=2)
+    done = []
+    s.start()
+    for i in range(3):
+        s.submit({"id": i}, on_done=lambda row, result: done.append((row["id"], bool(result))))
+    assert flaky.ok.wait(5)
+    s.submit({"id": 3}, on_done=lambda row, result: done.append((row["id"], bool(result))))
+    s.stop()
+    s.join(5)
+
+    assert done == [(0, True), (1, True), (2, True), (3, True)]
+    assert flaky.calls[0] == flaky.calls[1] == flaky.calls[2][:len(flaky.calls[0])]
+    assert counters.get("write_retry") == 2
+    assert counters.get("write_failed") == 0
+    assert sum("稍后自动重试" in m for m in logs) == 1   # 连续失败只提示一次
+    assert any("已补写" in m for m in logs)
+
+
+def test_rows_given_up_only_at_stop(make_sink):
+    s, flaky, logs = make_sink(fails=None)
+    done = []
+    s.start()
+    s.submit({"id": 0}, on_done=lambda row, result: done.append(result))
+    s.submit({"id": 1}, on_done=lambda row, result: done.append(result))
+    s.stop()
+    s.join(5)
+
+    assert not s.is_alive()
+    assert done == [None, None]
+    assert counters.get("write_failed") == 2
+    assert any("2 行未写入" in m for m in logs)
+
+
+class _DroppingSink:
+    """保存一直失败、被放弃的写入端：回调 result=None。"""
+
+    def __init__(self):
+        self.rows = []
+
+    def submit(self, row, extra_params=None, on_done=None):
+        self.rows.append(row)
+        on_done(row, None)
+
+
+def test_dropped_row_does_not_advance_window_hash(tmp_path):
+    sample = next(corpus.iter_samples(3, 1, start=datetime(2025, 10, 1), edge_rate=0.0))
+    sink = _DroppingSink()
+    worker = BaseWorker(HeadlessGui(str(tmp_path / "results.xlsx")), sink=sink)
+
+    def capture():
+        row = build_excel_row(sample.full_text, sample.intro_text, datetime.now())
+        return worker._commit_row(row, sample.full_text)
+
+    assert capture()
+    assert capture()                      # 上一条没写成：同一结果再点一次仍提交
+    assert len(sink.rows) == 2
+
+    worker._on_written(sink.rows[-1], ExcelWriteResult(True, None))
+    assert not capture()                  # 写成之后才算重复
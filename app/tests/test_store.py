@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""结果库回填：返回值是真正新增的结果行数（汇总表/全文索引触发器的改动不算）。"""
+import os
+import shutil
+
+from openpyxl import load_workbook
+
+from store import ResultsStore, results_db_path
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gua_auto_results.xlsx")
+
+
+def _written_rows(excel: str) -> int:
+    wb = load_workbook(excel, read_only=True)
+    rows = wb.active.iter_rows(values_only=True)
+    col = next(rows).index("excel写入时间")
+    n = sum(1 for r in rows if r[col] is not None and str(r[col]).strip())
+    wb.close()
+    return n
+
+
+def test_sync_from_excel_returns_inserted_rows(tmp_path):
+    excel = str(tmp_path / "gua_auto_results.xlsx")
+    shutil.copy(SAMPLE, excel)
+    expected = _written_rows(excel)
+    store = ResultsStore(results_db_path(excel))
+    try:
+        assert store.sync_from_excel(excel) == expected
+        assert store.count() == expected
+        assert store.sync_from_excel(excel) == 0      # 再回填一遍：全是已有行
+        assert store.count() == expected
+    finally:
+        store.close()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""结果库导出：旧版结果文件（还没有卦体各列/卦码列）回填后，导出里这些列从卦象文本解析补齐。"""
+import os
+import shutil
+
+import pytest
+
+from io_parse import COL_ORDER, _parse_body
+from store import CODE_COLS, ResultsStore, results_db_path
+
+BODY_COLS = COL_ORDER[COL_ORDER.index("本卦全名"):COL_ORDER.index("来源窗口")]
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gua_auto_results.xlsx")   # 卦码列加入之前写出的真实结果文件
+
+
+@pytest.fixture
+def legacy_store(tmp_path):
+    excel = str(tmp_path / "gua_auto_results.xlsx")
+    shutil.copy(SAMPLE, excel)
+    store = ResultsStore(results_db_path(excel))
+    assert store.sync_from_excel(excel) > 0
+    yield store
+    store.close()
+
+
+def test_sample_has_no_body_columns():
+    from openpyxl import load_workbook
+
+    wb = load_workbook(SAMPLE, read_only=True)
+    headers = next(wb.active.iter_rows(max_row=1, values_only=True))
+    wb.close()
+    assert not set(BODY_COLS) & set(headers)
+
+
+def test_iter_rows_fills_body_columns(legacy_store):
+    rows = list(legacy_store.iter_rows())
+    assert rows
+    for row in rows:
+        body = _parse_body(row["卦象文本"])
+        assert body["本卦全名"], row.get("卦象名字")
+        assert {k: row.get(k) for k in BODY_COLS} == body
+        for name in CODE_COLS.values():
+            assert isinstance(row.get(name), int), (name, row.get("卦象名字"))
+
+
+def test_parquet_body_columns(legacy_store, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    from export_parquet import export
+
+    out_dir = str(tmp_path / "parquet")
+    rows, _months = export(legacy_store, out_dir)
+    table = pq.read_table(out_dir)
+    assert table.num_rows == rows
+    for name in CODE_COLS.values():
+        assert table.column(name).type == pa.uint8()
+    for name in ("世爻", "应爻"):
+        assert table.column(name).type == pa.int8()
+    # 只有解析结果本身为空的格子（静卦的变爻、没有伏神的爻）才是 null
+    texts = table.column("卦象文本").to_pylist()
+    for name in BODY_COLS:
+        expected = [_parse_body(t)[name] in ("", None) for t in texts]
+        assert [v is None for v in table.column(name).to_pylist()] == expected, name
+    for name in (*CODE_COLS.values(), "世爻", "应爻", "本卦全名", "初爻-本", "上爻-六神"):
+        assert table.column(name).null_count == 0
+
+
+def test_export_excel_writes_codes(legacy_store, tmp_path):
+    from openpyxl import load_workbook
+
+    out = str(tmp_path / "export.xlsx")
+    n = legacy_store.export_excel(out)
+    wb = load_workbook(out, read_only=True)
+    rows = wb.active.iter_rows(values_only=True)
+    headers = next(rows)
+    cols = [headers.index(name) for name in CODE_COLS.values()]
+    body = list(rows)
+    wb.close()
+    assert len(body) == n > 0
+    for values in body:
+        assert all(isinstance(values[i], int) for i in cols)
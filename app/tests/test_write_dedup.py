@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""写入去重：来源窗口标识不依赖句柄；从表尾往上找上一条最多看 DEDUP_SCAN_ROWS 行。"""
+from openpyxl import Workbook
+
+import io_parse
+from io_parse import _write_row
+from workers import window_labels
+
+HEADERS = ["序号", "excel写入时间", "哈希值", "来源窗口"]
+
+
+class _Rect:
+    def __init__(self, left, top):
+        self.left, self.top = left, top
+
+
+class _Main:
+    def __init__(self, handle, left, top):
+        self.handle = handle
+        self._rect = _Rect(left, top)
+
+    def rectangle(self):
+        return self._rect
+
+
+def test_single_window_has_no_label():
+    assert window_labels([(_Main(0x1234, 0, 0), "六爻")]) == [""]
+
+
+def test_labels_follow_screen_position_not_handles():
+    first = [(_Main(0x10, 800, 0), "六爻"), (_Main(0x20, 0, 0), "六爻"), (_Main(0x30, 0, 500), "六爻")]
+    # 重启后句柄、枚举顺序都变了，窗口还摆在原处
+    again = [(_Main(0x99, 0, 500), "六爻"), (_Main(0x77, 800, 0), "六爻"), (_Main(0x88, 0, 0), "六爻")]
+    assert window_labels(first) == ["窗口3", "窗口1", "窗口2"]
+    assert window_labels(again) == ["窗口2", "窗口3", "窗口1"]
+
+
+def _sheet(rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(HEADERS)
+    for i, (h, src) in enumerate(rows, 1):
+        ws.append([i, "2025-10-01 08:00:00", h, src])
+    return ws
+
+
+def _write(ws, h, source=None):
+    row = {"excel写入时间": "2025-10-02 08:00:00", "哈希值": h}
+    if source is not None:
+        row["来源窗口"] = source
+    return _write_row(ws, list(HEADERS), row, [], "results.xlsx")
+
+
+def test_same_window_duplicate_is_skipped():
+    ws = _sheet([("aaa", "窗口1"), ("bbb", "窗口2"), ("ccc", "窗口2")])
+    assert not _write(ws, "aaa", "窗口1")
+    assert _write(ws, "aaa", "窗口2")
+
+
+def test_without_label_compares_last_row():
+    ws = _sheet([("aaa", ""), ("bbb", "")])
+    assert not _write(ws, "bbb")
+    assert _write(ws, "aaa")
+
+
+def test_scan_depth_is_bounded(monkeypatch):
+    monkeypatch.setattr(io_parse, "DEDUP_SCAN_ROWS", 5)
+    # 同窗口的上一条在 8 行之上：超出扫描范围，不再当作重复（也不会扫完整张表）
+    ws = _sheet([("aaa", "窗口1")] + [(f"x{i}", "") for i in range(8)])
+    assert _write(ws, "aaa", "窗口1")
+    ws = _sheet([("aaa", "窗口1")] + [(f"x{i}", "") for i in range(3)])
+    assert not _write(ws, "aaa", "窗口1")
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""流式插入列：本表单元格/公式/合并区域/定义名称跟着右移；移不动的对象拒绝处理；calcChain 去掉。"""
+import zipfile
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.comments import Comment
+from openpyxl.workbook.defined_name import DefinedName
+
+from xlsx_stream import insert_cols
+
+
+def _basic(path, title="S"):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = title
+    ws.append(["序号", "卦象名字", "干支-日", "备注"])
+    ws.append([1, "乾为天", "甲子", "=C2&D2"])
+    ws.append([2, "坤为地", "乙丑", "=SUM(A2:A3)"])
+    ws["F2"] = f"='{title}'!C2"
+    ws.merge_cells("C5:D5")
+    ws.column_dimensions["C"].width = 21
+    wb.defined_names["区域"] = DefinedName("区域", attr_text=f"'{title}'!$B$2:$C$3")
+    return wb
+
+
+def test_shifts_cells_formulas_and_references(tmp_path):
+    path = str(tmp_path / "r.xlsx")
+    _basic(path).save(path)
+    assert insert_cols(path, 2, ["新1", "新2"]) == 2
+
+    wb = load_workbook(path)
+    ws = wb.active
+    assert [c.value for c in ws[1]][:6] == ["序号", "新1", "新2", "卦象名字", "干支-日", "备注"]
+    assert [c.value for c in ws[2]][:4] == [1, None, None, "乾为天"]
+    assert ws["F2"].value == "=E2&F2"
+    assert ws["F3"].value == "=SUM(A2:A3)"              # A 列在插入点左边，不动
+    assert ws["H2"].value == "='S'!E2"
+    assert [str(r) for r in ws.merged_cells.ranges] == ["E5:F5"]
+    assert ws.column_dimensions["E"].width == 21
+    assert wb.defined_names["区域"].attr_text == "'S'!$D$2:$E$3"
+
+
+def test_past_header_end_appends(tmp_path):
+    path = str(tmp_path / "r.xlsx")
+    _basic(path).save(path)
+    assert insert_cols(path, 50, ["尾"]) == 5
+    assert load_workbook(path).active["E1"].value == "尾"
+
+
+def _rejected(path):
+    with open(path, "rb") as f:
+        before = f.read()
+    with pytest.raises(ValueError):
+        insert_cols(path, 2, ["新"])
+    with open(path, "rb") as f:
+        assert f.read() == before                           # 原文件不动
+
+
+def test_rejects_comments(tmp_path):
+    path = str(tmp_path / "r.xlsx")
+    wb = _basic(path)
+    wb.active["C2"].comment = Comment("批注", "me")
+    wb.save(path)
+    _rejected(path)
+
+
+def test_rejects_cross_sheet_references(tmp_path):
+    path = str(tmp_path / "r.xlsx")
+    wb = _basic(path)
+    wb.create_sheet("其它")["A1"] = "=S!C2"
+    wb.save(path)
+    _rejected(path)
+
+
+def test_other_sheet_without_references_is_fine(tmp_path):
+    path = str(tmp_path / "r.xlsx")
+    wb = _basic(path)
+    other = wb.create_sheet("其它")
+    other["A1"] = "=B1+1"
+    other["B1"] = "S!C2"                                    # 普通文本，不是公式
+    wb.save(path)
+    insert_cols(path, 2, ["新"])
+    assert load_workbook(path)["其它"]["A1"].value == "=B1+1"
+
+
+def test_drops_calc_chain(tmp_path):
+    src, path = str(tmp_path / "src.xlsx"), str(tmp_path / "r.xlsx")
+    _basic(src).save(src)
+    # openpyxl 不写 calcChain：手工补一个（Excel 保存的文件里常有）
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            data = zin.read(info)
+            if info.filename == "[Content_Types].xml":
+                data = data.replace(b"</Types>", b'<Override PartName="/xl/calcChain.xml" ContentType='
+                                    b'"application/vnd.openxmlformats-officedocument.spreadsheetml.calcChain+xml"/>'
+                                    b"</Types>")
+            elif info.filename == "xl/_rels/workbook.xml.rels":
+                data = data.replace(b"</Relationships>", b'<Relationship Id="rIdCalc" Type="http://schemas.'
+                                    b'openxmlformats.org/officeDocument/2006/relationships/calcChain" '
+                                    b'Target="calcChain.xml"/></Relationships>')
+            zout.writestr(info, data)
+        zout.writestr("xl/calcChain.xml", '<calcChain xmlns="http://schemas.openxmlformats.org/'
+                                          'spreadsheetml/2006/main"><c r="D2" i="1"/><c r="D3"/></calcChain>')
+    insert_cols(path, 2, ["新"])
+
+    with zipfile.ZipFile(path) as z:
+        assert "xl/calcChain.xml" not in z.namelist()
+        assert b"calcChain" not in z.read("[Content_Types].xml")
+        assert b"calcChain" not in z.read("xl/_rels/workbook.xml.rels")
+    assert load_workbook(path).active["E2"].value == "=D2&E2"
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+triggers.py
+
+监测模式的“触发源”：把“点了按钮 / 按了回车 / 结果文本变了”变成边沿触发的事件，
+MonitorClickWorker 只需阻塞在 wait() 上，每个事件调用一次 _record_once。
+
+- PollingTriggerSource：兼容实现，轮询前台窗口/焦点/按键，但只在状态“变化的那一刻”出事件；
+- HookTriggerSource：WinEvent 钩子 + 低级键盘钩子，由系统回调推送事件，空闲时零轮询；
+- FakeTriggerSource：手动 fire()，供离线调试/测试驱动 Worker。
+
+所有实现共用同一套去抖：DEBOUNCE_SEC 内的多个事件（例如一次点击带来的焦点+文本变化）只算一次。
+"""
+import queue
+import threading
+import time
+
+
+class TriggerEvent:
+    """一次触发：kind ∈ {'click', 'enter', 'text'}，ts 为 time.monotonic()。"""
+
+    __slots__ = ("kind", "ts")
+
+    def __init__(self, kind: str, ts: float):
+        self.kind = kind
+        self.ts = ts
+
+    def __repr__(self) -> str:
+        return f"TriggerEvent({self.kind!r}, {self.ts:.3f})"
+
+
+class TriggerSource:
+    """触发源基类：start() / stop() / wait(timeout) -> TriggerEvent 或 None。"""
+
+    DEBOUNCE_SEC = 0.4
+
+    def __init__(self):
+        self._events = queue.Queue()
+        self._last_emit = float("-inf")
+        self._lock = threading.Lock()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def emit(self, kind: str) -> bool:
+        """推送一个事件（任意线程可调用）；落在去抖窗口内则丢弃并返回 False。"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_emit < self.DEBOUNCE_SEC:
+                return False
+            self._last_emit = now
+        self._events.put(TriggerEvent(kind, now))
+        return True
+
+    def wait(self, timeout: float = None):
+        """阻塞等待下一个事件；超时返回 None（调用方借此检查停止标志）。"""
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class FakeTriggerSource(TriggerSource):
+    """手动触发：fire('click') / fire('enter') / fire('text')。"""
+
+    DEBOUNCE_SEC = 0.0
+
+    def fire(self, kind: str = "click") -> bool:
+        return self.emit(kind)
+
+
+class PollingTriggerSource(TriggerSource):
+    """
+    轮询实现（兼容旧行为的检测条件），但改为边沿触发：
+    - 焦点移到按钮上 / 焦点在按钮上时左键按下 → 'click'
+    - 回车键按下的那一刻 → 'enter'
+    目标窗口不在前台时降频轮询，且不做跨进程的 get_focus 调用。
+    """
+
+    ACTIVE_POLL_SEC = 0.05
+    IDLE_POLL_SEC = 0.25
+
+    def __init__(self, main, btn):
+        super().__init__()
+        self.main = main
+        self.main_handle = main.handle
+        self.btn_handle = getattr(btn, "handle", None)
+        self._stop_evt = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_evt.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_evt.set()
+
+    def _loop(self):
+        import win32api
+        import win32con
+        import win32gui
+
+        was_on_btn = was_lbutton = was_enter = False
+        while not self._stop_evt.is_set():
+            active = False
+            try:
+                if win32gui.GetForegroundWindow() == self.main_handle:
+                    active = True
+                    focus = self.main.get_focus()
+                    on_btn = bool(focus and self.btn_handle and focus.handle == self.btn_handle)
+                    lbutton = bool(win32api.GetAsyncKeyState(win32con.VK_LBUTTON) & 0x8000)
+                    if on_btn and (not was_on_btn or (lbutton and not was_lbutton)):
+                        self.emit("click")
+                    enter = bool(win32api.GetAsyncKeyState(win32con.VK_RETURN) & 0x8000)
+                    if enter and not was_enter:
+                        self.emit("enter")
+                    was_on_btn, was_lbutton, was_enter = on_btn, lbutton, enter
+                else:
+                    was_on_btn = was_lbutton = was_enter = False
+            except Exception:
+                # 任何 UI 小抖动都吞掉，避免刷异常
+                pass
+            self._stop_evt.wait(self.ACTIVE_POLL_SEC if active else self.IDLE_POLL_SEC)
+
+
+class HookTriggerSource(TriggerSource):
+    """
+    事件驱动实现：在独立线程里安装钩子并跑消息循环（GetMessage 阻塞，空闲不占 CPU）。
+    - WinEvent（仅目标进程）：按钮获得焦点 / 按钮开始捕获鼠标 → 'click'；结果 Edit 文本变化 → 'text'
+    - 低级键盘钩子：目标窗口在前台时回车按下 → 'enter'
+    安装失败时 start() 抛 RuntimeError，调用方可退回 PollingTriggerSource。
+    """
+
+    EVENT_SYSTEM_CAPTURESTART = 0x0008
+    EVENT_OBJECT_FOCUS = 0x8005
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    EVENT_OBJECT_VALUECHANGE = 0x800E
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WH_KEYBOARD_LL = 13
+    WM_KEYDOWN = 0x0100
+    WM_SYSKEYDOWN = 0x0104
+    WM_QUIT = 0x0012
+    VK_RETURN = 0x0D
+    START_TIMEOUT_SEC = 2.0
+
+    def __init__(self, main, btn, result_edit):
+        super().__init__()
+        self.main_handle = main.handle
+        self.btn_handle = getattr(btn, "handle", None)
+        self.edit_handle = getattr(result_edit, "handle", None)
+        self._thread = None
+        self._thread_id = 0
+        self._ready = threading.Event()
+        self._error = None
+        self._enter_down = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        if not self._ready.wait(self.START_TIMEOUT_SEC):
+            raise RuntimeError("安装钩子超时")
+        if self._error is not None:
+            raise RuntimeError(f"安装钩子失败：{self._error}")
+
+    def stop(self):
+        if self._thread_id:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+
+    def _loop(self):
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        LRESULT = ctypes.c_ssize_t
+
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+        LowLevelKeyboardProc = ctypes.WINFUNCTYPE(LRESULT, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+
+        class KBDLLHOOKSTRUCT(ctypes.Structure):
+            _fields_ = [("vkCode", wintypes.DWORD), ("scanCode", wintypes.DWORD),
+                        ("flags", wintypes.DWORD), ("time", wintypes.DWORD),
+                        ("dwExtraInfo", ctypes.c_size_t)]
+
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.SetWinEventHook.argtypes = [wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, WinEventProc,
+                                           wintypes.DWORD, wintypes.DWORD, wintypes.DWORD]
+        user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+        user32.SetWindowsHookExW.restype = wintypes.HANDLE
+        user32.SetWindowsHookExW.argtypes = [ctypes.c_int, LowLevelKeyboardProc, wintypes.HINSTANCE, wintypes.DWORD]
+        user32.CallNextHookEx.restype = LRESULT
+        user32.CallNextHookEx.argtypes = [wintypes.HANDLE, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM]
+        user32.UnhookWindowsHookEx.argtypes = [wintypes.HANDLE]
+        user32.GetForegroundWindow.restype = wintypes.HWND
+        kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+
+        def on_win_event(_hook, event, hwnd, _obj, _child, _tid, _ts):
+            try:
+                if event in (self.EVENT_OBJECT_FOCUS, self.EVENT_SYSTEM_CAPTURESTART):
+                    if hwnd and hwnd == self.btn_handle:
+                        self.emit("click")
+                elif hwnd and hwnd == self.edit_handle:
+                    self.emit("text")
+            except Exception:
+                pass
+
+        def on_key(code, wparam, lparam):
+            try:
+                if code >= 0:
+                    kb = ctypes.cast(lparam, ctypes.POINTER(KBDLLHOOKSTRUCT)).contents
+                    if kb.vkCode == self.VK_RETURN:
+                        down = wparam in (self.WM_KEYDOWN, self.WM_SYSKEYDOWN)
+                        # 只在“按下的那一刻”触发，按住自动重复不算
+                        if down and not self._enter_down and user32.GetForegroundWindow() == self.main_handle:
+                            self.emit("enter")
+                        self._enter_down = down
+            except Exception:
+                pass
+            return user32.CallNextHookEx(None, code, wparam, lparam)
+
+        # 回调对象必须保持引用，否则会被回收导致崩溃
+        self._win_proc = WinEventProc(on_win_event)
+        self._kb_proc = LowLevelKeyboardProc(on_key)
+
+        win_hooks = []
+        kb_hook = None
+        try:
+            self._thread_id = kernel32.GetCurrentThreadId()
+            pid = wintypes.DWORD()
+            user32.GetWindowThreadProcessId(self.main_handle, ctypes.byref(pid))
+            for lo, hi in ((self.EVENT_SYSTEM_CAPTURESTART, self.EVENT_SYSTEM_CAPTURESTART),
+                           (self.EVENT_OBJECT_FOCUS, self.EVENT_OBJECT_FOCUS),
+                           (self.EVENT_OBJECT_NAMECHANGE, self.EVENT_OBJECT_VALUECHANGE)):
+                h = user32.SetWinEventHook(lo, hi, None, self._win_proc, pid.value, 0, self.WINEVENT_OUTOFCONTEXT)
+                if not h:
+                    raise ctypes.WinError()
+                win_hooks.append(h)
+            kb_hook = user32.SetWindowsHookExW(self.WH_KEYBOARD_LL, self._kb_proc,
+                                               kernel32.GetModuleHandleW(None), 0)
+            if not kb_hook:
+                raise ctypes.WinError()
+        except Exception as e:
+            self._error = e
+            for h in win_hooks:
+                user32.UnhookWinEvent(h)
+            self._ready.set()
+            return
+
+        self._ready.set()
+        msg = wintypes.MSG()
+        try:
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            for h in win_hooks:
+                user32.UnhookWinEvent(h)
+            user32.UnhookWindowsHookEx(kb_hook)
+
+
+def create_trigger_source(main, btn, result_edit, log=None) -> TriggerSource:
+    """优先使用钩子实现；安装失败时退回轮询实现。返回已 start() 的触发源。"""
+    try:
+        src = HookTriggerSource(main, btn, result_edit)
+        src.start()
+        return src
+    except Exception as e:
+        if log:
+            log(f"事件钩子不可用（{e}），改用轮询检测。")
+    src = PollingTriggerSource(main, btn)
+    src.start()
+    return src
@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
 import tkinter as tk
+from tkinter import ttk
 from tkinter import messagebox
 from tkinter import filedialog  # 新增：用于选择数据库文件/Excel
-from datetime import datetime
 
-from workers import AutoClickWorker, MonitorClickWorker
-from io_parse import insert_blank_cols, COL_ORDER
+from io_parse import insert_blank_cols_batch, COL_ORDER
+from metrics import counters, metrics, MetricsDumper
+from profiling import ProfileOptions, options_from_env
+from logview import LogPump
+from sink import header_cache
 import sys, os
+import threading
+import time
+from collections import deque
 
 def resource_path(filename: str) -> str:
     """兼容 PyInstaller --onefile 的资源路径解析"""
@@ -24,6 +30,9 @@ class LiuyaoGUI:
     DEFAULT_BUTTON_TEXT = "电脑起卦"
     DEFAULT_EXCEL_PATH = "./gua_auto_results.xlsx"
     DEFAULT_INTERVAL_SEC = 5
+    DEFAULT_BURST_PER_MIN = 60
+    DEFAULT_PROFILE_SEC = 300
+    DEFAULT_LOG_PATH = "./liuyao_reader.log"
     DEFAULT_BACKEND = "win32"
     DEFAULT_WAIT_TIMEOUT = 5.0
     DEFAULT_WAIT_POLL = 0.15
@@ -36,7 +45,7 @@ class LiuyaoGUI:
             pass
         self.root = tk.Tk()
         self.root.title("自动读取工具")
-        self.root.geometry("720x640")  # 高度略增以容纳新增区块
+        self.root.geometry("720x700")  # 高度略增以容纳新增区块
 
         frm = tk.Frame(self.root)
         frm.pack(pady=10, padx=10, fill="x")
@@ -81,10 +90,18 @@ class LiuyaoGUI:
         tk.Radiobutton(frm, text="自动点击模式",
                        variable=self.mode_var, value="auto",
                        command=self._toggle_interval).pack(anchor="w", padx=20)
+        tk.Radiobutton(frm, text="高速连拍模式（按每分钟条数）",
+                       variable=self.mode_var, value="burst",
+                       command=self._toggle_interval).pack(anchor="w", padx=20)
 
         self.interval_var = tk.StringVar(value=str(self.DEFAULT_INTERVAL_SEC))
         self.interval_row = add_entry("间隔秒数：", self.interval_var, str(self.DEFAULT_INTERVAL_SEC))
 
+        self.burst_var = tk.StringVar(value=str(self.DEFAULT_BURST_PER_MIN))
+        self.burst_row = add_entry("目标条数/分钟：", self.burst_var, str(self.DEFAULT_BURST_PER_MIN))
+        self.rate_var = tk.StringVar(value="")
+        tk.Label(self.burst_row, textvariable=self.rate_var, fg="#555", width=22, anchor="w").pack(side="left")
+
         # ======= 新增：批量插入空列配置区 =======
         sep = tk.Label(self.root, text="—— 批量在 Excel 中插入空列 ——", fg="#555")
         sep.pack(pady=(8, 4))
@@ -119,6 +136,8 @@ class LiuyaoGUI:
         btn_row = tk.Frame(cfg)
         btn_row.pack(fill="x", pady=4)
         tk.Button(btn_row, text="批量增加列", width=15, command=self.add_blank_cols).pack(side="left", padx=6)
+        tk.Button(btn_row, text="应用到多个文件…", width=15,
+                  command=lambda: self.add_blank_cols(multi=True)).pack(side="left", padx=6)
 
         # ======= 原有开始/停止与日志 =======
         btnfrm = tk.Frame(self.root)
@@ -126,6 +145,20 @@ class LiuyaoGUI:
         tk.Button(btnfrm, text="▶ 开始读取", width=15, command=self.start).pack(side="left", padx=10)
         tk.Button(btnfrm, text="■ 停止读取", width=15, command=self.stop).pack(side="left", padx=10)
         tk.Button(btnfrm, text="打印设置…", width=12, command=self._open_print_config).pack(side="left", padx=10)
+        tk.Button(btnfrm, text="性能统计…", width=12, command=self._open_stats_panel).pack(side="left", padx=10)
+        tk.Button(btnfrm, text="结果浏览…", width=12, command=self._open_results_browser).pack(side="left", padx=10)
+        self.metrics_var = tk.BooleanVar(value=metrics.enabled)
+        tk.Checkbutton(btnfrm, text="记录耗时", variable=self.metrics_var,
+                       command=self._toggle_metrics).pack(side="left")
+        self.profile_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(btnfrm, text=f"性能剖析（{self.DEFAULT_PROFILE_SEC // 60} 分钟）",
+                       variable=self.profile_var).pack(side="left")
+
+        # 运行状态条：每秒汇总一次计数器
+        self.stats_var = tk.StringVar(value="")
+        tk.Label(self.root, textvariable=self.stats_var, fg="#333", anchor="w",
+                 font=("Consolas", 9)).pack(fill="x", padx=12)
+        self._rate_hist = deque(maxlen=61)   # (monotonic, 累计写入条数)，用于算最近 1 分钟速率
 
         # 文本 + 垂直滚动条（支持拖动）
         log_frame = tk.Frame(self.root)
@@ -135,8 +168,11 @@ class LiuyaoGUI:
         self.log_text = tk.Text(log_frame, height=16, wrap="word", yscrollcommand=ybar.set)
         self.log_text.pack(side="left", fill="both", expand=True)
         ybar.config(command=self.log_text.yview)
+        # Worker 线程只入队；Tk 线程定时批量刷到控件并写滚动日志文件
+        self._log_pump = LogPump(self.root, self.log_text, file_path=self.DEFAULT_LOG_PATH)
 
         self.thread = None
+        self._metrics_dumper = None
         self._toggle_interval()
         self._rebuild_name_inputs()  # 根据初始 N=0 初始化一次
 
@@ -145,6 +181,7 @@ class LiuyaoGUI:
         self._icon_state = "idle"     # 'idle' / 'running'
         self._set_app_icon("idle")
         self.print_fields = ["卦象名字"]
+        self.root.after(1000, self._refresh_stats)
 
     # ===== UI 工具 =====
     def _get_available_print_fields(self):
@@ -157,29 +194,17 @@ class LiuyaoGUI:
                     fields.append(nm)
                     seen.add(nm)
 
+        # 表头由写入端维护缓存；只有缓存失效（或从未写过）时才读一次首行
         path = self.excel_var.get().strip()
-        if path and os.path.exists(path):
-            wb = None
+        if path:
             try:
-                from openpyxl import load_workbook
-
-                wb = load_workbook(path, read_only=True, data_only=True)
-                ws = wb.active
-                for row in ws.iter_rows(min_row=1, max_row=1):
-                    for cell in row:
-                        val = cell.value
-                        nm = "" if val is None else str(val).strip()
-                        if nm and nm not in seen:
-                            fields.append(nm)
-                            seen.add(nm)
-                    break
-            except FileNotFoundError:
-                pass
+                for val in header_cache.headers(path) or ():
+                    nm = "" if val is None else str(val).strip()
+                    if nm and nm not in seen:
+                        fields.append(nm)
+                        seen.add(nm)
             except Exception as exc:
                 self.log(f"读取 Excel 列失败：{exc}")
-            finally:
-                if wb is not None:
-                    wb.close()
         return fields
 
     def _choose_excel(self):
@@ -289,15 +314,102 @@ class LiuyaoGUI:
         tk.Button(bot, text="确定", width=10, command=_ok).pack(side="right", padx=6)
 
 
+    def _toggle_metrics(self):
+        metrics.enabled = bool(self.metrics_var.get())
+        self.log(f"分阶段耗时统计已{'开启' if metrics.enabled else '关闭'}")
+
+    def _refresh_stats(self):
+        """每秒刷新运行状态条：写入速率/重复/解析失败/队列深度/上次保存耗时/缓存命中率。"""
+        now = time.monotonic()
+        written = counters.get("written")
+        self._rate_hist.append((now, written))
+        t0, w0 = self._rate_hist[0]
+        per_min = (written - w0) * 60.0 / (now - t0) if now > t0 else 0.0
+
+        sink = getattr(self.thread, "sink", None)
+        depth = sink.pending() if sink is not None else 0
+        last_save = counters.gauges.get("last_save_ms")
+
+        def _rate(prefix):
+            hit, miss = counters.get(f"{prefix}_hit"), counters.get(f"{prefix}_miss")
+            return f"{hit * 100.0 / (hit + miss):.0f}%" if (hit + miss) else "—"
+
+        self.stats_var.set(
+            f"写入 {per_min:.1f} 条/分（共 {written}） | 重复跳过 {counters.get('dup_skipped')}"
+            f" | 解析失败 {counters.get('parse_failed')} | 写入队列 {depth}"
+            f" | 上次保存 {'—' if last_save is None else f'{last_save:.0f} ms'}"
+            f" | 缓存命中 参数 {_rate('param_cache')} / 表头 {_rate('header_cache')}"
+        )
+        self.root.after(1000, self._refresh_stats)
+
+    def _open_results_browser(self):
+        """结果浏览：查询结果库，不打开 Excel（采集中打开 Excel 会锁文件导致写入失败）。"""
+        path = self.excel_var.get().strip()
+        if not path:
+            messagebox.showwarning("提示", "请先设置 Excel 路径。")
+            return
+        try:
+            from browser import ResultsBrowser
+            ResultsBrowser(self.root, path, log=self.log)
+        except Exception as e:
+            messagebox.showerror("错误", f"打开结果库失败：{e}")
+
+    def _open_stats_panel(self):
+        """性能统计面板：各阶段 p50/p95/p99/max（毫秒），每秒刷新。"""
+        top = tk.Toplevel(self.root)
+        top.title("性能统计（毫秒）")
+        top.geometry("620x320")
+
+        cols = ("stage", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+        heads = ("阶段", "次数", "平均", "p50", "p95", "p99", "max")
+        tree = ttk.Treeview(top, columns=cols, show="headings", height=12)
+        for c, h in zip(cols, heads):
+            tree.heading(c, text=h)
+            tree.column(c, width=120 if c == "stage" else 70, anchor="w" if c == "stage" else "e")
+        tree.pack(fill="both", expand=True, padx=8, pady=(8, 4))
+
+        bar = tk.Frame(top)
+        bar.pack(fill="x", padx=8, pady=(0, 8))
+        hint = tk.StringVar()
+        tk.Label(bar, textvariable=hint, fg="#555").pack(side="left")
+        tk.Button(bar, text="清零", width=8, command=metrics.reset).pack(side="right")
+
+        def _refresh():
+            if not str(top.winfo_exists()) == "1":
+                return
+            tree.delete(*tree.get_children())
+            for stage, st in metrics.snapshot().items():
+                tree.insert("", "end", values=(stage,) + tuple(st[c] for c in cols[1:]))
+            hint.set("" if metrics.enabled else "未开启“记录耗时”，数据不会更新")
+            top.after(1000, _refresh)
+
+        _refresh()
+
     def _toggle_interval(self):
-        if self.mode_var.get() == "auto":
+        mode = self.mode_var.get()
+        if mode == "auto":
             self.interval_row.pack(fill="x", pady=3)
         else:
             self.interval_row.pack_forget()
+        if mode == "burst":
+            self.burst_row.pack(fill="x", pady=3)
+        else:
+            self.burst_row.pack_forget()
+
+    def _refresh_rate(self):
+        """高速连拍模式下每秒刷新一次“实际/目标”速率。"""
+        th = self.thread
+        if th is None or not th.is_alive():
+            return
+        from workers import BurstClickWorker
+        if th.worker_cls is not BurstClickWorker:
+            return
+        self.rate_var.set(f"实际 {th.achieved_per_min():.1f} / 目标 {th.target_per_min} 条/分")
+        self.root.after(1000, self._refresh_rate)
 
     def log(self, text):
-        self.log_text.insert(tk.END, f"{datetime.now():%H:%M:%S}  {text}\n")
-        self.log_text.see(tk.END)
+        """任意线程可调用：只入队，不直接操作 Text 控件。"""
+        self._log_pump.put(text)
 
     def alert_error(self, msg: str):
         messagebox.showerror("错误", msg)
@@ -444,25 +556,53 @@ class LiuyaoGUI:
                 messagebox.showerror("错误", "间隔秒数必须为整数。")
                 return
 
+        # 高速连拍模式校验目标速率
+        if self.mode_var.get() == "burst":
+            try:
+                per_min = int(self.burst_var.get())
+                if per_min < 1:
+                    messagebox.showwarning("警告", "目标条数/分钟必须大于0。")
+                    return
+            except ValueError:
+                messagebox.showerror("错误", "目标条数/分钟必须为整数。")
+                return
+
         # 创建对应 worker（与原实现一致:contentReference[oaicite:2]{index=2}）
-        if self.mode_var.get() == "auto":
-            self.thread = AutoClickWorker(
-                gui=self,
-                backend=self.DEFAULT_BACKEND,
-                wait_timeout=self.DEFAULT_WAIT_TIMEOUT,
-                wait_poll=self.DEFAULT_WAIT_POLL,
-                interval_sec=int(self.interval_var.get())
-            )
+        # 由 CaptureGroup 发现所有匹配窗口，每个窗口一个 worker，共用一个写入端
+        # workers 连带 pywinauto/win32 等较重的模块，首次开始读取时才导入，不拖慢窗口出现
+        from workers import AutoClickWorker, BurstClickWorker, CaptureGroup, MonitorClickWorker
+
+        prefix = os.path.splitext(self.excel_var.get().strip() or self.DEFAULT_EXCEL_PATH)[0]
+        profile = options_from_env(prefix)
+        if profile is None and self.profile_var.get():
+            profile = ProfileOptions(self.DEFAULT_PROFILE_SEC, out_prefix=prefix)
+        common = dict(
+            gui=self,
+            backend=self.DEFAULT_BACKEND,
+            wait_timeout=self.DEFAULT_WAIT_TIMEOUT,
+            wait_poll=self.DEFAULT_WAIT_POLL,
+            profile=profile,
+        )
+        if self.mode_var.get() == "burst":
+            self.thread = CaptureGroup(worker_cls=BurstClickWorker,
+                                       target_per_min=int(self.burst_var.get()), **common)
+        elif self.mode_var.get() == "auto":
+            self.thread = CaptureGroup(worker_cls=AutoClickWorker,
+                                       interval_sec=int(self.interval_var.get()), **common)
         else:
-            self.thread = MonitorClickWorker(
-                gui=self,
-                backend=self.DEFAULT_BACKEND,
-                wait_timeout=self.DEFAULT_WAIT_TIMEOUT,
-                wait_poll=self.DEFAULT_WAIT_POLL
-            )
+            self.thread = CaptureGroup(worker_cls=MonitorClickWorker, **common)
 
+        counters.reset()
+        self._rate_hist.clear()
         self.thread.start()
-        self.log(f"开始运行（模式：{'自动点击' if self.mode_var.get() == 'auto' else '监测点击'}）")
+        if metrics.enabled:
+            self._metrics_dumper = MetricsDumper(prefix)
+            self._metrics_dumper.start()
+        mode_name = {"auto": "自动点击", "burst": "高速连拍"}.get(self.mode_var.get(), "监测点击")
+        self.log(f"开始运行（模式：{mode_name}）")
+        if self.mode_var.get() == "burst":
+            self.rate_var.set("")
+            self.root.after(1000, self._refresh_rate)
 
         # —— 新增：运行中图标与大提示层 ——
         self._set_app_icon("running")
@@ -474,14 +614,16 @@ class LiuyaoGUI:
             self.log("已请求停止...")
         else:
             self.log("当前无运行任务。")
+        if self._metrics_dumper is not None:
+            self._metrics_dumper.stop()
+            self._metrics_dumper = None
 
         # —— 新增：恢复图标与关闭提示层 ——
         self._set_app_icon("idle")
         self._hide_overlay()
 
-    def add_blank_cols(self):
-        """点击【批量增加列】后触发：按 UI 配置在 Excel 中插入空列。"""
-        path = self.excel_var.get().strip()
+    def add_blank_cols(self, multi: bool = False):
+        """点击【批量增加列】后触发：按 UI 配置在 Excel 中插入空列（multi=True 时可选多个工作簿）。"""
         try:
             x = int(self.x_var.get().strip())
         except Exception:
@@ -490,16 +632,42 @@ class LiuyaoGUI:
 
         # 收集列名
         names = [v.get().strip() for v in self.name_vars]
+        if not names:
+            self.alert_error("插入列数 N 必须大于 0。")
+            return
         if any(n == "" for n in names):
             self.alert_error("列名不能为空，请补全。")
             return
 
-        try:
-            insert_blank_cols(path, x, names)
-            self.log(f"已在 {path} 的第 {x} 列前插入 {len(names)} 列：{names}")
-            messagebox.showinfo("成功", "已完成插入。若 Excel 正在打开，请先关闭文件后再执行。")
-        except Exception as e:
-            self.alert_error(f"插入失败：{e}")
+        if multi:
+            paths = list(filedialog.askopenfilenames(
+                title="选择要插入列的 Excel 文件（可多选）",
+                filetypes=[("Excel 工作簿", "*.xlsx"), ("所有文件", "*.*")]))
+            if not paths:
+                return
+        else:
+            paths = [self.excel_var.get().strip()]
+
+        # 流式改写，大文件也要若干秒：放到后台线程，结束后回到 Tk 线程提示
+        def _work():
+            results = insert_blank_cols_batch(paths, x, names)
+            failed = []
+            for p, at, err in results:
+                if err is None:
+                    self.log(f"已在 {p} 的第 {at} 列前插入 {len(names)} 列：{names}")
+                else:
+                    self.log(f"插入失败：{p}：{err}")
+                    failed.append(p)
+            self._log_pump.post(lambda: self._on_cols_inserted(len(results), failed))
+
+        self.log(f"开始插入列（{len(paths)} 个文件）…")
+        threading.Thread(target=_work, daemon=True).start()
+
+    def _on_cols_inserted(self, total: int, failed: list):
+        if failed:
+            self.alert_error(f"{len(failed)}/{total} 个文件插入失败（详见日志）。若 Excel 正在打开，请先关闭文件后再执行。")
+        else:
+            messagebox.showinfo("成功", f"已完成插入（{total} 个文件）。")
 
     def run(self):
         self.root.mainloop()
@@ -1,9 +1,23 @@
 # -*- coding: utf-8 -*-
 import re
 import time
-from pywinauto import Desktop, Application
 
 def connect_main(title_pattern: str, backend: str = "win32"):
+    for main, matched_title in _iter_matching(title_pattern, backend):
+        return main, matched_title
+    raise RuntimeError(f"未找到匹配窗口（标题包含：{title_pattern}）")
+
+def connect_all(title_pattern: str, backend: str = "win32"):
+    """返回所有标题匹配的窗口 [(main, matched_title), ...]（多开场景）；一个都没有时抛错。"""
+    found = list(_iter_matching(title_pattern, backend))
+    if not found:
+        raise RuntimeError(f"未找到匹配窗口（标题包含：{title_pattern}）")
+    return found
+
+def _iter_matching(title_pattern: str, backend: str):
+    # pywinauto（连带 comtypes/win32 模块）加载很慢，推迟到第一次找窗口时才导入
+    from pywinauto import Desktop, Application
+
     desk = Desktop(backend=backend)
     pattern = re.escape(title_pattern)
     for w in desk.windows():
@@ -12,8 +26,7 @@ def connect_main(title_pattern: str, backend: str = "win32"):
             app = Application(backend=backend).connect(handle=w.handle)
             main = app.window(handle=w.handle)
             main.wait("visible", timeout=5)
-            return main, matched_title
-    raise RuntimeError(f"未找到匹配窗口（标题包含：{title_pattern}）")
+            yield main, matched_title
 
 def find_controls(main, button_text: str):
     """
@@ -65,8 +78,8 @@ def find_controls(main, button_text: str):
     return btn, result_edit, intro_static
 
 def wait_text_change(edit, old_text: str, timeout: float = 5.0, poll: float = 0.15) -> str:
-    t0 = time.time()
-    while time.time() - t0 < timeout:
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < timeout:
         try:
             t = edit.window_text()
         except Exception:
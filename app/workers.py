@@ -1,16 +1,51 @@
 # -*- coding: utf-8 -*-
 import threading
 import time
+from collections import deque
 from datetime import datetime
 import os
 import sqlite3
 
-import win32gui
-import win32con
-import win32api
-
+from capture_archive import CaptureArchive, archive_prefix
+from diagnostics import parse_telemetry
 from io_parse import build_excel_row, save_row_to_excel
-from winops import connect_main, find_controls, wait_text_change
+from metrics import counters, metrics
+from param_index import ParamIndex
+from profiling import MemoryTracer, WorkerProfiler
+from sink import ResultSink
+from triggers import create_trigger_source
+from winops import connect_all, connect_main, find_controls, wait_text_change
+
+
+class _ConstVar:
+    """只读的 tk 变量替身：get() 返回固定值。"""
+
+    def __init__(self, value=""):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+
+class HeadlessGui:
+    """
+    无界面时代替 ui.py 主窗体：只提供 Worker/写入端用到的属性（基准、回放等离线工具共用）。
+    log 为日志回调，不给则丢弃；alert_error 也走它。
+    """
+
+    def __init__(self, excel: str, db: str = "", log=None):
+        self.excel_var = _ConstVar(excel)
+        self.db_var = _ConstVar(db)
+        self.title_var = _ConstVar("")
+        self.button_var = _ConstVar("")
+        self.print_fields = ["卦象名字"]
+        self._log = log or (lambda _msg: None)
+
+    def log(self, msg: str):
+        self._log(msg)
+
+    def alert_error(self, msg: str):
+        self._log(msg)
 
 
 class BaseWorker(threading.Thread):
@@ -20,13 +55,26 @@ class BaseWorker(threading.Thread):
     SETTLE_POLLS = 6           # 稳定轮询次数上限
     SETTLE_GAP_SEC = 0.08      # 稳定轮询间隔
 
-    def __init__(self, gui, backend: str = "win32", wait_timeout: float = 5.0, wait_poll: float = 0.15):
+    def __init__(self, gui, backend: str = "win32", wait_timeout: float = 5.0, wait_poll: float = 0.15,
+                 window=None, sink=None, source: str = "", profile=None, archive=None):
         super().__init__(daemon=True)
         self.gui = gui
         self.backend = backend
         self.wait_timeout = wait_timeout
         self.wait_poll = wait_poll
 
+        # 多开：window=(main, matched_title) 时直接使用，不再自行查找；sink 为共享写入端
+        self.window = window
+        self.sink = sink
+        self.source = source          # 写入“来源窗口”列的标识
+        self.log_prefix = ""          # 多窗口时给日志加前缀
+        self._last_hash = None        # 本窗口上一条已写完的哈希（窗口级去重；写入端回调里才前移）
+        self._pending_hash = None     # 已交给写入端、还没写完的那条的哈希
+        self.profile = profile        # ProfileOptions：非 None 时本线程在剖析下运行
+        self._profiler = None
+        self._params = None           # ParamIndex：gui_para 整表的内存索引（_prepare 时加载）
+        self.archive = archive        # CaptureArchive：解析前追加原始文本（CaptureGroup 共用一个）
+
         self.stop_flag = False
         self.last_text = ""
         self.cooldown_until = 0
@@ -43,10 +91,45 @@ class BaseWorker(threading.Thread):
     def stop(self):
         self.stop_flag = True
 
+    def run(self):
+        """线程入口：按需包一层剖析，再进入各模式的主循环 _run()。"""
+        if self.profile is not None:
+            self._profiler = WorkerProfiler(self.profile, tag=self.source or type(self).__name__)
+            self._profiler.start()
+        try:
+            self._run()
+        finally:
+            if self._profiler is not None:
+                self._profiler.finish()
+                if self._profiler.outputs:
+                    self._log(f"剖析结果已写入：{', '.join(self._profiler.outputs)}")
+
+    def _run(self):
+        """各模式（定时/监听）覆盖此方法；基类本身没有采集循环，记一条日志后线程直接结束。"""
+        self._log(f"{type(self).__name__} 没有采集循环，线程结束")
+
+    def _profile_tick(self):
+        if self._profiler is not None:
+            self._profiler.tick()
+
+    def _sleep_until(self, deadline: float):
+        """按单调时钟睡到 deadline，期间每 0.1s 检查一次停止标志。"""
+        while not self.stop_flag:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            time.sleep(min(0.1, left))
+
+    def _log(self, msg: str):
+        self.gui.log(f"{self.log_prefix}{msg}")
+
     def _prepare(self):
         # 连接窗口与控件
-        main, matched_title = connect_main(self.gui.title_var.get(), backend=self.backend)
-        self.gui.log(f"匹配到窗口：{matched_title}")
+        if self.window is not None:
+            main, matched_title = self.window
+        else:
+            main, matched_title = connect_main(self.gui.title_var.get(), backend=self.backend)
+        self._log(f"匹配到窗口：{matched_title}")
         btn, result_edit, intro_static = find_controls(main, self.gui.button_var.get())
 
         self.main = main
@@ -65,9 +148,9 @@ class BaseWorker(threading.Thread):
             if hasattr(self.gui, "db_var"):
                 self._db_path = (self.gui.db_var.get() or "").strip()
             if not self._db_path:
-                self.gui.log("未配置数据库文件（可在“数据库文件”栏选择），将不追加参数列。")
+                self._log("未配置数据库文件（可在“数据库文件”栏选择），将不追加参数列。")
             elif not os.path.exists(self._db_path):
-                self.gui.log(f"数据库文件不存在：{self._db_path}，将不追加参数列。")
+                self._log(f"数据库文件不存在：{self._db_path}，将不追加参数列。")
             else:
                 try:
                     conn = sqlite3.connect(self._db_path)
@@ -75,17 +158,19 @@ class BaseWorker(threading.Thread):
                     cur.execute("SELECT COUNT(1) FROM sqlite_master WHERE type='table' AND name='gui_para'")
                     has_table = (cur.fetchone() or [0])[0] == 1
                     if not has_table:
-                        self.gui.log("数据库连接成功，但未找到表 gui_para，将不追加参数列。")
-                    else:
-                        cur.execute("SELECT COUNT(*) FROM gui_para")
-                        cnt = (cur.fetchone() or [0])[0]
-                        self.gui.log(f"数据库连接成功：{os.path.basename(self._db_path)}（gui_para 共 {cnt} 条）")
-                        self._db_ok = True
+                        self._log("数据库连接成功，但未找到表 gui_para，将不追加参数列。")
                     conn.close()
+                    if has_table:
+                        self._params = ParamIndex.load(self._db_path)
+                        others = len(self._params.others)
+                        self._log(f"数据库连接成功：{os.path.basename(self._db_path)}（gui_para 共 {self._params.names} 个名字，"
+                                  f"{self._params.matched} 个按卦名组合建索引"
+                                  + (f"，{others} 个非卦名按字符串匹配" if others else "") + "）")
+                        self._db_ok = True
                 except Exception as db_e:
-                    self.gui.log(f"数据库连接失败：{db_e}（将不追加参数列）")
+                    self._log(f"数据库连接失败：{db_e}（将不追加参数列）")
         except Exception as e:
-            self.gui.log(f"数据库检查异常：{e}（将不追加参数列）")
+            self._log(f"数据库检查异常：{e}（将不追加参数列）")
         # ==== 检查结束 ====
 
     # ---- 稳定性辅助 ----
@@ -128,209 +213,444 @@ class BaseWorker(threading.Thread):
         return best
 
     # ---- 录入一次 ----
-    def _record_once(self):
-        now = time.time()
+    def _record_once(self) -> bool:
+        """触发一次读取+写入；返回本次是否提交了新行（去重跳过/冷却中/读取失败均为 False）。"""
+        now = time.monotonic()
         if now < self.cooldown_until:
-            return
+            return False
         self.cooldown_until = now + self._RECORD_COOLDOWN_SEC
 
-        handled = False  # 本次触发是否已成功写入
-
-        for _ in range(int(getattr(self, "READS_PER_CLICK", 3))):
-            # 仅等待“非空文本”，随后走稳定读取
-            _ = wait_text_change(
-                self.result_edit,
-                "",
-                timeout=min(self.wait_timeout, 0.6),
-                poll=self.wait_poll
-            )
-
-            # 稳定读取（防止第一次半成品）
-            new_text = self._read_stable_text()
-            if not new_text or not new_text.strip():
-                time.sleep(getattr(self, "SETTLE_GAP_SEC", 0.08))
-                continue
-            if not self._looks_complete(new_text):
-                # 文本还不完整，不抛错不提示，静默再试
-                time.sleep(getattr(self, "SETTLE_GAP_SEC", 0.08))
-                continue
+        handled = False  # 本次触发是否已提交新行
+        trigger_ts = time.time()
+        parse_telemetry.record_trigger()
+
+        with metrics.timer("record"):
+            for _ in range(int(getattr(self, "READS_PER_CLICK", 3))):
+                with metrics.timer("render_wait"):
+                    # 仅等待“非空文本”，随后走稳定读取
+                    _ = wait_text_change(
+                        self.result_edit,
+                        "",
+                        timeout=min(self.wait_timeout, 0.6),
+                        poll=self.wait_poll
+                    )
+
+                    # 稳定读取（防止第一次半成品）
+                    new_text = self._read_stable_text()
+                if not new_text or not new_text.strip():
+                    parse_telemetry.record_failure("empty_text", new_text)
+                    time.sleep(getattr(self, "SETTLE_GAP_SEC", 0.08))
+                    continue
+                if not self._looks_complete(new_text):
+                    # 文本还不完整，不抛错不提示，静默再试（只记入诊断）
+                    parse_telemetry.record_failure("incomplete", new_text)
+                    time.sleep(getattr(self, "SETTLE_GAP_SEC", 0.08))
+                    continue
 
-            if not handled:
                 # 抓右上角简介
                 intro_text = ""
                 try:
                     if self.intro_static:
-                        intro_text = self.intro_static.window_text()
+                        with metrics.timer("intro_read"):
+                            intro_text = self.intro_static.window_text()
                 except Exception:
                     intro_text = ""
 
-                # 解析
-                try:
-                    row = build_excel_row(new_text, intro_text, write_dt=datetime.now())
-                except Exception:
-                    # 出现半成品解析错误时不要打扰用户；静默跳过本次
+                handled = self._process_capture(new_text, intro_text, trigger_ts, datetime.now())
+                if handled is None:
+                    # 出现半成品解析错误时不要打扰用户；静默再试（只记入诊断）
                     time.sleep(getattr(self, "SETTLE_GAP_SEC", 0.08))
                     continue
+                # 已经处理过了，不重复插入/提示
+                break
 
-                # === 查询数据库，拿到“参数1..参数N” ===
-                # === 查询数据库，拿到“参数1..参数N” ===
-                extra_params = []
-                if self._db_ok and self._db_path:
-                    try:
-                        name_exact = row.get("卦象名字", "") or ""
-                        # 备用：用“本卦简称之变卦简称”
-                        name_fallback = ""
-                        if row.get("本卦简称") or row.get("变卦简称"):
-                            name_fallback = f"{row.get('本卦简称', '')}之{row.get('变卦简称', '')}"
-
-                        def _normalize(s: str) -> str:
-                            import re
-                            s = (s or "").strip()
-                            s = re.sub(r"\s+", "", s)
-                            s = s.replace("；", ";").replace("，", ",").replace("：", ":")
-                            return s
-
-                        conn = sqlite3.connect(self._db_path)
-                        cur = conn.cursor()
-
-                        # 1) 精确匹配（去空白）
-                        cur.execute(
-                            "SELECT param_value FROM gui_para WHERE REPLACE(REPLACE(name,' ',''),'　','') = ? ORDER BY param_order ASC",
-                            (_normalize(name_exact),)
-                        )
-                        fetched = cur.fetchall()
-                        rows = []
-                        for r in fetched:
-                            val = r[0]
-                            if val is None:
-                                rows.append("")  # ← 将数据库中的 NULL 转为空单元格
-                            else:
-                                val = str(val).strip()
-                                rows.append(val)
-
-                        # 2) 备用匹配（当精确匹配无结果）
-                        if not rows and name_fallback.strip():
-                            cur.execute(
-                                "SELECT param_value FROM gui_para WHERE REPLACE(REPLACE(name,' ',''),'　','') = ? ORDER BY param_order ASC",
-                                (_normalize(name_fallback),)
-                            )
-                            fetched = cur.fetchall()
-                            rows = []
-                            for r in fetched:
-                                val = r[0]
-                                if val is None:
-                                    rows.append("")
-                                else:
-                                    val = str(val).strip()
-                                    rows.append(val)
-
-                        conn.close()
-                        extra_params = rows
-                        # self.gui.log(f"参数命中 {len(extra_params)} 项（{name_exact or name_fallback}）")
-                    except Exception as e:
-                        self.gui.log(f"查询数据库失败：{e}（已忽略，不影响记录）")
-
-                # === 写入 Excel（把参数列带上）===
-                try:
-                    result = save_row_to_excel(row, self.gui.excel_var.get(), extra_params=extra_params)
-                except TypeError:
-                    # 兼容旧版 save_row_to_excel(没有 extra_params)
-                    result = save_row_to_excel(row, self.gui.excel_var.get())
-
-                row_snapshot = getattr(result, "snapshot", None)
-                written = bool(result)
-
-                if written:
-                    # 组装打印文本：按界面配置的字段顺序打印
-                    fields = getattr(self.gui, "print_fields", None)
-                    if fields is None:
-                        fields = ["卦象名字"]
-                    parts = []
-                    for f in fields:
-                        if row_snapshot is not None and f in row_snapshot:
-                            val = row_snapshot.get(f, "")
-                        else:
-                            val = row.get(f, "")
-                        s = "" if val is None else str(val).strip()
-                        parts.append(f"{f}：{s}")
-
-                    if parts:
-                        line = " | ".join(parts)
-                        msg = f"记录完成 ✅ {line}"
-                    else:
-                        msg = "记录完成 ✅"
-
-                    # 防刷屏：若包含“卦象名字”，用其与上次比较；否则用整行比较
-                    key = row.get("卦象名字", None)
-                    comp = key if (key is not None and str(key).strip() != "") else msg
-
-                    if comp != self._last_shown_gua:
-                        self.gui.log(msg)
-                        self._last_shown_gua = comp
-
-                self.last_text = new_text
-                handled = True
-
-            # 已经写入过了，不重复插入/提示
-            break
+        return bool(handled)
+
+    def _process_capture(self, new_text: str, intro_text: str, trigger_ts: float, captured: datetime):
+        """
+        读到文本之后的全部下游：存档 → 解析 → 诊断 → 去重/查参数/交给写入端（回放也从这里进）。
+        返回 None 表示解析失败（调用方可重读），否则为是否提交了新行。
+        """
+        # 原始文本先入存档，再解析（写入时间与存档里的读取时间一致，便于回放对照）
+        self._archive_capture(new_text, intro_text, trigger_ts, captured)
+        try:
+            with metrics.timer("parse"):
+                row = build_excel_row(new_text, intro_text, write_dt=captured)
+        except Exception as e:
+            category = getattr(e, "category", None) or f"error:{type(e).__name__}"
+            parse_telemetry.record_failure(category, new_text, intro_text)
+            return None
+        parse_telemetry.record_row(row, new_text, intro_text)
+        return self._commit_row(row, new_text)
+
+    def _archive_capture(self, full_text: str, intro_text: str, trigger_ts: float, captured: datetime):
+        if self.archive is None:
+            return
+        try:
+            self.archive.append(full_text, intro_text, trigger_ts, captured.timestamp(),
+                                int(getattr(self.main, "handle", 0) or 0))
+            counters.incr("archived")
+        except Exception as e:
+            # 存档出错（磁盘满、文件被占用等）不影响采集本身：本线程停止存档
+            self.archive = None
+            self._log(f"原始采集存档写入失败，本窗口停止存档：{e}")
+
+    def _commit_row(self, row: dict, new_text: str) -> bool:
+        """
+        解析成功后的下游：本窗口去重 → 查参数 → 交给写入端。
+        返回是否提交了新行（与本窗口上一条哈希相同则 False）。
+        """
+        self.last_text = new_text
+        if self.source:
+            row["来源窗口"] = self.source
+
+        # 每个窗口独立去重：只和本窗口上一条（已写完的、或正在写的）比较，多开时互不干扰；
+        # 上一条保存失败被放弃时不算，同一结果再点一次仍会写入
+        new_hash = row.get("哈希值", "")
+        if new_hash and new_hash in (self._last_hash, self._pending_hash):
+            counters.incr("dup_skipped")
+            return False
+
+        with metrics.timer("param_lookup"):
+            extra_params = self._lookup_params(row)
+
+        # === 写入 Excel（把参数列带上）===
+        if self.sink is not None:
+            self._pending_hash = new_hash
+            self.sink.submit(row, extra_params, on_done=self._on_written)
+        else:
+            result = save_row_to_excel(row, self.gui.excel_var.get(), extra_params=extra_params)
+            counters.incr("written" if result else "dup_skipped")
+            self._on_written(row, result)
+        return True
+
+    def _lookup_params(self, row: dict) -> list:
+        """从 gui_para 内存索引取“参数1..参数N”（运行期间数据库不变）；未配置或没有对应条目时返回空列表。"""
+        if not (self._db_ok and self._params is not None):
+            return []
+        params = self._params.lookup(row)
+        if params is None:
+            counters.incr("param_cache_miss")
+            return []
+        counters.incr("param_cache_hit")
+        return list(params)
+
+    def _on_written(self, row: dict, result):
+        """
+        写入完成回调（有 sink 时在写线程中执行）：前移本窗口去重哈希，按界面配置的字段打印日志。
+        result 为 None 表示写入端放弃了这一行（保存一直失败）。
+        """
+        new_hash = row.get("哈希值", "")
+        if self._pending_hash == new_hash:
+            self._pending_hash = None
+        if result is not None and new_hash:
+            self._last_hash = new_hash
+        row_snapshot = getattr(result, "snapshot", None)
+        if not bool(result):
+            return
+
+        # 组装打印文本：按界面配置的字段顺序打印
+        fields = getattr(self.gui, "print_fields", None)
+        if fields is None:
+            fields = ["卦象名字"]
+        parts = []
+        for f in fields:
+            if row_snapshot is not None and f in row_snapshot:
+                val = row_snapshot.get(f, "")
+            else:
+                val = row.get(f, "")
+            s = "" if val is None else str(val).strip()
+            parts.append(f"{f}：{s}")
+
+        if parts:
+            line = " | ".join(parts)
+            msg = f"记录完成 ✅ {line}"
+        else:
+            msg = "记录完成 ✅"
+
+        # 防刷屏：若包含“卦象名字”，用其与上次比较；否则用整行比较
+        key = row.get("卦象名字", None)
+        comp = key if (key is not None and str(key).strip() != "") else msg
+
+        if comp != self._last_shown_gua:
+            self._log(msg)
+            self._last_shown_gua = comp
 
 
 class AutoClickWorker(BaseWorker):
-    def __init__(self, gui, backend="win32", wait_timeout=5.0, wait_poll=0.15, interval_sec=5):
-        super().__init__(gui, backend, wait_timeout, wait_poll)
+    def __init__(self, gui, backend="win32", wait_timeout=5.0, wait_poll=0.15, interval_sec=5, **kw):
+        super().__init__(gui, backend, wait_timeout, wait_poll, **kw)
         self.interval_sec = interval_sec
 
-    def run(self):
+    def _run(self):
         try:
             self._prepare()
         except Exception as e:
             self.gui.alert_error(f"无法连接窗口: {e}")
             return
 
-        self.gui.log("进入自动点击模式…")
+        self._log("进入自动点击模式…")
 
+        next_due = time.monotonic()
         while not self.stop_flag:
-            start = time.time()
+            self._profile_tick()
+            t_loop = time.monotonic()
             try:
                 self.btn.wait("enabled", timeout=5)
-                self.btn.click_input()
+                with metrics.timer("click"):
+                    self.btn.click_input()
             except Exception as e:
-                self.gui.log(f"点击失败：{e}")
+                self._log(f"点击失败：{e}")
 
             self._record_once()
+            metrics.record("loop_busy", time.monotonic() - t_loop)
+
+            # 按固定节拍推进（单调时钟，不随单次耗时漂移）；落后超过一个周期则从当前时刻重新对齐
+            next_due += self.interval_sec
+            now = time.monotonic()
+            if next_due < now:
+                next_due = now
+            self._sleep_until(next_due)
+
+
+class BurstClickWorker(BaseWorker):
+    """
+    高速连拍：以“每分钟条数”为目标节拍。
+    - 上一条结果读取并去重完成后立即进入下一次点击（不早于节拍时刻）；
+    - 单调时钟、固定网格推进，不累积漂移；
+    - 点击后文本未变化时指数退避，变化恢复后立即回到目标节拍。
+    """
+    _RECORD_COOLDOWN_SEC = 0.0
+    READ_DELAY_SEC = 0.0       # 已确认文本变化后再读，无需额外固定延迟
+    CHANGE_TIMEOUT_SEC = 1.5   # 点击后等待文本变化的上限
+    CHANGE_POLL_SEC = 0.03
+    BACKOFF_MIN_SEC = 0.25
+    BACKOFF_MAX_SEC = 8.0
+    RATE_WINDOW_SEC = 60.0
+
+    def __init__(self, gui, backend="win32", wait_timeout=5.0, wait_poll=0.15, target_per_min=60, **kw):
+        super().__init__(gui, backend, wait_timeout, wait_poll, **kw)
+        self.target_per_min = max(1, int(target_per_min))
+        self._written_ts = deque()
+        self._t_start = None
+
+    def achieved_per_min(self) -> float:
+        """最近 RATE_WINDOW_SEC 秒内实际写入速率（条/分钟）；可在 UI 线程调用。"""
+        if self._t_start is None:
+            return 0.0
+        now = time.monotonic()
+        ts = list(self._written_ts)
+        cutoff = now - self.RATE_WINDOW_SEC
+        n = sum(1 for t in ts if t >= cutoff)
+        span = min(self.RATE_WINDOW_SEC, now - self._t_start)
+        return n * 60.0 / span if span > 0 else 0.0
+
+    def _run(self):
+        try:
+            self._prepare()
+        except Exception as e:
+            self.gui.alert_error(f"无法连接窗口: {e}")
+            return
 
-            elapsed = time.time() - start
-            sleep_left = max(0, self.interval_sec - elapsed)
-            for _ in range(int(sleep_left * 10)):
-                if self.stop_flag:
-                    break
-                time.sleep(0.1)
+        self._log(f"进入高速连拍模式（目标 {self.target_per_min} 条/分钟）…")
+
+        period = 60.0 / self.target_per_min
+        backoff = 0.0
+        self._t_start = time.monotonic()
+        next_due = self._t_start
+
+        while not self.stop_flag:
+            self._profile_tick()
+            self._sleep_until(next_due)
+            if self.stop_flag:
+                break
+
+            t_loop = time.monotonic()
+            try:
+                self.btn.wait("enabled", timeout=5)
+                with metrics.timer("click"):
+                    self.btn.click_input()
+            except Exception as e:
+                self._log(f"点击失败：{e}")
+
+            with metrics.timer("render_change"):
+                changed = wait_text_change(
+                    self.result_edit,
+                    self.last_text,
+                    timeout=self.CHANGE_TIMEOUT_SEC,
+                    poll=self.CHANGE_POLL_SEC
+                )
+            now = time.monotonic()
+            if not changed or changed == self.last_text:
+                # 文本停滞：指数退避，避免空点
+                backoff = min(self.BACKOFF_MAX_SEC, max(self.BACKOFF_MIN_SEC, backoff * 2))
+                next_due = now + backoff
+                continue
+            backoff = 0.0
+
+            if self._record_once():
+                self._written_ts.append(time.monotonic())
+                cutoff = time.monotonic() - self.RATE_WINDOW_SEC
+                while self._written_ts and self._written_ts[0] < cutoff:
+                    self._written_ts.popleft()
+            metrics.record("loop_busy", time.monotonic() - t_loop)
+
+            next_due += period
+            now = time.monotonic()
+            if next_due < now:
+                next_due = now
 
 
 class MonitorClickWorker(BaseWorker):
-    def run(self):
+    """
+    监测模式：阻塞等待触发源的边沿事件（点击按钮 / 回车 / 结果文本变化），每个事件记录一次。
+    trigger_source 可注入（例如 FakeTriggerSource）；不传则优先钩子、失败退回轮询。
+    """
+    WAIT_SLICE_SEC = 0.5   # 等待事件的单次上限，用于及时响应停止
+
+    def __init__(self, gui, backend="win32", wait_timeout=5.0, wait_poll=0.15, trigger_source=None, **kw):
+        super().__init__(gui, backend, wait_timeout, wait_poll, **kw)
+        self.trigger_source = trigger_source
+
+    def _run(self):
         try:
             self._prepare()
         except Exception as e:
             self.gui.alert_error(f"无法连接窗口: {e}")
             return
 
-        main_handle = self.main.handle
-        self.gui.log("进入监测点击模式（检测按钮焦点/回车键）…")
+        source = self.trigger_source
+        if source is None:
+            source = create_trigger_source(self.main, self.btn, self.result_edit, log=self._log)
+        else:
+            source.start()
+        self._log(f"进入监测点击模式（{type(source).__name__}：按钮点击/回车/文本变化）…")
 
-        while not self.stop_flag:
+        try:
+            while not self.stop_flag:
+                self._profile_tick()
+                ev = source.wait(self.WAIT_SLICE_SEC)
+                if ev is None:
+                    continue
+                metrics.record("trigger_delay", time.monotonic() - ev.ts)
+                try:
+                    self._record_once()
+                except Exception:
+                    # 任何 UI 小抖动都吞掉，避免刷异常
+                    pass
+        finally:
+            source.stop()
+
+
+def _screen_pos(main) -> tuple:
+    try:
+        rect = main.rectangle()
+        return rect.left, rect.top
+    except Exception:
+        return 0, 0
+
+
+def window_labels(windows) -> list:
+    """
+    各窗口写入“来源窗口”列的标识，与 windows 一一对应。句柄每次启动都会变，不能当标识：
+    只有一个窗口时留空（去重不分窗口）；多个窗口按屏幕位置（先左后上）编号为“窗口1”“窗口2”…，
+    窗口摆放不变时重启后编号不变，写入去重能接上之前的记录。
+    """
+    if len(windows) <= 1:
+        return [""] * len(windows)
+    order = sorted(range(len(windows)), key=lambda i: _screen_pos(windows[i][0]))
+    labels = [""] * len(windows)
+    for n, i in enumerate(order, 1):
+        labels[i] = f"窗口{n}"
+    return labels
+
+
+class CaptureGroup(threading.Thread):
+    """
+    多开采集：发现所有标题匹配的窗口，每个窗口启动一个 worker_cls 线程，
+    全部提交到同一个 ResultSink（单写线程、合并批量保存）。
+    对 UI 暴露与单个 Worker 相同的 start/stop/is_alive 接口。
+    """
+    JOIN_TIMEOUT_SEC = 10.0
+    DIAG_FLUSH_SEC = 60.0     # 解析诊断文件的落盘间隔
+    ARCHIVE_RAW = True        # 原始文本存档（<结果文件名>.captures.bin/.idx）
+
+    def __init__(self, gui, worker_cls, backend="win32", **worker_kwargs):
+        super().__init__(daemon=True)
+        self.gui = gui
+        self.worker_cls = worker_cls
+        self.backend = backend
+        self.worker_kwargs = worker_kwargs
+        self.workers = []
+        self.sink = None
+        self.archive = None
+        self._stop_evt = threading.Event()
+
+    def stop(self):
+        self._stop_evt.set()
+
+    def achieved_per_min(self) -> float:
+        return sum(w.achieved_per_min() for w in self.workers if hasattr(w, "achieved_per_min"))
+
+    @property
+    def target_per_min(self) -> int:
+        return sum(getattr(w, "target_per_min", 0) for w in self.workers)
+
+    def run(self):
+        try:
+            windows = connect_all(self.gui.title_var.get(), backend=self.backend)
+        except Exception as e:
+            self.gui.alert_error(f"无法连接窗口: {e}")
+            return
+
+        self.sink = ResultSink(self.gui.excel_var.get(), log=self.gui.log)
+        self.sink.start()
+
+        prefix = os.path.splitext(self.gui.excel_var.get())[0]
+        parse_telemetry.reset(prefix + ".parse_failures.json")
+        if self.ARCHIVE_RAW:
             try:
-                fg = win32gui.GetForegroundWindow()
-                if fg == main_handle:
-                    focus = self.main.get_focus()
-                    # 鼠标点在“电脑起卦”按钮上（按钮获得焦点）
-                    if focus and self.btn and focus.handle == self.btn.handle:
-                        self._record_once()
-
-                    # 监听回车键（静默）
-                    if win32api.GetAsyncKeyState(win32con.VK_RETURN) & 0x8000:
-                        self._record_once()
-            except Exception:
-                # 任何 UI 小抖动都吞掉，避免刷异常
-                pass
-            time.sleep(0.05)
+                self.archive = CaptureArchive(archive_prefix(self.gui.excel_var.get()))
+            except (OSError, ValueError) as e:
+                self.gui.log(f"原始采集存档不可用：{e}")
+
+        profile = self.worker_kwargs.get("profile")
+        tracer = None
+        if profile is not None:
+            tracer = MemoryTracer(profile)
+            tracer.start()
+            self.gui.log(f"性能剖析已开启：{profile.duration_sec:.0f} 秒，输出到 {profile.out_prefix}.*")
+
+        multi = len(windows) > 1
+        for source, (main, title) in zip(window_labels(windows), windows):
+            w = self.worker_cls(self.gui, self.backend, window=(main, title), sink=self.sink,
+                                source=source, archive=self.archive, **self.worker_kwargs)
+            if multi:
+                w.log_prefix = f"[{source}] "
+                self.gui.log(f"{source}：{title}（句柄 {main.handle:#x}）")
+            self.workers.append(w)
+            w.start()
+        if multi:
+            self.gui.log(f"共发现 {len(windows)} 个匹配窗口，已分别启动采集线程")
+
+        # 等待停止请求（或全部 Worker 自行退出，例如连接控件失败）
+        next_flush = time.monotonic() + self.DIAG_FLUSH_SEC
+        while not self._stop_evt.wait(0.2):
+            if not any(w.is_alive() for w in self.workers):
+                break
+            if time.monotonic() >= next_flush:
+                parse_telemetry.flush()
+                next_flush = time.monotonic() + self.DIAG_FLUSH_SEC
+
+        for w in self.workers:
+            w.stop()
+        for w in self.workers:
+            w.join(timeout=self.JOIN_TIMEOUT_SEC)
+        # 先停采集再停写入端：已排队的行会全部落盘
+        self.sink.stop()
+        self.sink.join()
+        if self.archive is not None:
+            self.archive.close()
+        if tracer is not None:
+            tracer.stop()
+        parse_telemetry.flush()
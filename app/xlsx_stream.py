@@ -0,0 +1,508 @@
+# -*- coding: utf-8 -*-
+"""
+xlsx_stream.py
+
+直接改写 xlsx 里的工作表 XML 来插入列（不经过 pandas/openpyxl 整表加载）：
+- 工作表 XML 按块流式读取、按标签逐个改写后写入新的 zip，内存只和块大小有关；
+- 其它 zip 成员原样拷贝，样式/列宽/数据类型/共享字符串全部保留；
+- 改写范围：单元格 r、行 spans、<col min/max>、dimension/合并单元格/条件格式/数据验证/
+  超链接/筛选/选区等引用属性、公式里的本表引用、workbook.xml 中指向本表的定义名称；
+- 新表头写成内联字符串并沿用相邻表头单元格的样式；
+- 公式计算链 calcChain.xml 不改写而是去掉（Excel 打开时会重建）；
+- 先写临时文件，成功后 os.replace 覆盖原文件。
+以下情况不会跟着移动，遇到会报错而不是写坏文件：本表带表格对象（ListObject）、批注、图形/图表/图片等锚点，
+或其它工作表/图表/数据透视表里有引用本表的公式。
+另有 write_rows_xlsx：流式写一个新文件，字符串全部进共享字符串表（相同文本只存一份，供结果库导出用）。
+"""
+import codecs
+import math
+import os
+import re
+import shutil
+import zipfile
+from xml.sax.saxutils import escape
+
+CHUNK_CHARS = 1 << 16
+
+_TOKEN_RE = re.compile(r"<[^>]*>|[^<]+")
+# 主循环只处理“可能需要改写”的片段，其余字节按块原样拷贝：
+#   1) r 写在第一个属性的单元格（最常见，走快速路径）  2) 其它写法的单元格
+#   3) row/sheetData 起止标签  4) 公式元素开头及其文本  5) 带引用类属性的任意标签
+_INTEREST_RE = re.compile(
+    r'<c r="([A-Z]{1,3})(\d+)"[^>]*>'
+    r"|<(?:[\w.-]+:)?c\s[^>]*>"
+    r"|</?(?:[\w.-]+:)?(?:row|sheetData)\b[^>]*>"
+    r"|(<(?:[\w.-]+:)?(?:f|formula1|formula2|formula)\b[^>]*>)([^<]*)"
+    r'|<(?:[\w.-]+:)?[\w.-]+\s[^>]*?\b(?:ref|sqref|activeCell|topLeftCell|min|max)="[^>]*>')
+_TAG_RE = re.compile(r"<(/?)(?:[\w.-]+:)?([\w.-]+)")
+_ATTR_RE = re.compile(r'(\s(?:[\w.-]+:)?([\w.-]+)=")([^"]*)(")')
+_REF_PART_RE = re.compile(r"^(\$?)([A-Z]{1,3})?(\$?)(\d*)$")
+# 公式中的本表 A1 引用：前面不是字母/数字/“!”（跨表引用不动），后面不是“(”（函数名，如 LOG10()）
+_FORMULA_REF_RE = re.compile(
+    r"(?<![A-Za-z0-9_.!'\"$])(\$?[A-Z]{1,3}\$?\d+(?::\$?[A-Z]{1,3}\$?\d+)?)(?![A-Za-z0-9_(!])")
+_REF_ATTRS = {"ref", "sqref", "activeCell", "topLeftCell"}
+
+
+def col_to_idx(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def idx_to_col(idx: int) -> str:
+    out = ""
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        out = chr(65 + rem) + out
+    return out
+
+
+class _Shifter:
+    """列号 >= at 的引用整体右移 n 列；区间按端点分别处理（跨过插入点的区间自然扩展）。"""
+
+    def __init__(self, at: int, n: int):
+        self.at = at
+        self.n = n
+
+    def col(self, c: int) -> int:
+        return c + self.n if c >= self.at else c
+
+    def _part(self, part: str) -> str:
+        m = _REF_PART_RE.match(part)
+        if not m or not m.group(2):
+            return part       # 整行引用（如 1:3）或不认识的写法，原样保留
+        d1, letters, d2, row = m.groups()
+        return f"{d1}{idx_to_col(self.col(col_to_idx(letters)))}{d2}{row}"
+
+    def ref(self, ref: str) -> str:
+        """'B3' / 'A1:C9' / 'A:C' / 空格分隔的多个区域。"""
+        return " ".join(":".join(self._part(p) for p in piece.split(":")) for piece in ref.split(" "))
+
+    def formula(self, text: str, own_ref_re=None) -> str:
+        text = _FORMULA_REF_RE.sub(lambda m: self.ref(m.group(1)), text)
+        if own_ref_re is not None:      # 显式写了本表表名的引用（'表名'!A1）
+            text = own_ref_re.sub(lambda m: m.group(1) + self.ref(m.group(2)), text)
+        return text
+
+
+def _own_ref_re(sheet_name: str):
+    """匹配“本表表名!引用”，表名按 XML 转义、单引号按公式规则双写。"""
+    quoted = re.escape(escape(sheet_name).replace("'", "''"))
+    return re.compile(rf"((?:'{quoted}'|(?<![\w.']){quoted})!)(\$?[A-Z]{{1,3}}\$?\d*(?::\$?[A-Z]{{1,3}}\$?\d*)?)")
+
+
+def _active_sheet(zf: zipfile.ZipFile):
+    """返回 (工作表名, 工作表 XML 在 zip 中的路径)；与 openpyxl 的 wb.active 对应同一张表。"""
+    wb_xml = zf.read("xl/workbook.xml").decode("utf-8")
+    rels_xml = zf.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+    sheets = re.findall(r'<(?:\w+:)?sheet\b[^>]*?\bname="([^"]*)"[^>]*?\br:id="([^"]*)"', wb_xml)
+    if not sheets:
+        sheets = [(n, rid) for rid, n in
+                  re.findall(r'<(?:\w+:)?sheet\b[^>]*?\br:id="([^"]*)"[^>]*?\bname="([^"]*)"', wb_xml)]
+    m = re.search(r'\bactiveTab="(\d+)"', wb_xml)
+    name, rid = sheets[int(m.group(1)) if m else 0]
+    target = None
+    for rel in re.findall(r"<Relationship\b[^>]*>", rels_xml):
+        if re.search(rf'\bId="{re.escape(rid)}"', rel):
+            target = re.search(r'\bTarget="([^"]*)"', rel).group(1)
+            break
+    if target is None:
+        raise ValueError("无法定位工作表 XML。")
+    path = target.lstrip("/") if target.startswith("/") else "xl/" + target
+    return name, os.path.normpath(path).replace("\\", "/")
+
+
+def _iter_chunks(raw, chunk_chars: int = CHUNK_CHARS):
+    """按块读取解码，只在完整的“>”处切分（标签不会被截断，标签之间的文本也总是完整的）。"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    while True:
+        data = raw.read(chunk_chars)
+        buf += decoder.decode(data, final=not data)
+        cut = buf.rfind(">") + 1 if data else len(buf)
+        if cut:
+            yield buf[:cut]
+            buf = buf[cut:]
+        if not data:
+            return
+
+
+def _iter_tokens(raw, chunk_chars: int = CHUNK_CHARS):
+    """逐个产出“标签 / 文本”片段（只在读表头这种很短的扫描里用）。"""
+    for chunk in _iter_chunks(raw, chunk_chars):
+        for m in _TOKEN_RE.finditer(chunk):
+            yield m.group(0)
+
+
+def _header_width(zf: zipfile.ZipFile, sheet_path: str) -> int:
+    """第一遍：只读到表头行结束，求表头最后一个非空单元格的列号（0 表示没有表头行）。"""
+    width = 0
+    in_header = False
+    with zf.open(sheet_path) as raw:
+        for tok in _iter_tokens(raw):
+            m = _TAG_RE.match(tok)
+            if not m:
+                continue
+            closing, name = m.groups()
+            if name == "row":
+                if closing:
+                    if in_header:
+                        return width
+                    continue
+                r = re.search(r'\sr="(\d+)"', tok)
+                if r and r.group(1) != "1":
+                    return width
+                in_header = True
+                if tok.endswith("/>"):
+                    return width
+            elif name == "c" and not closing and in_header:
+                r = re.search(r'\sr="([A-Z]+)\d+"', tok)
+                if r and not tok.endswith("/>"):
+                    width = max(width, col_to_idx(r.group(1)))
+            elif name == "sheetData" and closing:
+                return width
+    return width
+
+
+class _SheetRewriter:
+    def __init__(self, at: int, names: list, sheet_name: str = ""):
+        self.shift = _Shifter(at, len(names))
+        self._own_ref = _own_ref_re(sheet_name) if sheet_name else None
+        self.at = at
+        self.names = names
+        self.header_done = False
+        self.in_header = False
+        self.header_style = None
+        self._last_new = at + len(names) - 1
+        self._col_memo = {}
+        self._formula_open = False   # 上一块恰好结束在公式开始标签上，下一块开头的文本是公式
+
+    def _new_cells(self) -> str:
+        s = f' s="{self.header_style}"' if self.header_style else ""
+        return "".join(
+            f'<c r="{idx_to_col(self.at + i)}1" t="inlineStr"{s}><is><t>{escape(nm)}</t></is></c>'
+            for i, nm in enumerate(self.names))
+
+    def _shift_attrs(self, tok: str, tag: str, header: bool = False) -> str:
+        def _sub(m):
+            attr, val = m.group(2), m.group(3)
+            if tag == "c" and attr == "r":
+                val = self.shift.ref(val)
+            elif tag == "row" and attr == "spans" and ":" in val:
+                a, b = val.split(":", 1)
+                if a.isdigit() and b.isdigit():
+                    a, b = self.shift.col(int(a)), self.shift.col(int(b))
+                    if header:
+                        b = max(b, self._last_new)
+                    val = f"{min(a, self.at) if header else a}:{b}"
+            elif tag == "dimension" and attr == "ref":
+                # 新表头可能接在原有区域之后，dimension 需要把它们包进来（只读模式按它定宽）
+                val = self.shift.ref(val)
+                parts = val.split(":")
+                m2 = _REF_PART_RE.match(parts[-1])
+                if m2 and m2.group(2) and col_to_idx(m2.group(2)) < self._last_new:
+                    parts[-1] = f"{m2.group(1)}{idx_to_col(self._last_new)}{m2.group(3)}{m2.group(4)}"
+                    val = ":".join(parts if len(parts) > 1 else ["A1"] + parts)
+            elif tag == "col" and attr in ("min", "max") and val.isdigit():
+                val = str(self.shift.col(int(val)))
+            elif attr in _REF_ATTRS:
+                val = self.shift.ref(val)
+            return m.group(1) + val + m.group(4)
+
+        return _ATTR_RE.sub(_sub, tok)
+
+    def process(self, chunk: str) -> str:
+        """改写一块 XML（块由 _iter_chunks 切分）。"""
+        if self._formula_open:
+            self._formula_open = False
+            lt = chunk.find("<")
+            lt = len(chunk) if lt < 0 else lt
+            chunk = self.shift.formula(chunk[:lt], self._own_ref) + chunk[lt:]
+        return _INTEREST_RE.sub(self._on_match, chunk)
+
+    def _on_match(self, m) -> str:
+        letters = m.group(1)
+        if letters is not None and self.header_done:
+            new = self._col_memo.get(letters)
+            if new is None:
+                new = self._col_memo[letters] = idx_to_col(self.shift.col(col_to_idx(letters)))
+            tok = m.group(0)
+            return f'<c r="{new}{m.group(2)}"' + tok[len(letters) + len(m.group(2)) + 7:]
+        opener = m.group(3)
+        if opener is not None:
+            text = m.group(4)
+            if not text and m.end() == len(m.string) and not opener.endswith("/>"):
+                self._formula_open = True
+            return self.feed(opener) + self.shift.formula(text, self._own_ref)
+        return self.feed(m.group(0))
+
+    def feed(self, tok: str) -> str:
+        """改写单个标签。"""
+        m = _TAG_RE.match(tok)
+        if not m or tok.startswith(("<?", "<!")):
+            return tok
+        closing, tag = m.groups()
+        self_closing = tok.endswith("/>")
+
+        if tag == "sheetData":
+            if self_closing:
+                self.header_done = True
+                return tok[:-2].rstrip() + f'><row r="1">{self._new_cells()}</row></sheetData>'
+            if closing and not self.header_done:
+                self.header_done = True
+                return f'<row r="1">{self._new_cells()}</row>' + tok
+            return tok
+
+        if tag == "row":
+            if closing:
+                if self.in_header:
+                    self.in_header = False
+                    if not self.header_done:
+                        self.header_done = True
+                        return self._new_cells() + tok
+                return tok
+            r = re.search(r'\sr="(\d+)"', tok)
+            is_header = (r is None and not self.header_done) or (r is not None and r.group(1) == "1")
+            out = self._shift_attrs(tok, tag, header=is_header and not self.header_done)
+            if is_header and not self.header_done:
+                if self_closing:
+                    self.header_done = True
+                    return out[:-2].rstrip() + ">" + self._new_cells() + "</row>"
+                self.in_header = True
+                return out
+            if not self.header_done:
+                # 没有第 1 行：在第一行数据前补一个表头行
+                self.header_done = True
+                return f'<row r="1">{self._new_cells()}</row>' + out
+            return out
+
+        if tag == "c" and not closing:
+            if self.in_header and not self.header_done:
+                r = re.search(r'\sr="([A-Z]+)\d+"', tok)
+                col = col_to_idx(r.group(1)) if r else 0
+                s = re.search(r'\ss="(\d+)"', tok)
+                if col >= self.at:
+                    if s and self.header_style is None:
+                        self.header_style = s.group(1)
+                    self.header_done = True
+                    return self._new_cells() + self._shift_attrs(tok, tag)
+                if s:
+                    self.header_style = s.group(1)
+            return self._shift_attrs(tok, tag)
+
+        if closing:
+            return tok
+        return self._shift_attrs(tok, tag)
+
+
+def _rewrite_defined_names(wb_xml: str, sheet_name: str, shift: _Shifter) -> str:
+    """workbook.xml 里指向本表的定义名称（打印区域、筛选区域等）同步右移。"""
+    ref_re = _own_ref_re(sheet_name)
+
+    def _name(m):
+        return m.group(1) + ref_re.sub(lambda r: r.group(1) + shift.ref(r.group(2)), m.group(2)) + m.group(3)
+
+    return re.sub(r"(<(?:\w+:)?definedName\b[^>]*>)(.*?)(</(?:\w+:)?definedName>)", _name, wb_xml, flags=re.S)
+
+
+# 工作表关系类型 -> 说明：这些对象的锚点/引用不在工作表 XML 里，插入列后不会跟着移动
+_UNSUPPORTED_SHEET_RELS = {
+    "table": "表格对象（插入→表格）",
+    "comments": "批注",
+    "threadedComment": "批注",
+    "vmlDrawing": "批注或控件",
+    "drawing": "图形/图表/图片",
+}
+_CALC_CHAIN = "xl/calcChain.xml"
+_FORMULA_TAGS = ("f", "formula", "formula1", "formula2")
+
+
+def _references_sheet(zf: zipfile.ZipFile, member: str, sheet_name: str) -> bool:
+    """member（其它工作表/图表）的公式里是否写了“本表表名!引用”。"""
+    own = _own_ref_re(sheet_name)
+    in_formula = False
+    with zf.open(member) as raw:
+        for tok in _iter_tokens(raw):
+            m = _TAG_RE.match(tok)
+            if m:
+                in_formula = not m.group(1) and m.group(2) in _FORMULA_TAGS and not tok.endswith("/>")
+            elif in_formula and own.search(tok):
+                return True
+    return False
+
+
+def _check_supported(zf: zipfile.ZipFile, sheet_name: str, sheet_path: str):
+    rels = os.path.dirname(sheet_path) + "/_rels/" + os.path.basename(sheet_path) + ".rels"
+    if rels in zf.namelist():
+        for kind in re.findall(r'\bType="[^"]*/([^"/]+)"', zf.read(rels).decode("utf-8", "replace")):
+            if kind in _UNSUPPORTED_SHEET_RELS:
+                raise ValueError(f"工作表包含{_UNSUPPORTED_SHEET_RELS[kind]}，暂不支持流式插入列（其位置不会跟着移动）。")
+    sheet_attr = 'sheet="' + escape(sheet_name, {'"': "&quot;"}) + '"'
+    for name in zf.namelist():
+        if name == sheet_path or not name.endswith(".xml"):
+            continue
+        if name.startswith(("xl/worksheets/", "xl/charts/")) and _references_sheet(zf, name, sheet_name):
+            raise ValueError(f"{name} 里有引用本表的公式，暂不支持流式插入列（跨表引用不会跟着移动）。")
+        if name.startswith("xl/pivotCache/") and sheet_attr in zf.read(name).decode("utf-8", "replace"):
+            raise ValueError("有以本表为数据源的数据透视表，暂不支持流式插入列。")
+
+
+def _drop_calc_chain(name: str, text: str) -> str:
+    """去掉 [Content_Types].xml / workbook.xml.rels 里对 calcChain.xml 的登记。"""
+    if name == "[Content_Types].xml":
+        return re.sub(r'<Override\b[^>]*PartName="/xl/calcChain\.xml"[^>]*/>', "", text)
+    return re.sub(r'<Relationship\b[^>]*Target="(?:/xl/)?calcChain\.xml"[^>]*/>', "", text)
+
+
+def insert_cols(path: str, x_col_1based: int, col_names: list, chunk_chars: int = CHUNK_CHARS) -> int:
+    """
+    在活动工作表第 x 列前插入 len(col_names) 列并写入表头；x 超过表头宽度时接在表头末尾。
+    返回实际插入位置（1 起）。
+    """
+    tmp = path + ".inserting.tmp"
+    with zipfile.ZipFile(path) as zin:
+        sheet_name, sheet_path = _active_sheet(zin)
+        _check_supported(zin, sheet_name, sheet_path)
+
+        at = max(1, min(x_col_1based, _header_width(zin, sheet_path) + 1))
+        rw = _SheetRewriter(at, col_names, sheet_name)
+        try:
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zout:
+                for info in zin.infolist():
+                    if info.filename == sheet_path:
+                        out_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                        out_info.compress_type = zipfile.ZIP_DEFLATED
+                        encoder = codecs.getincrementalencoder("utf-8")()
+                        with zin.open(info) as src, zout.open(out_info, "w", force_zip64=True) as dst:
+                            for chunk in _iter_chunks(src, chunk_chars):
+                                dst.write(encoder.encode(rw.process(chunk)))
+                            dst.write(encoder.encode("", final=True))
+                    elif info.filename == "xl/workbook.xml":
+                        text = zin.read(info).decode("utf-8")
+                        zout.writestr(info, _rewrite_defined_names(text, sheet_name, rw.shift).encode("utf-8"))
+                    elif info.filename == _CALC_CHAIN:
+                        continue
+                    elif info.filename in ("[Content_Types].xml", "xl/_rels/workbook.xml.rels"):
+                        text = zin.read(info).decode("utf-8")
+                        zout.writestr(info, _drop_calc_chain(info.filename, text).encode("utf-8"))
+                    else:
+                        with zin.open(info) as src, zout.open(info, "w", force_zip64=True) as dst:
+                            shutil.copyfileobj(src, dst, 1 << 20)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    os.replace(tmp, path)
+    return at
+
+
+# ===== 流式写新文件（共享字符串）=====
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_CONTENT_TYPES = (
+    _XML_DECL + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    "</Types>")
+_ROOT_RELS = (
+    _XML_DECL + f'<Relationships xmlns="{_PKG_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>')
+_WORKBOOK_RELS = (
+    _XML_DECL + f'<Relationships xmlns="{_PKG_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{_REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>'
+    f'<Relationship Id="rId2" Type="{_REL_NS}/sharedStrings" Target="sharedStrings.xml"/>'
+    f'<Relationship Id="rId3" Type="{_REL_NS}/styles" Target="styles.xml"/></Relationships>')
+_STYLES = (
+    _XML_DECL + f'<styleSheet xmlns="{_MAIN_NS}">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>')
+# XML 1.0 不允许的控制字符（Excel 也打不开），写出前去掉
+_ILLEGAL_XML_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_FLUSH_CELLS = 4096       # 攒够这么多单元格/字符串写出一次
+
+
+def write_rows_xlsx(path: str, headers: list, rows, sheet_name: str = "Sheet1") -> int:
+    """
+    把 rows（dict 的可迭代对象，键为表头名）写成一个新的 xlsx：首行表头，其后每个 dict 一行。
+    字符串都进共享字符串表、单元格只存下标，同一段文本整本只存一份；整数/小数写成数字。
+    工作表 XML 边生成边压缩写出，内存里只有去重后的字符串表。先写临时文件，成功后覆盖 path。
+    返回写入的数据行数。
+    """
+    tmp = path + ".writing.tmp"
+    letters = [idx_to_col(j) for j in range(1, len(headers) + 1)]
+    strings = {}
+    refs = 0
+
+    def _cell(ref: str, value) -> str:
+        nonlocal refs
+        if isinstance(value, bool):
+            return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, int) or isinstance(value, float) and math.isfinite(value):
+            return f'<c r="{ref}"><v>{value!r}</v></c>'
+        text = _ILLEGAL_XML_RE.sub("", str(value))
+        idx = strings.setdefault(text, len(strings))
+        refs += 1
+        return f'<c r="{ref}" t="s"><v>{idx}</v></c>'
+
+    n = 0
+    try:
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zout:
+            with zout.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as dst:
+                buf = [_XML_DECL, f'<worksheet xmlns="{_MAIN_NS}"><sheetData><row r="1">']
+                buf += [_cell(f"{c}1", h) for c, h in zip(letters, headers)]
+                buf.append("</row>")
+                size = 0
+                for n, row in enumerate(rows, 1):
+                    r = n + 1
+                    buf.append(f'<row r="{r}">')
+                    for c, h in zip(letters, headers):
+                        v = row.get(h)
+                        if v is not None and v != "":
+                            buf.append(_cell(f"{c}{r}", v))
+                    buf.append("</row>")
+                    size += len(headers)
+                    if size >= _FLUSH_CELLS:
+                        dst.write("".join(buf).encode("utf-8"))
+                        buf, size = [], 0
+                buf.append("</sheetData></worksheet>")
+                dst.write("".join(buf).encode("utf-8"))
+
+            with zout.open("xl/sharedStrings.xml", "w", force_zip64=True) as dst:
+                buf = [_XML_DECL, f'<sst xmlns="{_MAIN_NS}" count="{refs}" uniqueCount="{len(strings)}">']
+                for text in strings:
+                    buf.append(f'<si><t xml:space="preserve">{escape(text)}</t></si>')
+                    if len(buf) >= _FLUSH_CELLS:
+                        dst.write("".join(buf).encode("utf-8"))
+                        buf = []
+                buf.append("</sst>")
+                dst.write("".join(buf).encode("utf-8"))
+
+            zout.writestr("[Content_Types].xml", _CONTENT_TYPES)
+            zout.writestr("_rels/.rels", _ROOT_RELS)
+            zout.writestr("xl/workbook.xml", (
+                _XML_DECL + f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>'
+                f'<sheet name="{escape(sheet_name, {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/>'
+                "</sheets></workbook>"))
+            zout.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+            zout.writestr("xl/styles.xml", _STYLES)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    return n